@@ -0,0 +1,95 @@
+"""
+Query API over the analytics database (build it with `python src/analytics_db.py`
+or by passing db_path to the fetch/parse scripts).
+
+Endpoints:
+- GET /episodes?season=7                     per-episode rollups for a season
+- GET /episodes/<n>?season=7&limit=10        dashboard for one episode
+- GET /authors/<name>?limit=50               posts and comments by one author
+- GET /search?q=bailey&mode=term&season=7    hits per episode and top-scored matches
+      (mode: term, phrase or prefix; omit season to search every season)
+"""
+
+import json
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, unquote, urlparse
+
+sys.path.insert(0, str(Path(__file__).parent / 'src'))
+
+from analytics_db import (author_activity, connect, episode_dashboard, episode_rollups,
+                          search_mentions, search_top)
+
+DB_PATH = Path(__file__).parent / 'data' / 'analytics.sqlite'
+
+
+def handle_query(conn, path, params):
+    """
+    Route a request path to a query.
+
+    Returns:
+        tuple: (HTTP status, JSON-serialisable body)
+    """
+    parts = [unquote(p) for p in path.strip('/').split('/') if p]
+    season = int(params.get('season', 7))
+    limit = int(params.get('limit', 10))
+
+    if parts == ['episodes']:
+        return 200, episode_rollups(conn, season)
+    if len(parts) == 2 and parts[0] == 'episodes' and parts[1].isdigit():
+        dashboard = episode_dashboard(conn, int(parts[1]), season, limit)
+        if dashboard['rollup'] is None:
+            return 404, {'error': f"No data for season {season} episode {parts[1]}"}
+        return 200, dashboard
+    if len(parts) == 2 and parts[0] == 'authors':
+        return 200, author_activity(conn, parts[1], int(params.get('limit', 50)))
+    if parts == ['search']:
+        query = params.get('q', '')
+        mode = params.get('mode', 'term')
+        search_season = int(params['season']) if 'season' in params else None
+        return 200, {
+            'query': query,
+            'mode': mode,
+            'episodes': search_mentions(conn, query, mode, search_season),
+            **search_top(conn, query, mode, search_season, limit),
+        }
+    return 404, {'error': f"Unknown endpoint: {path}"}
+
+
+def make_handler(conn):
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            try:
+                status, body = handle_query(conn, url.path, params)
+            except ValueError as e:
+                status, body = 400, {'error': str(e)}
+
+            payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+    return QueryHandler
+
+
+def serve(db_path=DB_PATH, host='127.0.0.1', port=8000):
+    """Serve the query API over HTTP until interrupted."""
+    conn = connect(db_path)
+    server = HTTPServer((host, port), make_handler(conn))
+    print(f"Serving analytics API on http://{host}:{port} (database: {db_path})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    serve()
@@ -0,0 +1,505 @@
+import sqlite3
+from pathlib import Path
+
+from json_stream import comment_files, iter_comments, iter_posts
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS episodes (
+    season INTEGER NOT NULL,
+    episode_number INTEGER NOT NULL,
+    air_date TEXT NOT NULL,
+    air_date_timestamp INTEGER NOT NULL,
+    PRIMARY KEY (season, episode_number)
+);
+
+-- posts and comments carry an explicit INTEGER PRIMARY KEY (an alias of the
+-- rowid) for the full-text indexes to reference: VACUUM may renumber implicit
+-- rowids, which would silently desync the indexes from their content.
+CREATE TABLE IF NOT EXISTS posts (
+    pk INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    season INTEGER NOT NULL,
+    episode_number INTEGER NOT NULL,
+    title TEXT,
+    author TEXT,
+    created_utc REAL,
+    score INTEGER NOT NULL DEFAULT 0,
+    num_comments INTEGER NOT NULL DEFAULT 0,
+    url TEXT,
+    permalink TEXT,
+    selftext TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_posts_episode_created ON posts (season, episode_number, created_utc);
+CREATE INDEX IF NOT EXISTS idx_posts_author ON posts (author);
+CREATE INDEX IF NOT EXISTS idx_posts_score ON posts (score);
+
+CREATE TABLE IF NOT EXISTS comments (
+    pk INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    season INTEGER NOT NULL,
+    episode_number INTEGER NOT NULL,
+    author TEXT,
+    body TEXT,
+    score INTEGER NOT NULL DEFAULT 0,
+    created_utc REAL,
+    permalink TEXT,
+    depth INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_comments_episode_created ON comments (season, episode_number, created_utc);
+CREATE INDEX IF NOT EXISTS idx_comments_author ON comments (author);
+CREATE INDEX IF NOT EXISTS idx_comments_score ON comments (score);
+
+-- Per-episode rollups, kept current by the triggers below on every ingest.
+-- Triggers are recreated on connect so databases built by older versions pick up fixes.
+CREATE TABLE IF NOT EXISTS episode_rollups (
+    season INTEGER NOT NULL,
+    episode_number INTEGER NOT NULL,
+    num_posts INTEGER NOT NULL DEFAULT 0,
+    post_score INTEGER NOT NULL DEFAULT 0,
+    num_comments INTEGER NOT NULL DEFAULT 0,
+    comment_count INTEGER NOT NULL DEFAULT 0,
+    comment_score INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (season, episode_number)
+);
+
+DROP TRIGGER IF EXISTS trg_posts_insert;
+CREATE TRIGGER trg_posts_insert AFTER INSERT ON posts BEGIN
+    INSERT INTO episode_rollups (season, episode_number)
+    SELECT NEW.season, NEW.episode_number
+    WHERE NOT EXISTS (SELECT 1 FROM episode_rollups WHERE season = NEW.season AND episode_number = NEW.episode_number);
+    UPDATE episode_rollups
+    SET num_posts = num_posts + 1,
+        post_score = post_score + NEW.score,
+        num_comments = num_comments + NEW.num_comments
+    WHERE season = NEW.season AND episode_number = NEW.episode_number;
+END;
+
+DROP TRIGGER IF EXISTS trg_posts_update;
+CREATE TRIGGER trg_posts_update AFTER UPDATE ON posts BEGIN
+    UPDATE episode_rollups
+    SET num_posts = num_posts - 1,
+        post_score = post_score - OLD.score,
+        num_comments = num_comments - OLD.num_comments
+    WHERE season = OLD.season AND episode_number = OLD.episode_number;
+    INSERT INTO episode_rollups (season, episode_number)
+    SELECT NEW.season, NEW.episode_number
+    WHERE NOT EXISTS (SELECT 1 FROM episode_rollups WHERE season = NEW.season AND episode_number = NEW.episode_number);
+    UPDATE episode_rollups
+    SET num_posts = num_posts + 1,
+        post_score = post_score + NEW.score,
+        num_comments = num_comments + NEW.num_comments
+    WHERE season = NEW.season AND episode_number = NEW.episode_number;
+END;
+
+DROP TRIGGER IF EXISTS trg_posts_delete;
+CREATE TRIGGER trg_posts_delete AFTER DELETE ON posts BEGIN
+    UPDATE episode_rollups
+    SET num_posts = num_posts - 1,
+        post_score = post_score - OLD.score,
+        num_comments = num_comments - OLD.num_comments
+    WHERE season = OLD.season AND episode_number = OLD.episode_number;
+END;
+
+DROP TRIGGER IF EXISTS trg_comments_insert;
+CREATE TRIGGER trg_comments_insert AFTER INSERT ON comments BEGIN
+    INSERT INTO episode_rollups (season, episode_number)
+    SELECT NEW.season, NEW.episode_number
+    WHERE NOT EXISTS (SELECT 1 FROM episode_rollups WHERE season = NEW.season AND episode_number = NEW.episode_number);
+    UPDATE episode_rollups
+    SET comment_count = comment_count + 1,
+        comment_score = comment_score + NEW.score
+    WHERE season = NEW.season AND episode_number = NEW.episode_number;
+END;
+
+DROP TRIGGER IF EXISTS trg_comments_update;
+CREATE TRIGGER trg_comments_update AFTER UPDATE ON comments BEGIN
+    UPDATE episode_rollups
+    SET comment_count = comment_count - 1,
+        comment_score = comment_score - OLD.score
+    WHERE season = OLD.season AND episode_number = OLD.episode_number;
+    INSERT INTO episode_rollups (season, episode_number)
+    SELECT NEW.season, NEW.episode_number
+    WHERE NOT EXISTS (SELECT 1 FROM episode_rollups WHERE season = NEW.season AND episode_number = NEW.episode_number);
+    UPDATE episode_rollups
+    SET comment_count = comment_count + 1,
+        comment_score = comment_score + NEW.score
+    WHERE season = NEW.season AND episode_number = NEW.episode_number;
+END;
+
+DROP TRIGGER IF EXISTS trg_comments_delete;
+CREATE TRIGGER trg_comments_delete AFTER DELETE ON comments BEGIN
+    UPDATE episode_rollups
+    SET comment_count = comment_count - 1,
+        comment_score = comment_score - OLD.score
+    WHERE season = OLD.season AND episode_number = OLD.episode_number;
+END;
+
+-- Full-text indexes over post titles/text and comment bodies. They store no
+-- copy of the text (external content) and are kept in sync by the triggers below,
+-- which are recreated on connect like the rollup triggers.
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    title, selftext, content='posts', content_rowid='pk', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(
+    body, content='comments', content_rowid='pk', tokenize='unicode61 remove_diacritics 2'
+);
+
+DROP TRIGGER IF EXISTS trg_posts_fts_insert;
+CREATE TRIGGER trg_posts_fts_insert AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts (rowid, title, selftext) VALUES (NEW.pk, NEW.title, NEW.selftext);
+END;
+
+DROP TRIGGER IF EXISTS trg_posts_fts_update;
+CREATE TRIGGER trg_posts_fts_update AFTER UPDATE OF title, selftext ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, selftext) VALUES ('delete', OLD.pk, OLD.title, OLD.selftext);
+    INSERT INTO posts_fts (rowid, title, selftext) VALUES (NEW.pk, NEW.title, NEW.selftext);
+END;
+
+DROP TRIGGER IF EXISTS trg_posts_fts_delete;
+CREATE TRIGGER trg_posts_fts_delete AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, selftext) VALUES ('delete', OLD.pk, OLD.title, OLD.selftext);
+END;
+
+DROP TRIGGER IF EXISTS trg_comments_fts_insert;
+CREATE TRIGGER trg_comments_fts_insert AFTER INSERT ON comments BEGIN
+    INSERT INTO comments_fts (rowid, body) VALUES (NEW.pk, NEW.body);
+END;
+
+DROP TRIGGER IF EXISTS trg_comments_fts_update;
+CREATE TRIGGER trg_comments_fts_update AFTER UPDATE OF body ON comments BEGIN
+    INSERT INTO comments_fts (comments_fts, rowid, body) VALUES ('delete', OLD.pk, OLD.body);
+    INSERT INTO comments_fts (rowid, body) VALUES (NEW.pk, NEW.body);
+END;
+
+DROP TRIGGER IF EXISTS trg_comments_fts_delete;
+CREATE TRIGGER trg_comments_fts_delete AFTER DELETE ON comments BEGIN
+    INSERT INTO comments_fts (comments_fts, rowid, body) VALUES ('delete', OLD.pk, OLD.body);
+END;
+"""
+
+SEARCH_MODES = ('term', 'phrase', 'prefix')
+
+POST_COLUMNS = ['id', 'season', 'episode_number', 'title', 'author', 'created_utc',
+                'score', 'num_comments', 'url', 'permalink', 'selftext']
+COMMENT_COLUMNS = ['id', 'season', 'episode_number', 'author', 'body', 'score',
+                   'created_utc', 'permalink', 'depth']
+
+
+def _upsert_sql(table, columns):
+    updates = ', '.join(f"{c} = excluded.{c}" for c in columns if c != 'id')
+    changed = ' OR '.join(f"{c} IS NOT excluded.{c}" for c in columns if c != 'id')
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+        f"ON CONFLICT(id) DO UPDATE SET {updates} WHERE {changed}"
+    )
+
+
+POST_UPSERT = _upsert_sql('posts', POST_COLUMNS)
+COMMENT_UPSERT = _upsert_sql('comments', COMMENT_COLUMNS)
+
+
+# Rollup columns each content table's triggers maintain
+ROLLUP_COLUMNS = {
+    'posts': ['num_posts', 'post_score', 'num_comments'],
+    'comments': ['comment_count', 'comment_score'],
+}
+
+
+def _set_aside_implicit_rowid_tables(conn):
+    """
+    Rename posts/comments tables created without the `pk` column to <table>_old,
+    dropping their indexes, triggers and full-text index so SCHEMA recreates them.
+
+    Returns:
+        list: Names of the tables set aside
+    """
+    set_aside = []
+    for table in ROLLUP_COLUMNS:
+        columns = [row['name'] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if not columns or 'pk' in columns:
+            continue
+        dependents = conn.execute(
+            "SELECT type, name FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') "
+            "AND sql IS NOT NULL", (table,)
+        ).fetchall()
+        with conn:
+            for row in dependents:
+                conn.execute(f"DROP {row['type'].upper()} {row['name']}")
+            conn.execute(f"DROP TABLE IF EXISTS {table}_fts")
+            conn.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+        set_aside.append(table)
+    return set_aside
+
+
+def _restore_set_aside_tables(conn, tables):
+    """Copy the rows of tables set aside by _set_aside_implicit_rowid_tables into the new schema."""
+    for table in tables:
+        columns = ', '.join(POST_COLUMNS if table == 'posts' else COMMENT_COLUMNS)
+        with conn:
+            # The insert triggers add every copied row back into the rollups and full-text index
+            conn.execute(f"UPDATE episode_rollups SET {', '.join(f'{c} = 0' for c in ROLLUP_COLUMNS[table])}")
+            conn.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_old ORDER BY rowid")
+            conn.execute(f"DROP TABLE {table}_old")
+
+
+def connect(db_path='../data/analytics.sqlite'):
+    """
+    Open (and create if needed) the analytics database. Databases created
+    before posts/comments had a `pk` column are migrated on first connect.
+    """
+    conn = sqlite3.connect(str(db_path), check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("PRAGMA synchronous = NORMAL")
+    migrated = _set_aside_implicit_rowid_tables(conn)
+    has_fts = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'comments_fts'").fetchone()
+    conn.executescript(SCHEMA)
+    _restore_set_aside_tables(conn, migrated)
+    if not has_fts:
+        # Index rows ingested before the full-text tables existed
+        with conn:
+            conn.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+            conn.execute("INSERT INTO comments_fts (comments_fts) VALUES ('rebuild')")
+    return conn
+
+
+def ingest_episodes(conn, episodes, season=7):
+    """Insert or update episodes (as returned by parse_episodes_csv)."""
+    with conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO episodes VALUES (?, ?, ?, ?)",
+            [(season, ep['episode_number'], ep['air_date'].strftime('%Y-%m-%d'), ep['air_date_timestamp'])
+             for ep in episodes],
+        )
+
+
+def ingest_posts(conn, posts, season=7):
+    """
+    Upsert posts by id. Each post needs an `episode_number`.
+    Unchanged rows are skipped; changed scores update the rollups in place.
+
+    Returns:
+        int: Number of posts inserted or changed
+    """
+    rows = (
+        tuple({**post, 'season': season}.get(c) for c in POST_COLUMNS)
+        for post in posts
+    )
+    with conn:
+        cursor = conn.executemany(POST_UPSERT, rows)
+    return cursor.rowcount
+
+
+def ingest_assigned_posts(conn, assigned_posts, season=7, batch_size=1000):
+    """
+    Pass (episode_number, post) pairs through unchanged while upserting them
+    into the database in batches, so a streaming parse can feed the database
+    without holding every post in memory.
+    """
+    batch = []
+    for episode_number, post in assigned_posts:
+        batch.append({**post, 'episode_number': episode_number})
+        if len(batch) >= batch_size:
+            ingest_posts(conn, batch, season)
+            batch = []
+        yield episode_number, post
+    if batch:
+        ingest_posts(conn, batch, season)
+
+
+def ingest_comments(conn, comments, episode_number, season=7):
+    """Upsert the comments of one episode by id. Returns the number of rows inserted or changed."""
+    rows = (
+        tuple({**comment, 'season': season, 'episode_number': episode_number}.get(c) for c in COMMENT_COLUMNS)
+        for comment in comments
+        if comment.get('id')  # HTML-scraped comments can lack an id
+    )
+    with conn:
+        cursor = conn.executemany(COMMENT_UPSERT, rows)
+    return cursor.rowcount
+
+
+def ingest_comments_dir(conn, comments_dir='../data/comments', season=7):
+    """Load every comments_episode_N.json(l) in a directory into the database."""
+    total = 0
+    for episode_number, file_path in comment_files(comments_dir).items():
+        total += ingest_comments(conn, iter_comments(file_path), episode_number, season)
+    return total
+
+
+def build_database(data_dir='../data', db_path=None, season=7):
+    """
+    Populate the database from the files in data/: episodes.csv, the posts in
+    reddit_episodes.json (assigned to episodes as in parse_reddit_episodes) and
+    every comments file.
+    """
+    from parse_reddit_episodes import EpisodeIndex, AMBIGUOUS_RANGES, parse_episodes_csv
+
+    data_path = Path(data_dir)
+    conn = connect(db_path or data_path / 'analytics.sqlite')
+
+    episodes = parse_episodes_csv(data_path / 'episodes.csv')
+    ingest_episodes(conn, episodes, season)
+
+    index = EpisodeIndex(episodes, AMBIGUOUS_RANGES)
+    posts = (
+        {**post, 'episode_number': index.assign(post)}
+        for post in iter_posts(data_path / 'reddit_episodes.json')
+    )
+    ingest_posts(conn, posts, season)
+    ingest_comments_dir(conn, data_path / 'comments', season)
+    return conn
+
+
+def episode_rollups(conn, season=7):
+    """Per-episode rollups for a season, joined with air dates."""
+    return [dict(row) for row in conn.execute(
+        """
+        SELECT r.*, e.air_date,
+               r.num_posts + r.num_comments AS num_engagement
+        FROM episode_rollups r
+        LEFT JOIN episodes e USING (season, episode_number)
+        WHERE r.season = ?
+        ORDER BY r.episode_number
+        """,
+        (season,),
+    )]
+
+
+def episode_dashboard(conn, episode_number, season=7, limit=10):
+    """Rollup, top posts and top comments for one episode."""
+    rollup = conn.execute(
+        "SELECT * FROM episode_rollups WHERE season = ? AND episode_number = ?",
+        (season, episode_number),
+    ).fetchone()
+    top_posts = conn.execute(
+        """
+        SELECT id, title, author, score, num_comments, permalink FROM posts
+        WHERE season = ? AND episode_number = ? ORDER BY score DESC LIMIT ?
+        """,
+        (season, episode_number, limit),
+    ).fetchall()
+    top_comments = conn.execute(
+        """
+        SELECT id, author, body, score, created_utc, permalink FROM comments
+        WHERE season = ? AND episode_number = ? ORDER BY score DESC LIMIT ?
+        """,
+        (season, episode_number, limit),
+    ).fetchall()
+    return {
+        'season': season,
+        'episode_number': episode_number,
+        'rollup': dict(rollup) if rollup else None,
+        'top_posts': [dict(row) for row in top_posts],
+        'top_comments': [dict(row) for row in top_comments],
+    }
+
+
+def author_activity(conn, author, limit=50):
+    """Posts and comments written by one author, newest first."""
+    posts = conn.execute(
+        "SELECT id, season, episode_number, title, score, created_utc FROM posts "
+        "WHERE author = ? ORDER BY created_utc DESC LIMIT ?",
+        (author, limit),
+    ).fetchall()
+    comments = conn.execute(
+        "SELECT id, season, episode_number, body, score, created_utc FROM comments "
+        "WHERE author = ? ORDER BY created_utc DESC LIMIT ?",
+        (author, limit),
+    ).fetchall()
+    return {
+        'author': author,
+        'posts': [dict(row) for row in posts],
+        'comments': [dict(row) for row in comments],
+    }
+
+
+
+def match_expression(query, mode='term'):
+    """
+    Build an FTS5 MATCH expression from user input.
+
+    Args:
+        query: Search text, e.g. 'recoupling' or 'bailey dumped'
+        mode: 'term' (every word must appear), 'phrase' (the words in order)
+            or 'prefix' (every word as a prefix, e.g. 'recoupl' finds 'recoupling')
+    """
+    if mode not in SEARCH_MODES:
+        raise ValueError(f"Unknown search mode {mode!r}, expected one of {SEARCH_MODES}")
+    words = [word.replace('"', '""') for word in query.split()]
+    if not words:
+        raise ValueError("Empty search query")
+    # Quote the words so FTS5 operators in the input are searched for literally
+    if mode == 'phrase':
+        return '"' + ' '.join(words) + '"'
+    if mode == 'prefix':
+        return ' '.join(f'"{word}"*' for word in words)
+    return ' '.join(f'"{word}"' for word in words)
+
+
+def search_mentions(conn, query, mode='term', season=None):
+    """
+    Number of matching comments and posts per episode.
+
+    Returns:
+        list: {season, episode_number, comment_hits, post_hits, total_hits} per
+        episode with at least one hit, in episode order
+    """
+    match = match_expression(query, mode)
+    season_filter = "AND t.season = ?" if season is not None else ""
+    args = (match, season) if season is not None else (match,)
+    hits = {}
+    for table, column in (('comments', 'comment_hits'), ('posts', 'post_hits')):
+        rows = conn.execute(
+            f"""
+            SELECT t.season, t.episode_number, COUNT(*) AS hits
+            FROM {table}_fts f JOIN {table} t ON t.pk = f.rowid
+            WHERE {table}_fts MATCH ? {season_filter}
+            GROUP BY t.season, t.episode_number
+            """,
+            args,
+        )
+        for row in rows:
+            key = (row['season'], row['episode_number'])
+            entry = hits.setdefault(key, {'season': key[0], 'episode_number': key[1],
+                                          'comment_hits': 0, 'post_hits': 0})
+            entry[column] = row['hits']
+    for entry in hits.values():
+        entry['total_hits'] = entry['comment_hits'] + entry['post_hits']
+    return [hits[key] for key in sorted(hits)]
+
+
+def search_top(conn, query, mode='term', season=None, limit=10):
+    """Highest-scored comments and posts matching a query, with highlighted snippets."""
+    match = match_expression(query, mode)
+    season_filter = "AND t.season = ?" if season is not None else ""
+    args = (match, season, limit) if season is not None else (match, limit)
+    top_comments = conn.execute(
+        f"""
+        SELECT t.id, t.season, t.episode_number, t.author, t.score, t.created_utc, t.permalink,
+               snippet(comments_fts, 0, '[', ']', '...', 16) AS snippet
+        FROM comments_fts JOIN comments t ON t.pk = comments_fts.rowid
+        WHERE comments_fts MATCH ? {season_filter}
+        ORDER BY t.score DESC LIMIT ?
+        """,
+        args,
+    ).fetchall()
+    top_posts = conn.execute(
+        f"""
+        SELECT t.id, t.season, t.episode_number, t.title, t.author, t.score, t.permalink,
+               snippet(posts_fts, -1, '[', ']', '...', 16) AS snippet
+        FROM posts_fts JOIN posts t ON t.pk = posts_fts.rowid
+        WHERE posts_fts MATCH ? {season_filter}
+        ORDER BY t.score DESC LIMIT ?
+        """,
+        args,
+    ).fetchall()
+    return {
+        'top_comments': [dict(row) for row in top_comments],
+        'top_posts': [dict(row) for row in top_posts],
+    }
+
+if __name__ == "__main__":
+    conn = build_database("../data")
+    for row in episode_rollups(conn):
+        print(row)
@@ -0,0 +1,106 @@
+import sys
+from collections.abc import Mapping
+
+from json_stream import comment_files, iter_comments
+
+FIELDS = ('id', 'author', 'body', 'score', 'created_utc', 'permalink', 'depth')
+
+
+class Comment(Mapping):
+    """
+    Compact comment record with the same fields as our comment dicts.
+
+    Uses __slots__ instead of a per-comment dict, interns author names (a few
+    regulars write most comments) and stores the permalink as a shared,
+    interned thread URL plus the comment id, rebuilding the string on access.
+    Permalinks that don't follow the `<thread url><id>/` form are kept as is.
+
+    It is a read-only Mapping, so `c['score']`, `c.get('id')`, `dict(c)` and
+    `{**c}` keep working; use `to_dict()` (or `json_default`) to serialise.
+    """
+
+    __slots__ = ('id', 'author', 'body', 'score', 'created_utc', 'depth', '_thread', '_permalink')
+
+    def __init__(self, id, author, body, score, created_utc, permalink, depth):
+        self.id = id
+        self.author = sys.intern(author) if isinstance(author, str) else author
+        self.body = body
+        self.score = score
+        self.created_utc = created_utc
+        self.depth = depth
+
+        suffix = f"{id}/"
+        if id and permalink and permalink.endswith(suffix):
+            self._thread = sys.intern(permalink[:-len(suffix)])
+            self._permalink = None
+        else:
+            self._thread = None
+            self._permalink = permalink
+
+    @classmethod
+    def from_reddit(cls, comment_data, depth):
+        """Build a comment from the `data` of a Reddit t1 thing."""
+        return cls(
+            comment_data.get('id'),
+            comment_data.get('author'),
+            comment_data.get('body', ''),
+            comment_data.get('score', 0),
+            comment_data.get('created_utc'),
+            f"https://www.reddit.com{comment_data.get('permalink', '')}",
+            depth,
+        )
+
+    @classmethod
+    def from_dict(cls, record):
+        """Build a comment from a comment dict as stored in comments_episode_N.json(l)."""
+        return cls(*(record.get(field) for field in FIELDS))
+
+    @property
+    def permalink(self):
+        if self._thread is None:
+            return self._permalink
+        return f"{self._thread}{self.id}/"
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in FIELDS}
+
+    def __getitem__(self, key):
+        if key not in FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(FIELDS)
+
+    def __len__(self):
+        return len(FIELDS)
+
+    def __getstate__(self):
+        return tuple(getattr(self, slot) for slot in self.__slots__)
+
+    def __setstate__(self, state):
+        for slot, value in zip(self.__slots__, state):
+            setattr(self, slot, value)
+
+    def __repr__(self):
+        return f"Comment(id={self.id!r}, author={self.author!r}, score={self.score!r}, depth={self.depth!r})"
+
+
+def json_default(obj):
+    """`default=` hook for json.dump(s) that writes Comment records as plain dicts."""
+    if isinstance(obj, Comment):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def load_comment_archive(comments_dir='../data/comments'):
+    """
+    Load every comments file in a directory as compact records.
+
+    Returns:
+        dict: Episode number to list of Comment
+    """
+    return {
+        episode_number: [Comment.from_dict(record) for record in iter_comments(file_path)]
+        for episode_number, file_path in comment_files(comments_dir).items()
+    }
@@ -0,0 +1,198 @@
+"""
+Comment engagement over time, relative to each episode's air time.
+
+Comments are binned by minutes/hours since the episode aired with NumPy
+(np.bincount over integer bin offsets). Each episode keeps a running histogram
+that new comments are added to, so a live refresh only bins the new comments
+instead of the whole history.
+
+Metrics per episode:
+- rolling(window): comments in the trailing `window` bins at every bin
+- time_to_half: time after air until half of the comments so far were written
+- peak_rate: highest comments per hour in any bin, and when it happened
+"""
+
+from datetime import datetime, time
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+from json_stream import comment_files, iter_comments
+
+HOUR = 3600
+# Episodes air at 7:30pm Sydney time; episodes.csv only has the date
+AIR_TIME = time(19, 30)
+AIR_TIMEZONE = 'Australia/Sydney'
+
+
+def air_timestamp(air_date, air_time=AIR_TIME, timezone=AIR_TIMEZONE):
+    """Unix timestamp of the broadcast on `air_date` at `air_time` in `timezone`."""
+    return datetime.combine(air_date.date(), air_time, tzinfo=ZoneInfo(timezone)).timestamp()
+
+
+def bin_offsets(created_utc, air_timestamp, bin_seconds=HOUR):
+    """
+    Bin index of each timestamp, counted in `bin_seconds` from air time.
+    Negative indexes are comments written before the episode aired.
+    """
+    created_utc = np.asarray(created_utc, dtype=np.float64)
+    return np.floor((created_utc - air_timestamp) / bin_seconds).astype(np.int64)
+
+
+class EngagementSeries:
+    """
+    Running comment histogram of one episode.
+
+    `counts[i]` is the number of comments written in [i, i + 1) bins after air
+    time; comments from before air time are only counted in `before_air`.
+    Comment ids already added are remembered, so re-adding a refreshed thread
+    only counts its new comments.
+    """
+
+    def __init__(self, air_timestamp, bin_seconds=HOUR):
+        self.air_timestamp = air_timestamp
+        self.bin_seconds = bin_seconds
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.before_air = 0
+        self.seen_ids = set()
+
+    def add(self, ids, created_utc):
+        """
+        Add comments to the histogram. Comments without a timestamp or already
+        seen are skipped; comments without an id are always counted.
+
+        Returns:
+            int: Number of comments added
+        """
+        new_times = []
+        for comment_id, timestamp in zip(ids, created_utc):
+            if timestamp is None:
+                continue
+            if comment_id:
+                if comment_id in self.seen_ids:
+                    continue
+                self.seen_ids.add(comment_id)
+            new_times.append(timestamp)
+        if not new_times:
+            return 0
+
+        offsets = bin_offsets(new_times, self.air_timestamp, self.bin_seconds)
+        after_air = offsets[offsets >= 0]
+        self.before_air += len(offsets) - len(after_air)
+        if len(after_air):
+            new_counts = np.bincount(after_air)
+            if len(new_counts) > len(self.counts):
+                self.counts = np.pad(self.counts, (0, len(new_counts) - len(self.counts)))
+            self.counts[:len(new_counts)] += new_counts
+        return len(new_times)
+
+    def add_comments(self, comments):
+        """Add comment dicts (or Comment records)."""
+        comments = list(comments)
+        return self.add([c['id'] for c in comments], [c['created_utc'] for c in comments])
+
+    @property
+    def total(self):
+        return int(self.counts.sum())
+
+    def rolling(self, window):
+        """Comments in the trailing `window` bins ending at each bin."""
+        cumulative = np.concatenate(([0], np.cumsum(self.counts)))
+        ends = np.arange(1, len(cumulative))
+        return cumulative[ends] - cumulative[np.maximum(ends - window, 0)]
+
+    def time_to_half(self):
+        """Seconds after air time by which half of the comments had been written (bin resolution)."""
+        if self.total == 0:
+            return None
+        half_bin = int(np.searchsorted(np.cumsum(self.counts), self.total / 2))
+        return (half_bin + 1) * self.bin_seconds
+
+    def peak_rate(self):
+        """
+        Returns:
+            tuple: (comments per hour in the busiest bin, seconds after air time
+            that bin starts), or (0.0, None) without comments
+        """
+        if self.total == 0:
+            return 0.0, None
+        peak_bin = int(np.argmax(self.counts))
+        return float(self.counts[peak_bin]) * HOUR / self.bin_seconds, peak_bin * self.bin_seconds
+
+    def to_frame(self, window=None):
+        """Histogram as a DataFrame with offset_hours and count (and a rolling column)."""
+        frame = pd.DataFrame({
+            'offset_hours': np.arange(len(self.counts)) * self.bin_seconds / HOUR,
+            'count': self.counts,
+        })
+        if window:
+            frame[f'rolling_{window}'] = self.rolling(window)
+        return frame
+
+
+class EngagementTracker:
+    """Running engagement histograms for every episode of a season."""
+
+    def __init__(self, episodes, bin_seconds=HOUR, air_time=AIR_TIME, timezone=AIR_TIMEZONE):
+        """
+        Args:
+            episodes: Episodes as returned by parse_episodes_csv
+            bin_seconds: Bin width (60 for minute bins, 3600 for hour bins)
+            air_time: Local broadcast time (datetime.time) on each air date
+            timezone: IANA timezone of the broadcast, independent of this machine's
+        """
+        self.series = {
+            ep['episode_number']: EngagementSeries(air_timestamp(ep['air_date'], air_time, timezone),
+                                                   bin_seconds)
+            for ep in episodes
+        }
+
+    def add_comments(self, episode_number, comments):
+        """Add new (or refreshed) comments of one episode. Returns the number counted."""
+        return self.series[episode_number].add_comments(comments)
+
+    def add_comments_dir(self, comments_dir='../data/comments'):
+        """Add every comments_episode_N.json(l) file in a directory."""
+        added = 0
+        for episode_number, file_path in comment_files(comments_dir).items():
+            if episode_number in self.series:
+                added += self.add_comments(episode_number, iter_comments(file_path))
+        return added
+
+    def summary(self):
+        """
+        Returns:
+            DataFrame: One row per episode with the comment total, comments
+            before air time, time to half engagement and peak rate
+        """
+        rows = []
+        for episode_number, series in sorted(self.series.items()):
+            peak_rate, peak_offset = series.peak_rate()
+            time_to_half = series.time_to_half()
+            rows.append({
+                'episode_number': episode_number,
+                'timed_comments': series.total,
+                'comments_before_air': series.before_air,
+                'time_to_half_hours': time_to_half / HOUR if time_to_half is not None else None,
+                'peak_rate_per_hour': peak_rate,
+                'peak_offset_hours': peak_offset / HOUR if peak_offset is not None else None,
+            })
+        return pd.DataFrame(rows)
+
+    def timeline(self, window=None):
+        """All episodes' histograms in long format, with an episode_number column."""
+        frames = []
+        for episode_number, series in sorted(self.series.items()):
+            frame = series.to_frame(window)
+            frame.insert(0, 'episode_number', episode_number)
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
+
+
+if __name__ == "__main__":
+    from parse_reddit_episodes import parse_episodes_csv
+
+    tracker = EngagementTracker(parse_episodes_csv("../data/episodes.csv"))
+    tracker.add_comments_dir("../data/comments")
+    print(tracker.summary().to_string(index=False))
@@ -0,0 +1,135 @@
+"""
+Performance metrics:
+- num_engagement = number of posts + number of comments
+- homogeneity_score = score / num_posts
+- homogeneity_score_sd = standard deviation of individual post scores / num_posts
+- cumulative_engagement = running total of num_engagement across episodes
+
+Comment-level metrics (from data/comments):
+- comment_count, comment_score_sum, comment_score_mean, comment_score_sd
+
+Sentiment metrics (when posts/comments carry a `sentiment` column, see sentiment.py):
+- sentiment_mean, sentiment_sd = mean / standard deviation of comment sentiment
+- post_sentiment_mean = mean sentiment of post titles and text
+"""
+
+import re
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from json_stream import comment_files, iter_comments
+from metrics import inc, observe
+
+# Post columns compute_episode_analytics needs
+POST_COLUMNS = ['episode_number', 'id', 'score', 'num_comments']
+
+
+def load_posts(data_dir='../data', columns=None):
+    """
+    Load every episode's posts into a single DataFrame with an `episode_number` column.
+
+    Reads the Parquet dataset under `data_dir/parquet/posts` if it exists, otherwise
+    the per-episode reddit_episode_N.csv files.
+
+    Args:
+        data_dir: Directory with reddit_episode_N.csv (or parquet/posts)
+        columns: Extra columns to read from the Parquet dataset besides those
+            compute_episode_analytics needs, e.g. ['title', 'selftext'] for
+            sentiment scoring (the CSVs are always read in full)
+    """
+    data_path = Path(data_dir)
+    parquet_path = data_path / 'parquet' / 'posts'
+    projection = POST_COLUMNS + [c for c in (columns or []) if c not in POST_COLUMNS]
+    if parquet_path.exists():
+        from storage import read_dataset
+
+        return read_dataset(parquet_path, columns=projection).to_pandas()
+
+    frames = []
+    for file_path in sorted(data_path.glob('reddit_episode_*.csv')):
+        # Extract episode number from filename (e.g., reddit_episode_1.csv -> 1)
+        match = re.search(r'reddit_episode_(\d+)\.csv', file_path.name)
+        if match:
+            df = pd.read_csv(file_path)
+            df['episode_number'] = int(match.group(1))
+            frames.append(df)
+
+    if not frames:
+        return pd.DataFrame(columns=projection)
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_comments(comments_dir='../data/comments'):
+    """
+    Load every episode's comments into a single DataFrame with an `episode_number` column.
+    Uses the full harvested comments_episode_N.jsonl where present, else comments_episode_N.json.
+    """
+    rows = []
+    for episode_number, file_path in comment_files(comments_dir).items():
+        for comment in iter_comments(file_path):
+            rows.append({'episode_number': episode_number, **comment})
+
+    if not rows:
+        return pd.DataFrame(columns=['episode_number', 'id', 'score'])
+    return pd.DataFrame(rows)
+
+
+def compute_episode_analytics(posts, comments=None):
+    """
+    Compute every per-episode metric in one groupby pass.
+
+    Args:
+        posts: DataFrame from load_posts (optionally with a `sentiment` column)
+        comments: DataFrame from load_comments (optional, optionally with a `sentiment` column)
+
+    Returns:
+        DataFrame: One row per episode, sorted by episode_number
+    """
+    start = time.perf_counter()
+    grouped = posts.groupby('episode_number')
+    episode_analytics = grouped.agg(
+        num_posts=('score', 'size'),
+        num_comments=('num_comments', 'sum'),
+        score=('score', 'sum'),
+    )
+
+    episode_analytics['num_engagement'] = episode_analytics['num_posts'] + episode_analytics['num_comments']
+    episode_analytics['homogeneity_score'] = episode_analytics['score'] / episode_analytics['num_posts']
+    # std(scores / num_posts) == std(scores) / num_posts (population standard deviation)
+    episode_analytics['homogeneity_score_sd'] = (
+        grouped['score'].std(ddof=0) / episode_analytics['num_posts']
+    )
+
+    episode_analytics = episode_analytics.sort_index()
+    episode_analytics['cumulative_engagement'] = episode_analytics['num_engagement'].cumsum()
+
+    if 'sentiment' in posts.columns:
+        episode_analytics['post_sentiment_mean'] = grouped['sentiment'].mean()
+
+    if comments is not None and len(comments):
+        comment_scores = comments.groupby('episode_number')['score']
+        comment_stats = pd.DataFrame({
+            'comment_count': comment_scores.size(),
+            'comment_score_sum': comment_scores.sum(),
+            'comment_score_mean': comment_scores.mean(),
+            'comment_score_sd': comment_scores.std(ddof=0),
+        })
+        if 'sentiment' in comments.columns:
+            comment_sentiment = comments.groupby('episode_number')['sentiment']
+            comment_stats['sentiment_mean'] = comment_sentiment.mean()
+            comment_stats['sentiment_sd'] = comment_sentiment.std(ddof=0)
+        episode_analytics = episode_analytics.join(comment_stats)
+        episode_analytics[['comment_count', 'comment_score_sum']] = (
+            episode_analytics[['comment_count', 'comment_score_sum']].fillna(0).astype('int64')
+        )
+
+    observe('aggregate_seconds', time.perf_counter() - start)
+    inc('aggregate_rows_total', len(posts) + (len(comments) if comments is not None else 0))
+    return episode_analytics.reset_index()
+
+
+if __name__ == "__main__":
+    episode_analytics = compute_episode_analytics(load_posts("../data"), load_comments("../data/comments"))
+    print(episode_analytics.to_string(index=False))
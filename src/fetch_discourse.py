@@ -1,10 +1,25 @@
-import requests
+import asyncio
 import json
-import time
 import re
 from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
+from urllib.parse import urlparse
+
+try:
+    from lxml import html as lxml_html
+except ImportError:  # fall back to BeautifulSoup's html.parser
+    lxml_html = None
+
+from analytics_db import connect, ingest_comments
+from comments import Comment, json_default
+from http_cache import ResponseCache
+from http_client import (FetchError, PermanentError, TokenBucket, TransientError, get, make_session,
+                         set_default_cache)
+from incremental import load_state, merge_records, save_state, update_high_water
+from json_stream import iter_comments
+from metrics import inc, timer, write_metrics
 
 discussion_threads = {
     'Episode 1': 'https://www.reddit.com/r/LoveIslandAus/comments/1oh7qjr/season_7_episode_1_monday_27th_october_discussion/',
@@ -30,185 +45,667 @@ discussion_threads = {
 }
 
 
-def fetch_comments_from_reddit_json(url, max_comments=100):
+def comment_record(comment_data, depth):
+    """Build our compact comment record from the `data` of a Reddit t1 thing."""
+    return Comment.from_reddit(comment_data, depth)
+
+
+def get_json(url, session=None, limiter=None, **kwargs):
+    """
+    GET a Reddit JSON endpoint and decode it.
+    
+    Raises:
+        TransientError: The body is not JSON (e.g. an HTML interstitial)
+        FetchError: The request failed (see http_client)
+    """
+    response = get(url, session=session, limiter=limiter, timeout=15, **kwargs)
+    try:
+        return response.json()
+    except ValueError as e:
+        raise TransientError(f"Invalid JSON from {url}: {e}", url=url)
+
+
+def listing_children(data, url):
+    """
+    Top-level comment things of a thread's [post listing, comment listing] JSON,
+    or an empty list if it has no comment listing.
+    
+    Raises:
+        PermanentError: The JSON is not shaped like a thread
+    """
+    try:
+        if len(data) < 2 or 'data' not in data[1]:
+            return []
+        return data[1]['data']['children']
+    except (KeyError, IndexError, TypeError) as e:
+        raise PermanentError(f"Unexpected thread JSON from {url}: {e!r}", url=url)
+
+
+def fetch_comments_from_reddit_json(url, max_comments=100, session=None, limiter=None):
     """
     Fetch comments using Reddit's JSON API (more reliable than HTML scraping).
     Returns list of comments sorted by score (top comments first).
+    
+    Raises:
+        FetchError: The thread could not be fetched (see http_client)
     """
     # Use Reddit's JSON API
     json_url = url.rstrip('/') + '.json'
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-    }
+    data = get_json(json_url, session, limiter)
+    
+    comments = []
     
+    # Reddit JSON structure: [0] is the post, [1] is comments
+    comments_data = listing_children(data, json_url)
+    if comments_data:
+        def extract_comments(children, depth=0):
+            """Recursively extract comments from nested structure"""
+            extracted = []
+            for item in children:
+                if item.get('kind') == 't1':  # t1 = comment
+                    comment_data = item.get('data', {})
+                    extracted.append(comment_record(comment_data, depth))
+                    
+                    # Recursively get replies
+                    if comment_data.get('replies') and isinstance(comment_data['replies'], dict):
+                        if 'data' in comment_data['replies']:
+                            extracted.extend(extract_comments(
+                                comment_data['replies']['data']['children'], 
+                                depth + 1
+                            ))
+            return extracted
+        
+        all_comments = extract_comments(comments_data)
+        
+        # Sort by score (highest first) and take top N
+        all_comments.sort(key=lambda x: x['score'], reverse=True)
+        comments = all_comments[:max_comments]
+    
+    return comments
+
+
+SCORE_PATTERN = re.compile(r'(\d+)')
+
+
+def parse_score(score_text):
+    """Parse score (handles "123 points" or just "123")"""
+    score = 0
+    if score_text and score_text != '•':
+        score_match = SCORE_PATTERN.search(score_text.replace(',', ''))
+        if score_match:
+            score = int(score_match.group(1))
+    return score
+
+
+def parse_timestamp(datetime_attr):
+    """Unix timestamp of an old.reddit <time datetime="2025-10-27T09:10:11+00:00"> attribute."""
     try:
-        response = requests.get(json_url, headers=headers, timeout=15)
-        response.raise_for_status()
-        data = response.json()
+        return datetime.fromisoformat(datetime_attr).timestamp()
+    except (TypeError, ValueError):
+        return None
+
+
+def absolute_old_reddit_url(permalink):
+    if permalink and not permalink.startswith('http'):
+        permalink = f"https://old.reddit.com{permalink}"
+    return permalink
+
+
+def _has_class(element, name):
+    return name in (element.get('class') or '').split()
+
+
+def _parse_comments_lxml(html):
+    """Parse old.reddit comment entries with lxml, in one walk over each entry's own elements."""
+    root = lxml_html.fromstring(html)
+    comments = []
+    
+    for entry in root.iter('div'):
+        if not _has_class(entry, 'comment'):
+            continue
         
-        comments = []
+        # The comment's own content lives in its div.entry; replies are in a sibling div.child
+        body_text, author, score_text, permalink, created_utc = '', None, None, '', None
+        for entry_div in entry.iterchildren('div'):
+            if not _has_class(entry_div, 'entry'):
+                continue
+            for element in entry_div.iter('div', 'a', 'span', 'time'):
+                if element.tag == 'div' and not body_text and _has_class(element, 'usertext-body'):
+                    body_text = ''.join(text.strip() for text in element.itertext())
+                elif element.tag == 'a' and author is None and _has_class(element, 'author'):
+                    author = element.text_content().strip()
+                elif element.tag == 'span' and score_text is None and _has_class(element, 'score'):
+                    score_text = element.text_content().strip()
+                elif element.tag == 'a' and not permalink and _has_class(element, 'bylink'):
+                    permalink = element.get('href', '')
+                elif element.tag == 'time' and created_utc is None:
+                    # The first <time> is the post time; an edited-timestamp may follow
+                    created_utc = parse_timestamp(element.get('datetime'))
+            break
         
-        # Reddit JSON structure: [0] is the post, [1] is comments
-        if len(data) >= 2 and 'data' in data[1]:
-            comments_data = data[1]['data']['children']
+        comments.append(Comment(
+            entry.get('data-fullname', '').replace('t1_', ''),
+            author or '[deleted]',
+            body_text,
+            parse_score(score_text or '0'),
+            created_utc,
+            absolute_old_reddit_url(permalink),
+            0  # Would need to calculate from nesting
+        ))
+    
+    return comments
+
+
+def _parse_comments_bs4(html):
+    """Parse old.reddit comment entries with BeautifulSoup's pure-Python parser."""
+    soup = BeautifulSoup(html, 'html.parser')
+    comments = []
+    
+    # Find comment entries (old Reddit structure)
+    for entry in soup.find_all('div', class_='comment'):
+        try:
+            # Extract comment text
+            comment_body = entry.find('div', class_='usertext-body')
+            body_text = comment_body.get_text(strip=True) if comment_body else ''
             
-            def extract_comments(children, depth=0):
-                """Recursively extract comments from nested structure"""
-                extracted = []
-                for item in children:
-                    if item.get('kind') == 't1':  # t1 = comment
-                        comment_data = item.get('data', {})
-                        comment = {
-                            'id': comment_data.get('id'),
-                            'author': comment_data.get('author'),
-                            'body': comment_data.get('body', ''),
-                            'score': comment_data.get('score', 0),
-                            'created_utc': comment_data.get('created_utc'),
-                            'permalink': f"https://www.reddit.com{comment_data.get('permalink', '')}",
-                            'depth': depth
-                        }
-                        extracted.append(comment)
-                        
-                        # Recursively get replies
-                        if comment_data.get('replies') and isinstance(comment_data['replies'], dict):
-                            if 'data' in comment_data['replies']:
-                                extracted.extend(extract_comments(
-                                    comment_data['replies']['data']['children'], 
-                                    depth + 1
-                                ))
-                return extracted
+            # Extract author
+            author_tag = entry.find('a', class_='author')
+            author = author_tag.get_text(strip=True) if author_tag else '[deleted]'
             
-            all_comments = extract_comments(comments_data)
+            # Extract score
+            score_tag = entry.find('span', class_='score')
+            score_text = score_tag.get_text(strip=True) if score_tag else '0'
             
-            # Sort by score (highest first) and take top N
-            all_comments.sort(key=lambda x: x['score'], reverse=True)
-            comments = all_comments[:max_comments]
-        
-        return comments
-        
-    except Exception as e:
-        print(f"Error fetching JSON: {e}")
-        return []
+            # Extract permalink
+            permalink_tag = entry.find('a', class_='bylink')
+            permalink = permalink_tag.get('href', '') if permalink_tag else ''
+            
+            # Extract timestamp (the first <time> is the post time)
+            time_tag = entry.find('time')
+            created_utc = parse_timestamp(time_tag.get('datetime')) if time_tag else None
+            
+            comments.append(Comment(
+                entry.get('data-fullname', '').replace('t1_', ''),
+                author,
+                body_text,
+                parse_score(score_text),
+                created_utc,
+                absolute_old_reddit_url(permalink),
+                0  # Would need to calculate from nesting
+            ))
+        except Exception as e:
+            print(f"Error parsing comment: {e}")
+            continue
+    
+    return comments
 
 
-def fetch_comments_with_beautifulsoup(url, max_comments=100):
+def parse_old_reddit_comments(html, max_comments=100):
     """
-    Fetch comments using BeautifulSoup (for old.reddit.com which is more scrapeable).
-    Falls back to JSON API if BeautifulSoup approach fails.
+    Parse the comments of an old.reddit.com thread page.
+    
+    Uses lxml when it is installed and BeautifulSoup's html.parser otherwise.
+    This is a pure function of the page, so it can run in a process pool (parse
+    metrics recorded there stay in the worker's own registry).
+    
+    Returns:
+        list: Top `max_comments` comments with text, sorted by score
+    """
+    parser = 'lxml' if lxml_html is not None else 'bs4'
+    with timer('parse_page_seconds', parser=parser):
+        if lxml_html is not None:
+            comments = _parse_comments_lxml(html)
+        else:
+            comments = _parse_comments_bs4(html)
+    inc('comments_parsed_total', len(comments), parser=parser)
+    
+    # Only keep comments with text, among the first max_comments entries on the page
+    comments = [c for c in comments[:max_comments] if c['body']]
+    
+    # Sort by score and take top N
+    comments.sort(key=lambda x: x['score'], reverse=True)
+    return comments[:max_comments]
+
+
+def fetch_comments_with_beautifulsoup(url, max_comments=100, session=None, limiter=None):
+    """
+    Fetch comments by scraping old.reddit.com (which is more scrapeable).
+    
+    Raises:
+        FetchError: The page could not be fetched (see http_client)
     """
     # Convert to old.reddit.com for easier scraping
     old_reddit_url = url.replace('www.reddit.com', 'old.reddit.com')
     
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-    }
+    response = get(old_reddit_url, session=session, limiter=limiter, timeout=15)
+    return parse_old_reddit_comments(response.content, max_comments)
+
+
+def iter_thread_comments(url, session=None, limiter=None, batch_size=100, skip_ids=None, sort=None):
+    """
+    Yield every comment of a thread, expanding "more" stubs.
+    
+    The tree is walked iteratively with an explicit stack, so deep reply chains
+    cannot hit the recursion limit. Collapsed "more" stubs are queued and expanded
+    through /api/morechildren with up to `batch_size` ids per request; "continue
+    this thread" stubs (a "more" with no children) are fetched from the parent
+    comment's permalink.
+    
+    Args:
+        url: Discussion thread URL
+        session: requests.Session to use (optional)
+        limiter: TokenBucket shared with other fetchers (optional)
+        batch_size: Maximum comment ids per /api/morechildren request (Reddit caps this at 100)
+        skip_ids: Comment ids already stored; "more" stubs for them are not expanded
+        sort: Comment sort passed to Reddit (e.g. 'new' for incremental refreshes)
+    
+    Yields:
+        Comment: Compact comment record (see comments.py)
+    
+    Raises:
+        FetchError: A request failed, or returned something other than thread JSON
+    """
+    thread_url = url.rstrip('/')
+    # "more" stubs are expanded on the thread's own host
+    parsed_url = urlparse(thread_url)
+    host = f"{parsed_url.scheme}://{parsed_url.netloc}"
+    skip_ids = skip_ids or set()
+    params = {'limit': 500, 'raw_json': 1}
+    if sort:
+        params['sort'] = sort
+    json_url = thread_url + '.json'
+    data = get_json(json_url, session, limiter, params=params)
+    children = listing_children(data, json_url)
+    if not children:
+        return
     
     try:
-        response = requests.get(old_reddit_url, headers=headers, timeout=15)
-        response.raise_for_status()
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        comments = []
-        
-        # Find comment entries (old Reddit structure)
-        comment_entries = soup.find_all('div', class_='comment')
+        link_id = data[0]['data']['children'][0]['data']['name']
+    except (KeyError, IndexError, TypeError) as e:
+        raise PermanentError(f"Unexpected thread JSON from {json_url}: {e!r}", url=json_url)
+    seen = set()
+    pending_ids = []
+    continue_parents = []
+    stack = [(item, 0, 0) for item in reversed(children)]
+    
+    while stack or pending_ids or continue_parents:
+        while stack:
+            item, depth, offset = stack.pop()
+            kind = item.get('kind')
+            item_data = item.get('data', {})
+            # Depths reported by Reddit are relative to the page the item came from
+            if 'depth' in item_data:
+                depth = item_data['depth'] + offset
+            
+            if kind == 't1':
+                comment_id = item_data.get('id')
+                # Comments without an id can't be told apart, so they are never deduplicated
+                if not comment_id or comment_id not in seen:
+                    seen.add(comment_id)
+                    yield comment_record(item_data, depth)
+                replies = item_data.get('replies')
+                if isinstance(replies, dict) and 'data' in replies:
+                    stack.extend((child, depth + 1, offset) for child in reversed(replies['data']['children']))
+            elif kind == 'more':
+                if item_data.get('children'):
+                    pending_ids.extend(i for i in item_data['children'] if i not in skip_ids)
+                elif item_data.get('parent_id', '').startswith('t1_'):
+                    continue_parents.append((item_data['parent_id'][3:], depth - 1))
         
-        for entry in comment_entries[:max_comments]:
+        if pending_ids:
+            batch, pending_ids = pending_ids[:batch_size], pending_ids[batch_size:]
+            more_url = f"{host}/api/morechildren.json"
+            more_data = get_json(more_url, session, limiter,
+                                 params={'api_type': 'json', 'link_id': link_id,
+                                         'children': ','.join(batch), 'limit_children': 'false',
+                                         'raw_json': 1})
             try:
-                # Extract comment text
-                comment_body = entry.find('div', class_='usertext-body')
-                body_text = comment_body.get_text(strip=True) if comment_body else ''
-                
-                # Extract author
-                author_tag = entry.find('a', class_='author')
-                author = author_tag.get_text(strip=True) if author_tag else '[deleted]'
-                
-                # Extract score
-                score_tag = entry.find('span', class_='score')
-                score_text = score_tag.get_text(strip=True) if score_tag else '0'
-                # Parse score (handles "123 points" or just "123")
-                score = 0
-                if score_text and score_text != '•':
-                    score_match = re.search(r'(\d+)', score_text.replace(',', ''))
-                    if score_match:
-                        score = int(score_match.group(1))
-                
-                # Extract permalink
-                permalink_tag = entry.find('a', class_='bylink')
-                permalink = permalink_tag.get('href', '') if permalink_tag else ''
-                if permalink and not permalink.startswith('http'):
-                    permalink = f"https://old.reddit.com{permalink}"
-                
-                comment = {
-                    'id': entry.get('data-fullname', '').replace('t1_', ''),
-                    'author': author,
-                    'body': body_text,
-                    'score': score,
-                    'created_utc': None,  # Hard to extract from HTML
-                    'permalink': permalink,
-                    'depth': 0  # Would need to calculate from nesting
-                }
-                
-                if body_text:  # Only add if comment has text
-                    comments.append(comment)
-                    
-            except Exception as e:
-                print(f"Error parsing comment: {e}")
-                continue
-        
-        # Sort by score and take top N
-        comments.sort(key=lambda x: x['score'], reverse=True)
-        return comments[:max_comments]
-        
-    except Exception as e:
-        print(f"BeautifulSoup scraping failed: {e}")
+                things = more_data.get('json', {}).get('data', {}).get('things', [])
+            except AttributeError as e:
+                raise PermanentError(f"Unexpected morechildren JSON from {more_url}: {e!r}", url=more_url)
+            # morechildren returns a flat list in tree order, each with its own depth
+            stack.extend((thing, 0, 0) for thing in reversed(things))
+        elif continue_parents:
+            parent_id, parent_depth = continue_parents.pop()
+            parent_url = f"{thread_url}/{parent_id}.json"
+            parent_data = get_json(parent_url, session, limiter, params={'limit': 500, 'raw_json': 1})
+            stack.extend((item, 0, parent_depth)
+                         for item in reversed(listing_children(parent_data, parent_url)))
+
+
+def harvest_thread_comments(url, output_file, session=None, limiter=None, batch_size=100):
+    """
+    Stream the full comment tree of a thread to a JSON Lines file.
+    
+    Comments are written one per line as they arrive, so memory use does not
+    grow with the size of the thread. They go to a temporary file that only
+    replaces `output_file` once the whole tree was fetched, so a failed harvest
+    never leaves a truncated file behind.
+    
+    Returns:
+        int: Number of comments written
+    """
+    output_path = Path(output_file)
+    tmp_path = output_path.with_name(output_path.name + '.tmp')
+    count = 0
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for comment in iter_thread_comments(url, session, limiter, batch_size):
+                f.write(json.dumps(comment, ensure_ascii=False, default=json_default) + '\n')
+                count += 1
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    tmp_path.replace(output_path)
+    return count
+
+
+def fetch_episode_comments(url, max_comments=100, session=None, limiter=None):
+    """
+    Fetch comments for a single discussion thread.
+    Tries BeautifulSoup first and falls back to the JSON API once if the page
+    fails or has no comments, so each endpoint is requested at most once.
+    
+    Raises:
+        FetchError: Neither the page nor the JSON API could be fetched
+    """
+    try:
+        comments = fetch_comments_with_beautifulsoup(url, max_comments, session, limiter)
+    except FetchError as e:
+        print(f"HTML scraping failed: {e}")
+        comments = []
+    
+    if not comments:
         print("Falling back to JSON API...")
-        return fetch_comments_from_reddit_json(url, max_comments)
+        comments = fetch_comments_from_reddit_json(url, max_comments, session, limiter)
+    
+    return comments
+
+
+def save_episode_comments(output_path, episode_name, url, comments, conn=None):
+    """
+    Write the comments of one episode to comments_episode_N.json and return its path.
+    Also upserts them into the analytics database when a connection is given.
+    """
+    # Extract episode number
+    episode_num = int(re.search(r'Episode (\d+)', episode_name).group(1))
+    
+    # Prepare output data
+    output_data = {
+        'episode': episode_name,
+        'episode_number': episode_num,
+        'url': url,
+        'fetched_at': datetime.now().isoformat(),
+        'total_comments_fetched': len(comments),
+        'comments': comments
+    }
+    
+    # Save to JSON file
+    output_file = Path(output_path) / f"comments_episode_{episode_num}.json"
+    with open(output_file, 'w', encoding='utf-8') as f:
+        json.dump(output_data, f, indent=2, ensure_ascii=False, default=json_default)
+    
+    if conn is not None:
+        ingest_comments(conn, comments, episode_num)
+    
+    return output_file
 
 
-def fetch_all_episode_comments(output_dir='../data/comments', max_comments=100):
+def fetch_all_episode_comments(output_dir='../data/comments', max_comments=100, threads=None,
+                               db_path=None, limiter=None):
     """
     Fetch top comments from all discussion threads and save to JSON files.
+    
+    `limiter` is a TokenBucket shared with other fetchers (default: one request every 2 seconds).
     """
     output_path = Path(output_dir)
     output_path.mkdir(exist_ok=True)
+    threads = threads or discussion_threads
+    conn = connect(db_path) if db_path else None
     
-    for episode_name, url in discussion_threads.items():
-        # Extract episode number
-        episode_num = int(re.search(r'Episode (\d+)', episode_name).group(1))
-        
+    session = make_session(pool_size=1)
+    # Be respectful with rate limiting: one request every 2 seconds
+    limiter = limiter or TokenBucket(rate=0.5, capacity=1)
+    
+    for episode_name, url in threads.items():
         print(f"Fetching comments for {episode_name}...")
         
-        # Try BeautifulSoup first, fallback to JSON API
-        comments = fetch_comments_with_beautifulsoup(url, max_comments)
+        try:
+            comments = fetch_episode_comments(url, max_comments, session, limiter)
+        except FetchError as e:
+            # Keep the previously saved comments rather than overwriting them with nothing
+            print(f"  ✗ Skipped {episode_name}: {e}")
+            continue
+        output_file = save_episode_comments(output_path, episode_name, url, comments, conn)
         
-        if not comments:
-            # If BeautifulSoup fails, use JSON API directly
-            comments = fetch_comments_from_reddit_json(url, max_comments)
+        print(f"  ✓ Saved {len(comments)} comments to {output_file}")
+    
+    print("\n✓ All episodes processed!")
+
+
+def harvest_all_episode_comments(output_dir='../data/comments', threads=None, db_path=None,
+                                 limiter=None):
+    """
+    Harvest the full comment tree of every discussion thread into
+    comments_episode_N.jsonl files (one comment per line).
+    
+    `limiter` is a TokenBucket shared with other fetchers (default: one request every 2 seconds).
+    """
+    output_path = Path(output_dir)
+    output_path.mkdir(exist_ok=True)
+    threads = threads or discussion_threads
+    conn = connect(db_path) if db_path else None
+    
+    session = make_session(pool_size=1)
+    limiter = limiter or TokenBucket(rate=0.5, capacity=1)
+    
+    for episode_name, url in threads.items():
+        episode_num = int(re.search(r'Episode (\d+)', episode_name).group(1))
+        print(f"Harvesting comments for {episode_name}...")
         
-        # Prepare output data
-        output_data = {
-            'episode': episode_name,
-            'episode_number': episode_num,
-            'url': url,
-            'fetched_at': datetime.now().isoformat(),
-            'total_comments_fetched': len(comments),
-            'comments': comments
-        }
+        output_file = output_path / f"comments_episode_{episode_num}.jsonl"
+        try:
+            count = harvest_thread_comments(url, output_file, session, limiter)
+        except FetchError as e:
+            print(f"  ✗ Skipped {episode_name}: {e}")
+            continue
+        if conn is not None:
+            ingest_comments(conn, iter_comments(output_file), episode_num)
         
-        # Save to JSON file
-        output_file = output_path / f"comments_episode_{episode_num}.json"
-        with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(output_data, f, indent=2, ensure_ascii=False)
+        print(f"  ✓ Saved {count} comments to {output_file}")
+    
+    print("\n✓ All episodes processed!")
+
+
+def refresh_thread_comments(episode_name, url, output_path, state, session=None, limiter=None,
+                            conn=None):
+    """
+    Fetch only the new or changed comments of one thread and merge them into
+    its comments_episode_N.json (and the analytics database if `conn` is given).
+    
+    `state` is the refresh state dict; the thread's high-water mark is updated in place.
+    
+    Returns:
+        tuple: (comments added, comments updated, total comments stored)
+    """
+    episode_num = int(re.search(r'Episode (\d+)', episode_name).group(1))
+    comments_file = Path(output_path) / f"comments_episode_{episode_num}.json"
+    thread_state = state.setdefault(url, {})
+    
+    existing = []
+    if comments_file.exists():
+        existing = list(iter_comments(comments_file))
+    known_ids = set(thread_state.get('known_ids', [])) | {c['id'] for c in existing if c['id']}
+    
+    fetched = list(iter_thread_comments(url, session, limiter, skip_ids=known_ids, sort='new'))
+    comments, added, updated = merge_records(existing, fetched)
+    comments.sort(key=lambda x: x['score'], reverse=True)
+    
+    save_episode_comments(output_path, episode_name, url, comments, conn)
+    update_high_water(thread_state, comments)
+    return added, updated, len(comments)
+
+
+def refresh_all_episode_comments(output_dir='../data/comments', threads=None, state_file=None,
+                                 db_path=None, limiter=None):
+    """
+    Incrementally refresh comments_episode_N.json for every discussion thread.
+    
+    A per-thread state (last created_utc seen and known comment ids) is kept in
+    `state_file`. Each run fetches the thread sorted by new, skips expanding
+    "more" stubs whose comments are already stored, and merges the result into
+    the saved comments by id, updating scores in place. Re-running with no new
+    activity leaves the files unchanged apart from `fetched_at`.
+    
+    `limiter` is a TokenBucket shared with other fetchers (default: one request every 2 seconds).
+    """
+    output_path = Path(output_dir)
+    output_path.mkdir(exist_ok=True)
+    threads = threads or discussion_threads
+    conn = connect(db_path) if db_path else None
+    state_file = Path(state_file or output_path / 'refresh_state.json')
+    state = load_state(state_file)
+    
+    session = make_session(pool_size=1)
+    limiter = limiter or TokenBucket(rate=0.5, capacity=1)
+    
+    for episode_name, url in threads.items():
+        print(f"Refreshing comments for {episode_name}...")
+        try:
+            added, updated, total = refresh_thread_comments(episode_name, url, output_path, state,
+                                                            session, limiter, conn)
+        except FetchError as e:
+            print(f"  ✗ Skipped {episode_name}: {e}")
+            continue
+        save_state(state, state_file)
         
-        print(f"  ✓ Saved {len(comments)} comments to {output_file}")
+        print(f"  ✓ {added} new, {updated} updated, {total} total")
+    
+    print("\n✓ All episodes refreshed!")
+
+
+def fetch_all_episode_comments_parallel(output_dir='../data/comments', max_comments=100,
+                                        threads=None, workers=None, db_path=None, limiter=None):
+    """
+    Fetch every thread's old.reddit page and parse the pages in a process pool.
+    
+    Downloads stay on this thread under the rate limiter, while each downloaded
+    page is handed to a worker process, so parsing runs on all cores as the next
+    pages download. Threads whose page fails or yields no comments fall back to
+    the JSON API.
+    
+    Args:
+        output_dir: Directory to save comments_episode_N.json files
+        max_comments: Maximum comments kept per thread
+        threads: Mapping of episode name to thread URL (default: discussion_threads)
+        workers: Number of parser processes (default: one per CPU)
+        db_path: Also upsert comments into this analytics database (optional)
+        limiter: TokenBucket shared with other fetchers (default: one request every 2 seconds)
+    """
+    output_path = Path(output_dir)
+    output_path.mkdir(exist_ok=True)
+    threads = threads or discussion_threads
+    conn = connect(db_path) if db_path else None
+    
+    session = make_session(pool_size=1)
+    limiter = limiter or TokenBucket(rate=0.5, capacity=1)
+    
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parsing = {}
+        for episode_name, url in threads.items():
+            print(f"Downloading {episode_name}...")
+            old_reddit_url = url.replace('www.reddit.com', 'old.reddit.com')
+            try:
+                response = get(old_reddit_url, session=session, limiter=limiter, timeout=15)
+                parsing[episode_name] = pool.submit(parse_old_reddit_comments, response.content, max_comments)
+            except FetchError as e:
+                print(f"  HTML download failed: {e}")
+                parsing[episode_name] = None
         
-        # Be respectful with rate limiting
-        time.sleep(2)
+        for episode_name, future in parsing.items():
+            url = threads[episode_name]
+            comments = []
+            if future is not None:
+                try:
+                    comments = future.result()
+                except Exception as e:
+                    print(f"  HTML parsing failed for {episode_name}: {e}")
+            
+            if not comments:
+                try:
+                    comments = fetch_comments_from_reddit_json(url, max_comments, session, limiter)
+                except FetchError as e:
+                    print(f"  ✗ Skipped {episode_name}: {e}")
+                    continue
+            
+            output_file = save_episode_comments(output_path, episode_name, url, comments, conn)
+            print(f"  ✓ Saved {len(comments)} comments to {output_file}")
     
     print("\n✓ All episodes processed!")
 
 
+async def fetch_all_episode_comments_async(output_dir='../data/comments', max_comments=100,
+                                           threads=None, concurrency=8, rate=1.0, db_path=None):
+    """
+    Fetch comments from all discussion threads concurrently.
+    
+    Blocking requests run in worker threads over a shared connection pool, at most
+    `concurrency` at a time. All workers draw from one token bucket refilled at `rate`
+    requests per second, which also honours Reddit's x-ratelimit-* headers.
+    
+    Args:
+        output_dir: Directory to save comments_episode_N.json files
+        max_comments: Maximum comments kept per thread
+        threads: Mapping of episode name to thread URL (default: discussion_threads)
+        concurrency: Maximum number of threads fetched at once
+        rate: Sustained request rate in requests per second
+        db_path: Also upsert comments into this analytics database (optional)
+    
+    Returns:
+        dict: Number of comments saved per episode name (threads that failed are left out)
+    """
+    output_path = Path(output_dir)
+    output_path.mkdir(exist_ok=True)
+    threads = threads or discussion_threads
+    conn = connect(db_path) if db_path else None
+    
+    session = make_session(pool_size=concurrency)
+    limiter = TokenBucket(rate=rate, capacity=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def fetch_one(episode_name, url):
+        async with semaphore:
+            try:
+                comments = await asyncio.to_thread(
+                    fetch_episode_comments, url, max_comments, session, limiter
+                )
+            except FetchError as e:
+                print(f"  ✗ Skipped {episode_name}: {e}")
+                return episode_name, None
+            output_file = await asyncio.to_thread(
+                save_episode_comments, output_path, episode_name, url, comments
+            )
+        # Ingest on the event loop thread so the database connection is never shared
+        if conn is not None:
+            ingest_comments(conn, comments, int(re.search(r'Episode (\d+)', episode_name).group(1)))
+        print(f"  ✓ Saved {len(comments)} comments to {output_file}")
+        return episode_name, len(comments)
+    
+    try:
+        results = await asyncio.gather(
+            *(fetch_one(episode_name, url) for episode_name, url in threads.items())
+        )
+    finally:
+        session.close()
+    
+    print("\n✓ All episodes processed!")
+    return {episode_name: count for episode_name, count in results if count is not None}
+
+
 if __name__ == "__main__":
+    # Serve repeat requests from the on-disk cache while it is fresh
+    set_default_cache(ResponseCache("../data/http_cache.sqlite"))
+    
     fetch_all_episode_comments(max_comments=100)
+    write_metrics("../data/fetch_metrics.prom")
@@ -1,53 +1,76 @@
 import requests
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from pathlib import Path
 
-def scrape_reddit_episodes(start_date="2025-10-27", output_file="reddit_episodes.json"):
+from http_cache import ResponseCache
+from http_client import TokenBucket, get, make_session, set_default_cache
+from incremental import load_state, merge_records, save_state, update_high_water
+from json_stream import iter_posts, write_jsonl
+from metrics import write_metrics
+
+REDDIT_URL = "https://www.reddit.com"
+
+# Episode and season identifiers used for the season search (see README).
+# "E0X" episode codes are searched as one query: E01 OR E02 OR ... OR E09
+SEARCH_KEYWORDS = ["episode", "ep", " OR ".join(f"E0{n}" for n in range(1, 10)), "season 7", "S7"]
+
+
+def build_post_info(post_data):
+    """Build our post dict from the `data` of a Reddit t3 thing."""
+    created_utc = post_data.get('created_utc', 0)
+    return {
+        'id': post_data.get('id'),
+        'title': post_data.get('title'),
+        'author': post_data.get('author'),
+        'created_utc': created_utc,
+        'created_date': datetime.fromtimestamp(created_utc).strftime('%Y-%m-%d %H:%M:%S'),
+        'score': post_data.get('score', 0),
+        'num_comments': post_data.get('num_comments', 0),
+        'url': post_data.get('url'),
+        'permalink': f"https://www.reddit.com{post_data.get('permalink', '')}",
+        'selftext': post_data.get('selftext', '')[:500]  # First 500 chars
+    }
+
+
+def fetch_search_posts(subreddit, keyword, start_timestamp, end_timestamp, after=None,
+                       session=None, limiter=None, base_url=REDDIT_URL):
     """
-    Scrapes r/LoveIslandAus for posts containing 'episode' keyword.
+    Follow the search cursor (sorted by new) until a post older than `start_timestamp` is seen.
     
     Args:
-        start_date: Start date in YYYY-MM-DD format (default: 2025-10-27)
-        output_file: Output JSON file path
+        subreddit: Subreddit to search
+        keyword: Search query
+        start_timestamp: Stop once posts older than this Unix timestamp are reached
+        end_timestamp: Ignore posts newer than this Unix timestamp
+        after: Cursor to resume from (None starts from the newest post)
+        session: requests.Session to use (optional)
+        limiter: TokenBucket shared with other fetchers (optional)
+        base_url: Reddit host to query (overridable for a local fake endpoint)
     
     Returns:
-        dict: Dictionary containing scraped posts and metadata
+        tuple: (posts, after) where `after` is the cursor to resume from if the
+        crawl was interrupted by an error, or None if it completed
     """
-    subreddit = "LoveIslandAus"
-    keyword = "episode"
-    
-    # Convert start date to Unix timestamp
-    start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
-    start_timestamp = int(start_datetime.timestamp())
-    current_timestamp = int(time.time())
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-    }
-    
-    all_posts = []
-    after = None  # For pagination
-    
-    print(f"Scraping r/{subreddit} for posts containing '{keyword}'...")
-    print(f"Date range: {start_date} to now")
+    posts_found = []
     
     while True:
         # Reddit search URL - sorted by new (most recent first) https://www.reddit.com/r/LoveIslandAus/search/?q=episode&type=posts&sort=new&cId=21f8c4a1-2283-4312-b2ca-c8e3948f96bc&iId=44175f6d-521e-48d0-abef-a800e05bfc22
+        url = f"{base_url}/r/{subreddit}/search.json"
+        params = {'q': keyword, 'type': 'posts', 'sort': 'new', 'restrict_sr': 1, 'limit': 100}
         if after:
-            url = f"https://www.reddit.com/r/{subreddit}/search.json?q={keyword}&type=posts&sort=new&restrict_sr=1&limit=100&after={after}"
-        else:
-            url = f"https://www.reddit.com/r/{subreddit}/search.json?q={keyword}&type=posts&sort=new&restrict_sr=1&limit=100"
+            params['after'] = after
         
         try:
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
+            response = get(url, session=session, limiter=limiter, timeout=10, params=params)
             data = response.json()
             
             posts = data.get('data', {}).get('children', [])
             
             if not posts:
-                break
+                return posts_found, None
             
             batch_filtered = []
             for post in posts:
@@ -55,46 +78,143 @@ def scrape_reddit_episodes(start_date="2025-10-27", output_file="reddit_episodes
                 created_utc = post_data.get('created_utc', 0)
                 
                 # Filter by date range
-                if start_timestamp <= created_utc <= current_timestamp:
-                    post_info = {
-                        'id': post_data.get('id'),
-                        'title': post_data.get('title'),
-                        'author': post_data.get('author'),
-                        'created_utc': created_utc,
-                        'created_date': datetime.fromtimestamp(created_utc).strftime('%Y-%m-%d %H:%M:%S'),
-                        'score': post_data.get('score', 0),
-                        'num_comments': post_data.get('num_comments', 0),
-                        'url': post_data.get('url'),
-                        'permalink': f"https://www.reddit.com{post_data.get('permalink', '')}",
-                        'selftext': post_data.get('selftext', '')[:500]  # First 500 chars
-                    }
-                    batch_filtered.append(post_info)
+                if start_timestamp <= created_utc <= end_timestamp:
+                    batch_filtered.append(build_post_info(post_data))
                 elif created_utc < start_timestamp:
                     # If we've gone past the start date, we can stop
                     # (since results are sorted by new, most recent first)
                     break
             
-            all_posts.extend(batch_filtered)
+            posts_found.extend(batch_filtered)
             
             # Check if we've gone past the start date
             oldest_in_batch = min([p.get('data', {}).get('created_utc', 0) for p in posts], default=0)
             if oldest_in_batch < start_timestamp:
-                break
+                return posts_found, None
             
             # Get pagination token
             after = data.get('data', {}).get('after')
             if not after:
-                break
-            
-            # Be respectful with rate limiting
-            time.sleep(1)
+                return posts_found, None
             
         except requests.exceptions.RequestException as e:
             print(f"Error fetching data: {e}")
-            break
+            return posts_found, after
         except json.JSONDecodeError as e:
             print(f"Error parsing JSON: {e}")
-            break
+            return posts_found, after
+
+
+def search_posts_concurrently(subreddit, keywords, start_timestamp, end_timestamp, cursors=None,
+                              session=None, limiter=None, base_url=REDDIT_URL):
+    """
+    Run one search cursor chain per keyword concurrently under a shared rate limiter.
+    
+    Posts are de-duplicated by id as each chain's results come in and merged into
+    a single list sorted by most recent first.
+    
+    Reddit's search endpoint has no date-range filter, so chains are split by
+    query term; each stops once it pages past `start_timestamp`.
+    
+    Args:
+        subreddit: Subreddit to search
+        keywords: Search queries, one cursor chain each
+        start_timestamp: Stop each chain once posts older than this are reached
+        end_timestamp: Ignore posts newer than this Unix timestamp
+        cursors: Mapping of keyword to a cursor to resume from (optional)
+        session: requests.Session to use (optional)
+        limiter: TokenBucket shared by all chains (optional)
+        base_url: Reddit host to query
+    
+    Returns:
+        tuple: (posts, cursors) where `cursors` maps each keyword to the cursor to
+        resume from if its chain was interrupted, or None if it completed
+    """
+    cursors = cursors or {}
+    seen_ids = set()
+    posts = []
+    result_cursors = {}
+    
+    with ThreadPoolExecutor(max_workers=len(keywords)) as pool:
+        chains = {
+            pool.submit(fetch_search_posts, subreddit, keyword, start_timestamp, end_timestamp,
+                        cursors.get(keyword), session, limiter, base_url): keyword
+            for keyword in keywords
+        }
+        for future in as_completed(chains):
+            keyword = chains[future]
+            chain_posts, result_cursors[keyword] = future.result()
+            new_posts = [p for p in chain_posts if p['id'] not in seen_ids]
+            seen_ids.update(p['id'] for p in new_posts)
+            posts.extend(new_posts)
+            print(f"  '{keyword}': {len(chain_posts)} posts ({len(new_posts)} not seen in other queries)")
+    
+    posts.sort(key=lambda x: x['created_utc'], reverse=True)
+    return posts, result_cursors
+
+
+def scrape_reddit_episodes(start_date="2025-10-27", output_file="reddit_episodes.json",
+                           incremental=False, state_file=None, rescore_window=48 * 3600,
+                           keywords=None, subreddit="LoveIslandAus", limiter=None, base_url=REDDIT_URL):
+    """
+    Scrapes r/LoveIslandAus (or `subreddit`) for posts containing the 'episode' keyword (or any of `keywords`).
+    
+    Args:
+        start_date: Start date in YYYY-MM-DD format (default: 2025-10-27)
+        output_file: Output JSON file path (a .jsonl path writes one post per line)
+        incremental: Only fetch posts newer than the last run's high-water mark
+            (minus `rescore_window`) and merge them into the existing output by id
+        state_file: Path of the refresh state (default: `<output_file>.state.json`)
+        rescore_window: Seconds before the high-water mark to re-fetch so that
+            scores and comment counts of recent posts are updated in place
+        keywords: Search queries to run concurrently, e.g. SEARCH_KEYWORDS
+            (default: ['episode'])
+        subreddit: Subreddit to search
+        limiter: TokenBucket to share with other scrapers (default: one request per second)
+        base_url: Reddit host to query (overridable for a local fake endpoint)
+    
+    Returns:
+        dict: Dictionary containing scraped posts and metadata
+    """
+    keywords = keywords or ["episode"]
+    
+    # Convert start date to Unix timestamp
+    start_datetime = datetime.strptime(start_date, "%Y-%m-%d")
+    start_timestamp = int(start_datetime.timestamp())
+    current_timestamp = int(time.time())
+    
+    state_file = Path(state_file or f"{output_file}.state.json")
+    existing_posts = []
+    state = {}
+    if incremental and Path(output_file).exists():
+        existing_posts = list(iter_posts(output_file))
+        state = load_state(state_file)
+    
+    stop_timestamp = start_timestamp
+    if state.get('last_created_utc'):
+        stop_timestamp = max(start_timestamp, int(state['last_created_utc']) - rescore_window)
+    
+    session = make_session(pool_size=len(keywords))
+    # Be respectful with rate limiting: one request per second across all queries
+    limiter = limiter or TokenBucket(rate=1.0, capacity=1)
+    
+    print(f"Scraping r/{subreddit} for posts containing {', '.join(repr(k) for k in keywords)}...")
+    print(f"Date range: {datetime.fromtimestamp(stop_timestamp).strftime('%Y-%m-%d')} to now")
+    
+    new_posts, cursors = search_posts_concurrently(subreddit, keywords, stop_timestamp, current_timestamp,
+                                                   session=session, limiter=limiter, base_url=base_url)
+    caught_up = not any(cursors.values())
+    
+    # Resume backfills that an earlier run did not finish
+    resume_cursors = {k: c for k, c in (state.get('after') or {}).items() if c and k in keywords}
+    if caught_up and resume_cursors:
+        print(f"Resuming interrupted backfill for {', '.join(resume_cursors)}...")
+        older_posts, cursors = search_posts_concurrently(subreddit, list(resume_cursors), start_timestamp,
+                                                         current_timestamp, cursors=resume_cursors,
+                                                         session=session, limiter=limiter, base_url=base_url)
+        new_posts.extend(older_posts)
+    
+    all_posts, added, updated = merge_records(existing_posts, new_posts)
     
     # Sort by most recent (created_utc descending)
     all_posts.sort(key=lambda x: x['created_utc'], reverse=True)
@@ -102,7 +222,7 @@ def scrape_reddit_episodes(start_date="2025-10-27", output_file="reddit_episodes
     # Save to JSON
     output = {
         'subreddit': subreddit,
-        'keyword': keyword,
+        'keyword': ', '.join(keywords),
         'date_range': {
             'start': start_date,
             'end': datetime.now().strftime('%Y-%m-%d')
@@ -111,11 +231,23 @@ def scrape_reddit_episodes(start_date="2025-10-27", output_file="reddit_episodes
         'posts': all_posts
     }
     
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    if Path(output_file).suffix == '.jsonl':
+        # One post per line, so downstream stages can stream it
+        write_jsonl(all_posts, output_file)
+    else:
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(output, f, indent=2, ensure_ascii=False)
+    
+    # Only advance the high-water mark once everything newer than it was fetched,
+    # otherwise the gap would be skipped on the next run. An interrupted first
+    # backfill keeps its cursor so the next run can resume it.
+    if caught_up or not state.get('last_created_utc'):
+        update_high_water(state, all_posts)
+        state['after'] = cursors
+    save_state(state, state_file)
     
     print(f"\nScraping complete!")
-    print(f"Found {len(all_posts)} posts")
+    print(f"Found {len(all_posts)} posts ({added} new, {updated} updated)")
     print(f"Results saved to {output_file}")
     
     return output
@@ -131,5 +263,10 @@ def scrape_reddit() -> list[dict]:
 
 
 if __name__ == "__main__":
+    # Serve repeat requests from the on-disk cache while it is fresh
+    set_default_cache(ResponseCache("../data/http_cache.sqlite"))
+    
     # Scrape from October 27, 2025 to now
-    results = scrape_reddit_episodes(start_date="2025-10-27", output_file="../data/reddit_episodes.json")
\ No newline at end of file
+    results = scrape_reddit_episodes(start_date="2025-10-27", output_file="../data/reddit_episodes.json",
+                                     keywords=SEARCH_KEYWORDS)
+    write_metrics("../data/fetch_metrics.prom")
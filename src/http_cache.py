@@ -0,0 +1,159 @@
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from email.utils import formatdate
+from urllib.parse import urlencode
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Seconds a cached response stays fresh, by URL pattern (first match wins)
+DEFAULT_TTLS = [
+    (r'/api/morechildren', 24 * 3600),
+    (r'/search\.json', 15 * 60),
+    (r'/comments/', 60 * 60),
+]
+DEFAULT_TTL = 60 * 60
+
+
+def cache_key(url, params=None):
+    """Content address of a request: SHA-256 of the URL and its sorted query params."""
+    if params:
+        url = f"{url}?{urlencode(sorted(params.items()))}"
+    return hashlib.sha256(url.encode('utf-8')).hexdigest()
+
+
+class ResponseCache:
+    """
+    On-disk HTTP response cache stored in a single SQLite file.
+
+    Responses are keyed on URL + params and kept for a per-endpoint TTL. Stale
+    entries with an ETag or Last-Modified header are revalidated with a
+    conditional request instead of being downloaded again. The total body size
+    is capped at `max_bytes`; least recently used entries are evicted first.
+    With `cache_only=True` no network request is ever made, which lets parsers
+    and CI replay a season entirely from disk; uncached URLs raise
+    http_client.CacheMiss, a PermanentError the fetchers skip like a 404.
+    """
+
+    def __init__(self, path, max_bytes=500 * 1024 * 1024, ttls=None, default_ttl=DEFAULT_TTL,
+                 cache_only=False, clock=time.time):
+        self.path = str(path)
+        self.max_bytes = max_bytes
+        self.ttls = [(re.compile(pattern), ttl) for pattern, ttl in (ttls or DEFAULT_TTLS)]
+        self.default_ttl = default_ttl
+        self.cache_only = cache_only
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(self.path, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses (accessed_at)")
+        self.conn.commit()
+
+    def ttl_for(self, url):
+        """Return the TTL in seconds for a URL."""
+        for pattern, ttl in self.ttls:
+            if pattern.search(url):
+                return ttl
+        return self.default_ttl
+
+    def lookup(self, key):
+        """Return the cached entry for `key` as a dict, or None."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT url, status, headers, body, fetched_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (self.clock(), key))
+            self.conn.commit()
+        url, status, headers, body, fetched_at = row
+        return {
+            'url': url,
+            'status': status,
+            'headers': json.loads(headers),
+            'body': body,
+            'fetched_at': fetched_at,
+        }
+
+    def store(self, key, response):
+        """Store a successful response and evict old entries if over the size cap."""
+        now = self.clock()
+        body = response.content
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, response.url, response.status_code, json.dumps(dict(response.headers)),
+                 body, len(body), now, now),
+            )
+            self._evict()
+            self.conn.commit()
+
+    def touch(self, key):
+        """Mark an entry as freshly fetched after a 304 Not Modified."""
+        now = self.clock()
+        with self.lock:
+            self.conn.execute(
+                "UPDATE responses SET fetched_at = ?, accessed_at = ? WHERE key = ?", (now, now, key)
+            )
+            self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.conn.execute("SELECT key, size FROM responses ORDER BY accessed_at").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        """Remove every cached response."""
+        with self.lock:
+            self.conn.execute("DELETE FROM responses")
+            self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def is_fresh(self, entry):
+        return self.clock() - entry['fetched_at'] < self.ttl_for(entry['url'])
+
+    def conditional_headers(self, entry):
+        """Headers for revalidating a stale entry (If-None-Match / If-Modified-Since)."""
+        headers = {}
+        cached = CaseInsensitiveDict(entry['headers'])
+        if cached.get('ETag'):
+            headers['If-None-Match'] = cached['ETag']
+        if cached.get('Last-Modified'):
+            headers['If-Modified-Since'] = cached['Last-Modified']
+        elif not headers:
+            headers['If-Modified-Since'] = formatdate(entry['fetched_at'], usegmt=True)
+        return headers
+
+
+def build_response(entry):
+    """Rebuild a requests.Response from a cached entry."""
+    response = requests.Response()
+    response.status_code = entry['status']
+    response.headers = CaseInsensitiveDict(entry['headers'])
+    response._content = entry['body']
+    response.url = entry['url']
+    response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+    return response
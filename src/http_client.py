@@ -0,0 +1,344 @@
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import build_response, cache_key
+from metrics import inc, observe
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+
+def make_session(pool_size=10):
+    """
+    Create a requests.Session with a connection pool sized for `pool_size`
+    concurrent requests, so keep-alive connections are reused across threads.
+    """
+    session = requests.Session()
+    session.headers.update(HEADERS)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens refill at `rate` per second up to `capacity`. Each request takes one
+    token and blocks until one is available. Reddit's `x-ratelimit-*` response
+    headers can be fed back through `update_from_headers` so the bucket never
+    spends more than the server says is left in the current window.
+    """
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated_at = clock()
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+
+    def acquire(self):
+        """Block until a token is available, then take it. Returns seconds waited."""
+        waited = 0.0
+        while True:
+            with self.lock:
+                now = self.clock()
+                self._refill(now)
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                else:
+                    wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+            waited += wait
+
+    def update_from_headers(self, headers):
+        """
+        Apply Reddit's rate limit headers.
+
+        `x-ratelimit-remaining` is the number of requests left in the window and
+        `x-ratelimit-reset` the seconds until the window resets. When the budget
+        is exhausted, all callers are paused until the reset.
+        """
+        remaining = headers.get('x-ratelimit-remaining')
+        reset = headers.get('x-ratelimit-reset')
+        if remaining is None or reset is None:
+            return
+        try:
+            remaining = float(remaining)
+            reset = float(reset)
+        except ValueError:
+            return
+
+        with self.lock:
+            now = self.clock()
+            self._refill(now)
+            if remaining < 1:
+                self.tokens = 0
+                self.paused_until = max(self.paused_until, now + reset)
+            else:
+                self.tokens = min(self.tokens, remaining)
+
+
+_default_cache = None
+
+
+def set_default_cache(cache):
+    """
+    Route every fetch that does not pass its own cache through `cache`
+    (a http_cache.ResponseCache, or None to disable caching).
+    """
+    global _default_cache
+    _default_cache = cache
+
+
+class FetchError(requests.RequestException):
+    """
+    A request that could not be completed. Subclasses say whether trying again
+    later can help, so callers never re-request an endpoint that will fail the same way.
+    """
+
+    def __init__(self, message, url=None, status=None):
+        super().__init__(message)
+        self.url = url
+        self.status = status
+
+
+class TransientError(FetchError):
+    """429, 5xx, timeout or connection failure that persisted through every retry."""
+
+
+class PermanentError(FetchError):
+    """4xx other than 429 (e.g. a removed or private thread); retrying cannot help."""
+
+
+class CircuitOpenError(FetchError):
+    """The host's circuit breaker is open after repeated failures; the request was not sent."""
+
+
+class CacheMiss(PermanentError):
+    """Raised in cache-only mode when a URL has never been fetched."""
+
+
+class RetryPolicy:
+    """
+    Exponential backoff with full jitter for transient failures.
+
+    Attempt n (from 0) waits a random time in [0, min(max_delay, base_delay * 2**n)],
+    or at least as long as the server's Retry-After header asks for.
+    """
+
+    def __init__(self, max_attempts=4, base_delay=1.0, max_delay=60.0, sleep=time.sleep,
+                 rng=random.random):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.rng = rng
+
+    def delay(self, attempt, retry_after=None):
+        backoff = self.rng() * min(self.max_delay, self.base_delay * 2 ** attempt)
+        if retry_after is not None:
+            backoff = max(backoff, min(self.max_delay, retry_after))
+        return backoff
+
+
+class CircuitBreaker:
+    """
+    Per-host circuit breaker.
+
+    After `failure_threshold` consecutive transient failures the circuit opens and
+    requests to the host fail fast with CircuitOpenError. After `reset_timeout`
+    seconds one trial request is let through: success closes the circuit again,
+    failure re-opens it for another `reset_timeout`.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=60.0, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        """Return True if a request may be sent now."""
+        with self.lock:
+            if self.opened_at is None:
+                return True
+            if self.clock() - self.opened_at >= self.reset_timeout and not self.trial_in_flight:
+                self.trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            if self.trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self.trial_in_flight = False
+
+
+DEFAULT_RETRY = RetryPolicy()
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(host):
+    """The shared CircuitBreaker of a host, created on first use."""
+    with _breakers_lock:
+        if host not in _breakers:
+            _breakers[host] = CircuitBreaker()
+        return _breakers[host]
+
+
+def _retry_after(response):
+    try:
+        return float(response.headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+def _send(url, session, limiter, timeout, **kwargs):
+    if limiter is not None:
+        observe('ratelimit_wait_seconds', limiter.acquire())
+
+    host = urlparse(url).hostname
+    start = time.perf_counter()
+    if session is not None:
+        response = session.get(url, timeout=timeout, **kwargs)
+    else:
+        kwargs['headers'] = {**HEADERS, **(kwargs.get('headers') or {})}
+        response = requests.get(url, timeout=timeout, **kwargs)
+    observe('http_request_seconds', time.perf_counter() - start, host=host)
+    inc('http_requests_total', host=host, status=response.status_code)
+    inc('http_response_bytes_total', len(response.content), host=host)
+
+    if limiter is not None:
+        limiter.update_from_headers(response.headers)
+    return response
+
+
+def _send_with_retry(url, session, limiter, timeout, retry, **kwargs):
+    """
+    Send a request, retrying 429/5xx/network failures with backoff under the
+    host's circuit breaker, and raise a classified FetchError if it cannot succeed.
+    """
+    retry = retry or DEFAULT_RETRY
+    host = urlparse(url).hostname
+    breaker = breaker_for(host)
+
+    for attempt in range(retry.max_attempts):
+        if not breaker.allow():
+            inc('http_circuit_open_total', host=host)
+            raise CircuitOpenError(f"Circuit open for {host}, not requesting {url}", url=url)
+
+        retry_after = None
+        try:
+            response = _send(url, session, limiter, timeout, **kwargs)
+        except requests.RequestException as e:
+            # Dropped connections, timeouts, truncated or undecodable bodies, redirect loops
+            breaker.record_failure()
+            error = TransientError(f"{type(e).__name__} for {url}: {e}", url=url)
+            reason = type(e).__name__
+        except Exception:
+            # Never leave a half-open trial in flight, or the circuit stays open for good
+            breaker.record_failure()
+            raise
+        else:
+            status = response.status_code
+            if status == 429 or status >= 500:
+                breaker.record_failure()
+                error = TransientError(f"HTTP {status} for {url}", url=url, status=status)
+                reason = str(status)
+                retry_after = _retry_after(response)
+            elif status >= 400:
+                # The host answered; only this request is bad
+                breaker.record_success()
+                raise PermanentError(f"HTTP {status} for {url}", url=url, status=status)
+            else:
+                breaker.record_success()
+                return response
+
+        if attempt + 1 < retry.max_attempts:
+            inc('http_retries_total', host=host, reason=reason)
+            retry.sleep(retry.delay(attempt, retry_after))
+
+    raise error
+
+
+def get(url, session=None, limiter=None, timeout=15, cache=None, retry=None, **kwargs):
+    """
+    Issue a GET request through the shared session, rate limiter and response cache.
+
+    Transient failures (429, 5xx and any requests exception: timeouts, dropped
+    connections, truncated bodies, redirect loops) are retried with exponential
+    backoff and jitter; every request goes through its host's circuit breaker.
+
+    Args:
+        url: URL to fetch
+        session: requests.Session to use (plain `requests.get` if None)
+        limiter: TokenBucket to take a token from before sending (optional)
+        timeout: Request timeout in seconds
+        cache: ResponseCache to serve from and store into (default: the one set
+            with set_default_cache, if any)
+        retry: RetryPolicy (default: DEFAULT_RETRY, 4 attempts)
+
+    Returns:
+        requests.Response with a 2xx/3xx status
+
+    Raises:
+        PermanentError: 4xx other than 429
+        TransientError: Still failing after every retry
+        CircuitOpenError: The host's circuit breaker is open
+        CacheMiss: The cache is in cache-only mode and has no entry for the URL
+    """
+    cache = cache or _default_cache
+    if cache is None:
+        return _send_with_retry(url, session, limiter, timeout, retry, **kwargs)
+
+    key = cache_key(url, kwargs.get('params'))
+    entry = cache.lookup(key)
+    if entry is not None and (cache.cache_only or cache.is_fresh(entry)):
+        inc('http_cache_total', result='hit')
+        return build_response(entry)
+    if cache.cache_only:
+        raise CacheMiss(f"Not in cache (cache-only mode): {url}", url=url)
+
+    inc('http_cache_total', result='miss' if entry is None else 'stale')
+    if entry is not None:
+        kwargs['headers'] = {**(kwargs.get('headers') or {}), **cache.conditional_headers(entry)}
+
+    response = _send_with_retry(url, session, limiter, timeout, retry, **kwargs)
+    if response.status_code == 304 and entry is not None:
+        inc('http_cache_total', result='revalidated')
+        cache.touch(key)
+        return build_response(entry)
+    if response.status_code == 200:
+        cache.store(key, response)
+    return response
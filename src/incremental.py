@@ -0,0 +1,82 @@
+import json
+from pathlib import Path
+
+
+def load_state(state_file):
+    """Load the refresh state (high-water marks per thread/search) or {} if none exists yet."""
+    state_path = Path(state_file)
+    if not state_path.exists():
+        return {}
+    with open(state_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_state(state, state_file):
+    """Write the refresh state atomically so an interrupted run never leaves a half-written file."""
+    state_path = Path(state_file)
+    tmp_path = state_path.with_name(state_path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, ensure_ascii=False)
+    tmp_path.replace(state_path)
+
+
+# Fields that identify a record without an id (author and time never change)
+CONTENT_FIELDS = ('author', 'created_utc', 'body', 'title')
+
+
+def record_key(record, key='id'):
+    """
+    The merge key of a record: its `key` field, or for records without one
+    (HTML-scraped comments can lack an id) a tuple of its CONTENT_FIELDS, so
+    that id-less records are never merged with each other under ''.
+    """
+    value = record.get(key)
+    if value:
+        return value
+    return tuple(record.get(field) for field in CONTENT_FIELDS)
+
+
+def merge_records(existing, new, key='id'):
+    """
+    Merge freshly fetched records into an existing list, keyed by `key`.
+
+    Records already present are updated in place (e.g. new scores or comment
+    counts), unseen records are appended. Merging the same batch twice is a no-op.
+    Records with an empty `key` are matched by content instead (see record_key).
+
+    Args:
+        existing: List of previously saved records
+        new: List of freshly fetched records
+        key: Field that uniquely identifies a record
+
+    Returns:
+        tuple: (merged list, number of records added, number of records updated)
+    """
+    merged = list(existing)
+    index = {record_key(record, key): i for i, record in enumerate(merged)}
+    added = 0
+    updated = 0
+
+    for record in new:
+        record_id = record_key(record, key)
+        i = index.get(record_id)
+        if i is None:
+            index[record_id] = len(merged)
+            merged.append(record)
+            added += 1
+        else:
+            merged_record = {**merged[i], **record}
+            if merged_record != merged[i]:
+                merged[i] = merged_record
+                updated += 1
+
+    return merged, added, updated
+
+
+def update_high_water(state, records):
+    """Advance `last_created_utc` and `known_ids` in a thread/search state from merged records."""
+    timestamps = [r['created_utc'] for r in records if r.get('created_utc') is not None]
+    if timestamps:
+        state['last_created_utc'] = max(timestamps + [state.get('last_created_utc') or 0])
+    state['known_ids'] = sorted(set(state.get('known_ids', [])) | {r['id'] for r in records if r['id']})
+    return state
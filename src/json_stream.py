@@ -0,0 +1,153 @@
+import json
+import re
+from pathlib import Path
+
+CHUNK_SIZE = 64 * 1024
+_WHITESPACE = re.compile(r'\s*')
+_DELIMITERS = ',:]} \t\r\n'
+
+
+def write_jsonl(records, path):
+    """Write records one JSON object per line. Returns the number of records written."""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+
+def iter_jsonl(path):
+    """Yield records from a JSON Lines file one at a time."""
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
+
+
+class _Reader:
+    """Chunked character buffer over a text file for incremental JSON decoding."""
+
+    def __init__(self, f):
+        self.f = f
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def fill(self):
+        # Drop consumed text so the buffer only ever holds about one item
+        self.buffer = self.buffer[self.pos:]
+        self.pos = 0
+        chunk = self.f.read(CHUNK_SIZE)
+        if chunk:
+            self.buffer += chunk
+        else:
+            self.eof = True
+
+    def skip_whitespace(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or self.eof:
+                return
+            self.fill()
+
+    def peek(self):
+        self.skip_whitespace()
+        if self.pos >= len(self.buffer):
+            raise ValueError("Unexpected end of JSON input")
+        return self.buffer[self.pos]
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos}, got {self.buffer[self.pos]!r}")
+        self.pos += 1
+
+    def decode(self, decoder):
+        """Decode the next complete JSON value, reading more input until it fits in the buffer."""
+        self.skip_whitespace()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                self.fill()
+                continue
+            # A number cut off by the chunk boundary (e.g. "6." of "6.5") decodes
+            # early; a complete value is always followed by a delimiter
+            if not self.eof and (end == len(self.buffer) or self.buffer[end] not in _DELIMITERS):
+                self.fill()
+                continue
+            self.pos = end
+            return value
+
+
+def iter_json_array(path, key):
+    """
+    Yield the items of the top-level `key` array of a JSON object one at a time.
+
+    Only the current item is held in memory, so files such as reddit_episodes.json
+    ({..., "posts": [...]}) can be processed in bounded memory. Other top-level
+    values are decoded and discarded.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, 'r', encoding='utf-8') as f:
+        reader = _Reader(f)
+        reader.fill()
+        reader.expect('{')
+        if reader.peek() == '}':
+            return
+
+        while True:
+            name = reader.decode(decoder)
+            reader.expect(':')
+            if name == key and reader.peek() == '[':
+                reader.expect('[')
+                if reader.peek() == ']':
+                    reader.pos += 1
+                else:
+                    while True:
+                        yield reader.decode(decoder)
+                        if reader.peek() == ',':
+                            reader.pos += 1
+                            continue
+                        reader.expect(']')
+                        break
+            else:
+                reader.decode(decoder)
+
+            if reader.peek() == ',':
+                reader.pos += 1
+                continue
+            reader.expect('}')
+            return
+
+
+def iter_posts(path):
+    """Yield posts from a .jsonl file or a reddit_episodes.json-style file."""
+    if Path(path).suffix == '.jsonl':
+        return iter_jsonl(path)
+    return iter_json_array(path, 'posts')
+
+
+def iter_comments(path):
+    """Yield comments from a harvested .jsonl file or a comments_episode_N.json file."""
+    if Path(path).suffix == '.jsonl':
+        return iter_jsonl(path)
+    return iter_json_array(path, 'comments')
+
+
+def comment_files(comments_dir):
+    """
+    Map episode number to its comments file, preferring the full harvested
+    comments_episode_N.jsonl over the top-comments comments_episode_N.json.
+    """
+    files = {}
+    for path in sorted(Path(comments_dir).glob('comments_episode_*.json*')):
+        match = re.fullmatch(r'comments_episode_(\d+)\.(json|jsonl)', path.name)
+        if match:
+            episode_number = int(match.group(1))
+            if match.group(2) == 'jsonl' or episode_number not in files:
+                files[episode_number] = path
+    return dict(sorted(files.items()))
@@ -0,0 +1,128 @@
+"""
+In-process metrics for the fetch, parse and analytics stages.
+
+Counters (running totals) and summaries (count/sum/min/max of observations,
+e.g. latencies) are kept per name and label set in a thread-safe registry.
+The default registry is shared by every module, so a run can be dumped at the
+end with `write_metrics('metrics.json')` or `write_metrics('metrics.prom')`.
+
+Metrics recorded:
+- http_requests_total{host,status}, http_request_seconds{host},
+  http_response_bytes_total{host}, http_cache_total{result},
+  http_retries_total{host,reason}, http_circuit_open_total{host}
+- ratelimit_wait_seconds: time spent blocked on the token bucket
+- parse_page_seconds{parser}, comments_parsed_total{parser}
+- posts_assigned_total, assign_seconds: episode assignment throughput
+- aggregate_seconds, aggregate_rows_total: episode analytics throughput
+"""
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+
+class Metrics:
+    """Thread-safe registry of counters and summaries."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {}
+        self.summaries = {}
+
+    def inc(self, name, value=1, **labels):
+        """Add `value` to a counter."""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """Record one observation (e.g. a latency in seconds) in a summary."""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            summary = self.summaries.get(key)
+            if summary is None:
+                self.summaries[key] = {'count': 1, 'sum': value, 'min': value, 'max': value}
+            else:
+                summary['count'] += 1
+                summary['sum'] += value
+                summary['min'] = min(summary['min'], value)
+                summary['max'] = max(summary['max'], value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """Observe the wall-clock seconds spent in the `with` block."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.summaries.clear()
+
+    def snapshot(self):
+        """
+        Returns:
+            dict: {'counters': [...], 'summaries': [...]}, each entry with
+            `name`, `labels` and its value(s)
+        """
+        with self.lock:
+            return {
+                'counters': [
+                    {'name': name, 'labels': dict(labels), 'value': value}
+                    for (name, labels), value in sorted(self.counters.items())
+                ],
+                'summaries': [
+                    {'name': name, 'labels': dict(labels), **summary}
+                    for (name, labels), summary in sorted(self.summaries.items())
+                ],
+            }
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self):
+        """Render in the Prometheus text exposition format (summaries as _count/_sum)."""
+        snapshot = self.snapshot()
+        lines = []
+        typed = set()
+
+        def label_text(labels):
+            if not labels:
+                return ''
+            pairs = ','.join(
+                '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                for k, v in labels.items()
+            )
+            return '{' + pairs + '}'
+
+        for counter in snapshot['counters']:
+            if counter['name'] not in typed:
+                lines.append(f"# TYPE {counter['name']} counter")
+                typed.add(counter['name'])
+            lines.append(f"{counter['name']}{label_text(counter['labels'])} {counter['value']}")
+        for summary in snapshot['summaries']:
+            if summary['name'] not in typed:
+                lines.append(f"# TYPE {summary['name']} summary")
+                typed.add(summary['name'])
+            labels = label_text(summary['labels'])
+            lines.append(f"{summary['name']}_count{labels} {summary['count']}")
+            lines.append(f"{summary['name']}_sum{labels} {summary['sum']}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        """Write the metrics to `path`: Prometheus text for .prom files, JSON otherwise."""
+        text = self.to_prometheus() if Path(path).suffix == '.prom' else self.to_json()
+        Path(path).write_text(text, encoding='utf-8')
+
+
+registry = Metrics()
+
+inc = registry.inc
+observe = registry.observe
+timer = registry.timer
+write_metrics = registry.write
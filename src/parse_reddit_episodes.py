@@ -1,9 +1,13 @@
-import json
 import csv
 import re
-from datetime import datetime
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
 from pathlib import Path
 
+from json_stream import iter_posts
+from metrics import inc, observe, timer
+
 def parse_episodes_csv(episodes_csv_path):
     """Load episodes.csv and return a list of episodes with their air dates."""
     episodes = []
@@ -21,17 +25,39 @@ def parse_episodes_csv(episodes_csv_path):
             })
     return sorted(episodes, key=lambda x: x['episode_number'])
 
+# Episodes between which we need to check titles
+AMBIGUOUS_RANGES = {
+    (4, 5),
+    (8, 9),
+    (12, 13),
+    (16, 17)
+}
+
+def gap_ranges(episodes, min_gap_days=2):
+    """
+    Pairs of consecutive episodes with a break of at least `min_gap_days`
+    between their air dates (e.g. Thursday -> Monday), where posts made in the
+    gap may discuss either episode.
+    
+    For the season 7 schedule in data/episodes.csv this is AMBIGUOUS_RANGES.
+    """
+    return {
+        (current_ep['episode_number'], next_ep['episode_number'])
+        for current_ep, next_ep in zip(episodes, episodes[1:])
+        if next_ep['air_date'] - current_ep['air_date'] >= timedelta(days=min_gap_days)
+    }
+
+# Look for patterns like "Episode 5", "episode 5", "Episode5", etc.
+EPISODE_TITLE_PATTERNS = [
+    re.compile(r'[Ee]pisode\s+(\d+)'),
+    re.compile(r'[Ee]p\s+(\d+)'),
+    re.compile(r'[Ee]pisode\s*(\d+)'),
+]
+
 def extract_episode_number_from_title(title):
     """Extract episode number from title if it contains 'Episode {X}' pattern."""
-    # Look for patterns like "Episode 5", "episode 5", "Episode5", etc.
-    patterns = [
-        r'[Ee]pisode\s+(\d+)',
-        r'[Ee]p\s+(\d+)',
-        r'[Ee]pisode\s*(\d+)',
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, title)
+    for pattern in EPISODE_TITLE_PATTERNS:
+        match = pattern.search(title)
         if match:
             try:
                 return int(match.group(1))
@@ -39,6 +65,19 @@ def extract_episode_number_from_title(title):
                 continue
     return None
 
+def resolve_between_episodes(post, current_ep, next_ep, ambiguous_ranges):
+    """Pick current or next episode for a post made between their air dates."""
+    # Check if this is an ambiguous range (4-5, 8-9, 12-13, 16-17)
+    if (current_ep['episode_number'], next_ep['episode_number']) in ambiguous_ranges:
+        # Try to extract episode number from title
+        title_episode = extract_episode_number_from_title(post['title'])
+        
+        # Only the next episode overrides the default; a title matching neither
+        # also goes to current (most recent aired)
+        if title_episode is not None and title_episode == next_ep['episode_number']:
+            return next_ep['episode_number']
+    return current_ep['episode_number']
+
 def assign_post_to_episode(post, episodes, ambiguous_ranges):
     """Assign a post to an episode based on its timestamp and title."""
     post_timestamp = post['created_utc']
@@ -60,26 +99,7 @@ def assign_post_to_episode(post, episodes, ambiguous_ranges):
             
             # Post is after current episode date but before next episode date
             if current_ep_date < post_date < next_ep_date:
-                # Check if this is an ambiguous range (4-5, 8-9, 12-13, 16-17)
-                if (current_ep['episode_number'], next_ep['episode_number']) in ambiguous_ranges:
-                    # Try to extract episode number from title
-                    title_episode = extract_episode_number_from_title(post['title'])
-                    
-                    if title_episode is not None:
-                        # Check if the extracted episode number matches current or next
-                        if title_episode == current_ep['episode_number']:
-                            return current_ep['episode_number']
-                        elif title_episode == next_ep['episode_number']:
-                            return next_ep['episode_number']
-                        # If it matches neither, default to current (most recent aired)
-                        else:
-                            return current_ep['episode_number']
-                    else:
-                        # No episode number in title, assign to current (most recent aired)
-                        return current_ep['episode_number']
-                else:
-                    # Not an ambiguous range, assign to current episode
-                    return current_ep['episode_number']
+                return resolve_between_episodes(post, current_ep, next_ep, ambiguous_ranges)
     
     # If post is on or after the last episode date, assign to last episode
     if post_date >= episodes[-1]['air_date'].date():
@@ -92,63 +112,156 @@ def assign_post_to_episode(post, episodes, ambiguous_ranges):
     # Fallback (shouldn't reach here)
     return episodes[0]['episode_number']
 
-def parse_reddit_episodes(episodes_csv_path, reddit_json_path, output_dir='data'):
+class EpisodeIndex:
+    """
+    Interval index over episode air dates for O(log n) post assignment.
+    
+    Each episode's air date becomes a [local midnight, next local midnight) interval
+    of Unix timestamps, so a post is placed with one bisect on its `created_utc`
+    instead of a scan over every episode. Results are identical to
+    assign_post_to_episode.
+    """
+    
+    def __init__(self, episodes, ambiguous_ranges):
+        self.episodes = episodes
+        self.ambiguous_ranges = set(ambiguous_ranges)
+        self.day_starts = []
+        self.day_ends = []
+        for ep in episodes:
+            air_day = datetime.combine(ep['air_date'].date(), datetime.min.time())
+            self.day_starts.append(air_day.timestamp())
+            self.day_ends.append((air_day + timedelta(days=1)).timestamp())
+        
+        # Episodes sharing an air date resolve to the first of them, as in the linear scan
+        self.first_on_day = []
+        for i, start in enumerate(self.day_starts):
+            if i > 0 and self.day_starts[i - 1] == start:
+                self.first_on_day.append(self.first_on_day[i - 1])
+            else:
+                self.first_on_day.append(i)
+        
+        # The interval logic relies on air dates increasing with episode number
+        self.monotonic = all(a <= b for a, b in zip(self.day_starts, self.day_starts[1:]))
+    
+    def assign(self, post):
+        """Return the episode number for a single post."""
+        if not self.monotonic:
+            return assign_post_to_episode(post, self.episodes, self.ambiguous_ranges)
+        
+        i = bisect_right(self.day_starts, post['created_utc']) - 1
+        
+        # Post is before the first episode
+        if i < 0:
+            return self.episodes[0]['episode_number']
+        
+        # Post is on the same day as episode i
+        if post['created_utc'] < self.day_ends[i]:
+            return self.episodes[self.first_on_day[i]]['episode_number']
+        
+        # Post is after the last episode date
+        if i == len(self.episodes) - 1:
+            return self.episodes[-1]['episode_number']
+        
+        return resolve_between_episodes(post, self.episodes[i], self.episodes[i + 1],
+                                        self.ambiguous_ranges)
+    
+    def assign_all(self, posts):
+        """Return the episode number for every post, in order."""
+        with timer('assign_seconds'):
+            episode_numbers = [self.assign(post) for post in posts]
+        inc('posts_assigned_total', len(episode_numbers))
+        return episode_numbers
+    
+    def iter_assigned(self, posts):
+        """Yield (episode_number, post) for a stream of posts, recording assignment time."""
+        count = 0
+        elapsed = 0.0
+        try:
+            for post in posts:
+                start = time.perf_counter()
+                episode_num = self.assign(post)
+                elapsed += time.perf_counter() - start
+                count += 1
+                yield episode_num, post
+        finally:
+            inc('posts_assigned_total', count)
+            observe('assign_seconds', elapsed)
+
+def parse_reddit_episodes(episodes_csv_path, reddit_json_path, output_dir='data',
+                          output_format='csv', season=7, db_path=None, ambiguous_ranges=None):
     """
     Parse reddit_episodes.json and divide posts into episode-specific CSV files.
     
     Args:
         episodes_csv_path: Path to episodes.csv
-        reddit_json_path: Path to reddit_episodes.json
+        reddit_json_path: Path to reddit_episodes.json (or a .jsonl file with one post per line)
         output_dir: Directory to save output CSV files
+        output_format: 'csv' for one reddit_episode_N.csv per episode, or 'parquet'
+            for a single dataset partitioned by season/episode under output_dir/parquet/posts
+        season: Season number used as the Parquet partition key
+        db_path: Also upsert episodes and assigned posts into this analytics database (optional)
+        ambiguous_ranges: (episode, next episode) pairs whose in-between posts are
+            assigned by title (default: AMBIGUOUS_RANGES, the season 7 schedule;
+            see gap_ranges to derive them from another schedule)
     """
     # Load episodes
     episodes = parse_episodes_csv(episodes_csv_path)
     print(f"Loaded {len(episodes)} episodes")
     
-    # Define ambiguous ranges (episodes between which we need to check titles)
-    ambiguous_ranges = [
-        (4, 5),
-        (8, 9),
-        (12, 13),
-        (16, 17)
-    ]
-    
-    # Load Reddit posts
-    with open(reddit_json_path, 'r', encoding='utf-8') as f:
-        reddit_data = json.load(f)
+    # Stream Reddit posts one at a time so memory stays bounded for large archives
+    if ambiguous_ranges is None:
+        ambiguous_ranges = AMBIGUOUS_RANGES
+    index = EpisodeIndex(episodes, ambiguous_ranges)
+    assigned_posts = index.iter_assigned(iter_posts(reddit_json_path))
     
-    posts = reddit_data.get('posts', [])
-    print(f"Loaded {len(posts)} Reddit posts")
-    
-    # Group posts by episode
-    episode_posts = {}
-    for episode in episodes:
-        episode_posts[episode['episode_number']] = []
-    
-    # Assign each post to an episode
-    for post in posts:
-        episode_num = assign_post_to_episode(post, episodes, ambiguous_ranges)
-        episode_posts[episode_num].append(post)
+    if db_path is not None:
+        from analytics_db import connect, ingest_assigned_posts, ingest_episodes
+        
+        conn = connect(db_path)
+        ingest_episodes(conn, episodes, season)
+        assigned_posts = ingest_assigned_posts(conn, assigned_posts, season)
     
     # Create output directory if it doesn't exist
     output_path = Path(output_dir)
     output_path.mkdir(exist_ok=True)
     
-    # Write CSV files for each episode
+    if output_format == 'parquet':
+        from storage import PartitionedWriter, posts_to_table
+        
+        dataset_path = output_path / 'parquet' / 'posts'
+        writer = PartitionedWriter(dataset_path, posts_to_table, season)
+        try:
+            for episode_num, post in assigned_posts:
+                writer.write({**post, 'episode_number': episode_num})
+        finally:
+            episode_counts = writer.close()
+        print(f"Wrote {sum(episode_counts.values())} posts to {dataset_path}")
+        return
+    
+    # Write CSV files for each episode, opening each file on its first post
     csv_fieldnames = ['id', 'title', 'author', 'created_utc', 'created_date', 
                       'score', 'num_comments', 'url', 'permalink', 'selftext']
     
-    for episode_num, posts_list in episode_posts.items():
-        if posts_list:  # Only create file if there are posts
-            csv_filename = output_path / f"reddit_episode_{episode_num}.csv"
-            
-            with open(csv_filename, 'w', newline='', encoding='utf-8') as f:
-                writer = csv.DictWriter(f, fieldnames=csv_fieldnames)
-                writer.writeheader()
-                for post in posts_list:
-                    writer.writerow(post)
-            
-            print(f"Created {csv_filename} with {len(posts_list)} posts")
+    episode_counts = {episode['episode_number']: 0 for episode in episodes}
+    open_files = {}
+    writers = {}
+    try:
+        for episode_num, post in assigned_posts:
+            if episode_num not in writers:
+                csv_filename = output_path / f"reddit_episode_{episode_num}.csv"
+                open_files[episode_num] = open(csv_filename, 'w', newline='', encoding='utf-8')
+                writers[episode_num] = csv.DictWriter(open_files[episode_num], fieldnames=csv_fieldnames)
+                writers[episode_num].writeheader()
+            writers[episode_num].writerow(post)
+            episode_counts[episode_num] += 1
+    finally:
+        for f in open_files.values():
+            f.close()
+    
+    print(f"Loaded {sum(episode_counts.values())} Reddit posts")
+    for episode_num, count in episode_counts.items():
+        if count:  # Only created a file if there were posts
+            print(f"Created {output_path / f'reddit_episode_{episode_num}.csv'} with {count} posts")
         else:
             print(f"No posts for episode {episode_num}, skipping CSV creation")
 
@@ -0,0 +1,206 @@
+"""
+Sharded ingestion pipeline for several subreddits and seasons.
+
+A job config (JSON) lists shards, each one (subreddit, season, episode schedule):
+
+    {
+      "data_dir": "data/shards",
+      "workers": 3,
+      "rate": 1.0,
+      "shards": [
+        {"subreddit": "LoveIslandAus", "season": 7, "start_date": "2025-10-27",
+         "episodes_csv": "data/episodes.csv", "keywords": ["episode", "S7"]}
+      ]
+    }
+
+Paths are relative to the config file. Optional shard keys: `name` (default
+'<subreddit>-s<season>'), `keywords` (default 'episode' and 'season <n>'),
+`thread_title_pattern` (regex with the season and episode number as its first
+two groups), `threads` (episode name -> discussion thread URL, instead of
+discovering them) and `ambiguous_ranges` ([episode, next episode] pairs whose
+in-between posts are assigned by title; default: every pair with a break of
+two or more days between air dates in the shard's episodes_csv).
+
+Each shard runs the stages fetch_posts -> fetch_comments -> parse -> analyse
+into its own partition, <data_dir>/<subreddit>/season=<n>/, in a worker
+process. The request budget (`rate` requests per second) is split evenly
+across the workers. Finished stages are checkpointed in the partition, so an
+interrupted run resumes where it stopped; once every stage of a shard has
+finished, the next run starts it afresh (fetches are incremental anyway).
+"""
+
+import json
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+from pathlib import Path
+
+from episode_metrics import compute_episode_analytics, load_comments, load_posts
+from fetch_discourse import refresh_all_episode_comments
+from fetch_reddit import scrape_reddit_episodes
+from http_client import TokenBucket
+from incremental import load_state, save_state
+from json_stream import iter_posts
+from parse_reddit_episodes import gap_ranges, parse_episodes_csv, parse_reddit_episodes
+from watch import DISCUSSION_TITLE, discover_threads
+
+STAGES = ['fetch_posts', 'fetch_comments', 'parse', 'analyse']
+
+
+def load_job_config(config_path):
+    """
+    Load a job config and resolve its paths relative to the config file.
+
+    Returns:
+        dict: Config with `data_dir`, `workers`, `rate` and a list of `shards`
+    """
+    config_path = Path(config_path)
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+
+    base = config_path.parent
+    data_dir = base / config.get('data_dir', 'data/shards')
+    shards = []
+    for shard in config['shards']:
+        shard = {
+            'name': f"{shard['subreddit']}-s{shard['season']}",
+            'keywords': ['episode', f"season {shard['season']}"],
+            **shard,
+        }
+        shard['episodes_csv'] = str(base / shard['episodes_csv'])
+        shard['output_dir'] = str(data_dir / shard['subreddit'] / f"season={shard['season']}")
+        shards.append(shard)
+
+    names = [shard['name'] for shard in shards]
+    if len(set(names)) != len(names):
+        raise ValueError(f"Shard names must be unique: {names}")
+
+    return {
+        'data_dir': str(data_dir),
+        'workers': config.get('workers'),
+        'rate': config.get('rate', 1.0),
+        'shards': shards,
+    }
+
+
+def run_stage(stage, shard, limiter):
+    """Run one stage of a shard inside its output partition."""
+    output_path = Path(shard['output_dir'])
+    posts_file = output_path / 'reddit_episodes.json'
+
+    if stage == 'fetch_posts':
+        scrape_reddit_episodes(start_date=shard['start_date'], output_file=str(posts_file),
+                               incremental=True, keywords=shard['keywords'],
+                               subreddit=shard['subreddit'], limiter=limiter)
+
+    elif stage == 'fetch_comments':
+        threads = shard.get('threads')
+        if not threads:
+            pattern = re.compile(shard['thread_title_pattern'], re.IGNORECASE) \
+                if shard.get('thread_title_pattern') else DISCUSSION_TITLE
+            discovered = discover_threads(iter_posts(posts_file), shard['season'], pattern)
+            threads = {episode_name: thread['url'] for episode_name, thread in discovered.items()}
+        if not threads:
+            print(f"[{shard['name']}] No discussion threads found, skipping comments")
+            return
+        refresh_all_episode_comments(output_dir=output_path / 'comments', threads=threads,
+                                     limiter=limiter)
+
+    elif stage == 'parse':
+        if shard.get('ambiguous_ranges') is not None:
+            ambiguous_ranges = {tuple(pair) for pair in shard['ambiguous_ranges']}
+        else:
+            ambiguous_ranges = gap_ranges(parse_episodes_csv(shard['episodes_csv']))
+        parse_reddit_episodes(shard['episodes_csv'], posts_file, output_path, season=shard['season'],
+                              ambiguous_ranges=ambiguous_ranges)
+
+    elif stage == 'analyse':
+        episode_analytics = compute_episode_analytics(load_posts(output_path),
+                                                      load_comments(output_path / 'comments'))
+        episode_analytics.insert(0, 'season', shard['season'])
+        episode_analytics.insert(0, 'subreddit', shard['subreddit'])
+        episode_analytics.to_csv(output_path / 'episode_analytics.csv', index=False)
+
+    else:
+        raise ValueError(f"Unknown stage: {stage}")
+
+
+def run_shard(shard, rate):
+    """
+    Run every unfinished stage of a shard, checkpointing after each one.
+
+    Args:
+        shard: Shard from load_job_config
+        rate: Requests per second this shard may spend
+
+    Returns:
+        dict: Shard name and the stages run in this call
+    """
+    output_path = Path(shard['output_dir'])
+    output_path.mkdir(parents=True, exist_ok=True)
+    checkpoint_file = output_path / 'checkpoint.json'
+    checkpoint = load_state(checkpoint_file)
+    if checkpoint.get('complete'):
+        checkpoint = {}
+
+    limiter = TokenBucket(rate=rate, capacity=1)
+    done = checkpoint.setdefault('stages', {})
+    ran = []
+    for stage in STAGES:
+        if stage in done:
+            print(f"[{shard['name']}] {stage} already done, skipping")
+            continue
+        print(f"[{shard['name']}] {stage}...")
+        start = time.perf_counter()
+        run_stage(stage, shard, limiter)
+        done[stage] = {
+            'finished_at': datetime.now().isoformat(),
+            'seconds': round(time.perf_counter() - start, 3),
+        }
+        save_state(checkpoint, checkpoint_file)
+        ran.append(stage)
+
+    checkpoint['complete'] = True
+    save_state(checkpoint, checkpoint_file)
+    return {'name': shard['name'], 'stages': ran}
+
+
+def run_pipeline(config_path, workers=None):
+    """
+    Run every shard of a job config in a pool of worker processes.
+
+    Args:
+        config_path: Path of the job config JSON
+        workers: Number of shards processed at once (default: the config's
+            `workers`, else one per shard)
+
+    Returns:
+        dict: Shard name to the stages run, or to the error that stopped it
+    """
+    config = load_job_config(config_path)
+    shards = config['shards']
+    if not shards:
+        print("No shards in the job config, nothing to run")
+        return {}
+    workers = min(workers or config['workers'] or len(shards), len(shards))
+    rate = config['rate'] / workers
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_shard, shard, rate): shard['name'] for shard in shards}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = future.result()['stages']
+                print(f"✓ {name} finished")
+            except Exception as e:
+                # The shard's checkpoint keeps its finished stages for the next run
+                results[name] = f"failed: {e}"
+                print(f"✗ {name} failed: {e}")
+    return results
+
+
+if __name__ == "__main__":
+    run_pipeline(sys.argv[1] if len(sys.argv) > 1 else "../jobs.json")
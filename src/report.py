@@ -0,0 +1,231 @@
+"""
+Report builder for the figures in plot/ (previously rendered by analysis.ipynb).
+
+Each figure is fingerprinted from the analytics rows it draws and the source of
+its render function, and the fingerprints are kept in plot/report_manifest.json.
+A rebuild only re-renders figures whose fingerprint changed, and skips loading
+the data entirely when none of the input files changed. Stale figures are
+rendered in parallel worker processes on matplotlib's headless Agg canvas.
+"""
+
+import hashlib
+import inspect
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from matplotlib.figure import Figure
+
+from episode_metrics import compute_episode_analytics, load_comments, load_posts
+from incremental import load_state, save_state
+from json_stream import comment_files
+
+FIG_SIZE = (12, 6)
+DPI = 300
+TABLE_COLUMNS = ['episode_number', 'num_posts', 'num_comments', 'score', 'num_engagement',
+                 'homogeneity_score', 'homogeneity_score_sd', 'cumulative_engagement']
+
+
+def plot_engagement(data, output_file):
+    """Bar chart: Number of engagement per episode"""
+    fig = Figure(figsize=FIG_SIZE)
+    ax = fig.subplots()
+    ax.bar(data['episode_number'], data['num_engagement'],
+           color='steelblue', edgecolor='black', alpha=0.7)
+    ax.set_xlabel('Episode Number', fontsize=12)
+    ax.set_ylabel('Number of Engagement', fontsize=12)
+    ax.set_title('Number of Engagement per Episode', fontsize=14, fontweight='bold')
+    ax.set_xticks(data['episode_number'])
+    ax.grid(axis='y', alpha=0.3, linestyle='--')
+    fig.tight_layout()
+    fig.savefig(output_file, dpi=DPI, bbox_inches='tight')
+
+
+def plot_homogeneity(data, output_file):
+    """Bar chart: Homogeneity score per episode with standard deviation error bars"""
+    fig = Figure(figsize=FIG_SIZE)
+    ax = fig.subplots()
+    ax.bar(data['episode_number'], data['homogeneity_score'],
+           color='coral', edgecolor='black', alpha=0.7,
+           yerr=data['homogeneity_score_sd'], capsize=5,
+           error_kw={'elinewidth': 2, 'capthick': 2})
+    ax.set_xlabel('Episode Number', fontsize=12)
+    ax.set_ylabel('Homogeneity Score', fontsize=12)
+    ax.set_title('Homogeneity Score per Episode (with Standard Deviation)', fontsize=14, fontweight='bold')
+    ax.set_xticks(data['episode_number'])
+    ax.grid(axis='y', alpha=0.3, linestyle='--')
+    fig.tight_layout()
+    fig.savefig(output_file, dpi=DPI, bbox_inches='tight')
+
+
+def plot_cumulative_engagement(data, output_file):
+    """Line plot: Cumulative engagement over episodes"""
+    fig = Figure(figsize=FIG_SIZE)
+    ax = fig.subplots()
+    ax.plot(data['episode_number'], data['cumulative_engagement'],
+            marker='o', linewidth=2, markersize=8, color='darkgreen', markerfacecolor='lightgreen',
+            markeredgecolor='darkgreen', markeredgewidth=2)
+    ax.set_xlabel('Episode Number', fontsize=12)
+    ax.set_ylabel('Cumulative Engagement', fontsize=12)
+    ax.set_title('Cumulative Engagement Over Episodes', fontsize=14, fontweight='bold')
+    ax.set_xticks(data['episode_number'])
+    ax.grid(alpha=0.3, linestyle='--')
+    fig.tight_layout()
+    fig.savefig(output_file, dpi=DPI, bbox_inches='tight')
+
+
+def plot_analytics_table(data, output_file):
+    """Table image: Episode analytics summary"""
+    table_data = data[TABLE_COLUMNS].copy()
+    table_data['homogeneity_score'] = table_data['homogeneity_score'].round(2)
+    table_data['homogeneity_score_sd'] = table_data['homogeneity_score_sd'].round(2)
+    table_values = table_data.astype(str).values.tolist()
+
+    fig = Figure(figsize=(14, max(8, len(table_data) * 0.4)))
+    ax = fig.subplots()
+    ax.axis('tight')
+    ax.axis('off')
+
+    table = ax.table(cellText=table_values,
+                     colLabels=TABLE_COLUMNS,
+                     cellLoc='center',
+                     loc='center',
+                     bbox=[0, 0, 1, 1])
+
+    # Style the table
+    table.auto_set_font_size(False)
+    table.set_fontsize(9)
+    table.scale(1, 2)
+
+    for i in range(len(TABLE_COLUMNS)):
+        table[(0, i)].set_facecolor('#4CAF50')
+        table[(0, i)].set_text_props(weight='bold', color='white')
+
+    for i in range(1, len(table_data) + 1):
+        for j in range(len(TABLE_COLUMNS)):
+            table[(i, j)].set_facecolor('#f0f0f0' if i % 2 == 0 else 'white')
+
+    ax.set_title('Episode Analytics Summary', fontsize=16, fontweight='bold', pad=20)
+    fig.tight_layout()
+    fig.savefig(output_file, dpi=DPI, bbox_inches='tight')
+
+
+# Output file -> (render function, analytics columns it draws)
+FIGURES = {
+    'engagement_plot.png': (plot_engagement, ['episode_number', 'num_engagement']),
+    'homogeneity_plot.png': (plot_homogeneity, ['episode_number', 'homogeneity_score', 'homogeneity_score_sd']),
+    'cumulative_engagement_plot.png': (plot_cumulative_engagement, ['episode_number', 'cumulative_engagement']),
+    'episode_analytics_table.png': (plot_analytics_table, TABLE_COLUMNS),
+}
+
+
+def _sha256(*parts):
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def figure_fingerprint(name, analytics):
+    """Hash of the rows a figure draws plus the source of its render function."""
+    render, columns = FIGURES[name]
+    return _sha256(name, str(DPI), inspect.getsource(render), analytics[columns].to_csv(index=False))
+
+
+def input_files(data_dir):
+    """The data files the analytics table is computed from (as read by episode_metrics)."""
+    data_path = Path(data_dir)
+    parquet_path = data_path / 'parquet' / 'posts'
+    if parquet_path.exists():
+        files = sorted(p for p in parquet_path.rglob('*') if p.is_file())
+    else:
+        files = sorted(data_path.glob('reddit_episode_*.csv'))
+    return files + list(comment_files(data_path / 'comments').values())
+
+
+def file_digest(path, known=None):
+    """
+    SHA-256 of a file's contents. `known` is the entry from a previous run and
+    is reused without reading the file if its size and mtime are unchanged.
+    """
+    stat = Path(path).stat()
+    if known and known['size'] == stat.st_size and known['mtime_ns'] == stat.st_mtime_ns:
+        return known
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'sha256': digest.hexdigest()}
+
+
+def render_figure(name, data, output_file):
+    render, _ = FIGURES[name]
+    render(data, output_file)
+    return name
+
+
+def build_report(data_dir='../data', plot_dir='../plot', analytics=None, workers=None, force=False):
+    """
+    Re-render the figures whose inputs changed since the last build.
+
+    Args:
+        data_dir: Directory with reddit_episode_N.csv (or parquet/) and comments/
+        plot_dir: Output directory for the PNGs and report_manifest.json
+        analytics: Precomputed episode analytics (default: computed from data_dir)
+        workers: Number of render processes (default: one per CPU; 1 renders in-process)
+        force: Re-render every figure
+
+    Returns:
+        list: Names of the figures that were rendered
+    """
+    plot_path = Path(plot_dir)
+    plot_path.mkdir(exist_ok=True)
+    manifest_file = plot_path / 'report_manifest.json'
+    manifest = load_state(manifest_file)
+    outputs = manifest.get('outputs', {})
+    outputs_exist = all(name in outputs and (plot_path / name).exists() for name in FIGURES)
+
+    data_fingerprint = None
+    if analytics is None:
+        known_files = manifest.get('files', {})
+        files = {}
+        for path in input_files(data_dir):
+            key = path.relative_to(data_dir).as_posix()
+            files[key] = file_digest(path, known_files.get(key))
+        data_fingerprint = _sha256(
+            *(f"{path}:{entry['sha256']}" for path, entry in files.items()),
+            *(inspect.getsource(render) for render, _ in FIGURES.values()),
+        )
+        manifest['files'] = files
+        if not force and outputs_exist and data_fingerprint == manifest.get('data_fingerprint'):
+            save_state(manifest, manifest_file)
+            print("Report is up to date (no input files changed)")
+            return []
+        analytics = compute_episode_analytics(load_posts(data_dir), load_comments(Path(data_dir) / 'comments'))
+
+    fingerprints = {name: figure_fingerprint(name, analytics) for name in FIGURES}
+    stale = [
+        name for name in FIGURES
+        if force or outputs.get(name) != fingerprints[name] or not (plot_path / name).exists()
+    ]
+
+    if stale:
+        jobs = [(name, analytics[FIGURES[name][1]], plot_path / name) for name in stale]
+        if workers == 1 or len(jobs) == 1:
+            for job in jobs:
+                render_figure(*job)
+        else:
+            with ProcessPoolExecutor(max_workers=min(workers or len(jobs), len(jobs))) as pool:
+                list(pool.map(render_figure, *zip(*jobs)))
+
+    for name in FIGURES:
+        print(f"  {'rendered ' if name in stale else 'unchanged'} {plot_path / name}")
+
+    manifest['outputs'] = fingerprints
+    manifest['data_fingerprint'] = data_fingerprint
+    save_state(manifest, manifest_file)
+    return stale
+
+
+if __name__ == "__main__":
+    build_report()
@@ -0,0 +1,152 @@
+import hashlib
+import numbers
+import sqlite3
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+
+# VADER ships its lexicon with the package, so scoring never touches the network.
+# Each worker process builds its own analyzer once.
+_analyzer = None
+
+
+def _init_worker():
+    global _analyzer
+    _analyzer = SentimentIntensityAnalyzer()
+
+
+def score_batch(texts):
+    """Return the VADER compound score (-1 to 1) of each text."""
+    if _analyzer is None:
+        _init_worker()
+    return [_analyzer.polarity_scores(text)['compound'] for text in texts]
+
+
+def text_hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+
+def cache_id(record_id):
+    """
+    The cache's id for a record: its base36 Reddit id, whether the record was
+    read from CSV/JSON (base36 string) or Parquet (int64, see storage.decode_id).
+    """
+    if isinstance(record_id, numbers.Integral):
+        from storage import encode_id
+
+        return encode_id(record_id)
+    return str(record_id)
+
+
+class SentimentCache:
+    """
+    SQLite memo of sentiment scores keyed by record id and body hash, so an
+    incremental run only scores new or edited text.
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(str(path))
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS sentiment (
+                id TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                compound REAL NOT NULL,
+                PRIMARY KEY (id, text_hash)
+            )
+        """)
+        self.conn.commit()
+
+    def lookup(self, keys):
+        """Return {(id, text_hash): compound} for the keys that are cached."""
+        keys = set(keys)
+        ids = sorted({record_id for record_id, _ in keys})
+        found = {}
+        # Stay under SQLite's bound-parameter limit
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT id, text_hash, compound FROM sentiment WHERE id IN ({', '.join('?' * len(chunk))})",
+                chunk,
+            )
+            for record_id, digest, compound in rows:
+                if (record_id, digest) in keys:
+                    found[(record_id, digest)] = compound
+        return found
+
+    def store(self, scores):
+        """Store {(id, text_hash): compound}."""
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO sentiment VALUES (?, ?, ?)",
+                [(record_id, digest, compound) for (record_id, digest), compound in scores.items()],
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+def score_texts(ids, texts, cache=None, workers=None, batch_size=500):
+    """
+    Score texts in batches across a process pool, skipping any already in the cache.
+
+    Args:
+        ids: Record ids (comment or post ids, base36 or as int64 from Parquet), aligned with `texts`
+        texts: Texts to score
+        cache: SentimentCache to read from and update (optional)
+        workers: Number of scoring processes (default: one per CPU; 1 scores in-process)
+        batch_size: Texts per worker task
+
+    Returns:
+        list: Compound score per text, in input order
+    """
+    keys = [(cache_id(record_id), text_hash(text)) for record_id, text in zip(ids, texts)]
+    scores = cache.lookup(keys) if cache is not None else {}
+
+    pending = {}
+    for key, text in zip(keys, texts):
+        if key not in scores:
+            pending[key] = text
+
+    if pending:
+        pending_keys = list(pending)
+        pending_texts = list(pending.values())
+        batches = [pending_texts[i:i + batch_size] for i in range(0, len(pending_texts), batch_size)]
+        if workers == 1 or len(batches) == 1:
+            results = [score_batch(batch) for batch in batches]
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                results = list(pool.map(score_batch, batches))
+        new_scores = dict(zip(pending_keys, (score for batch in results for score in batch)))
+        if cache is not None:
+            cache.store(new_scores)
+        scores.update(new_scores)
+
+    return [scores[key] for key in keys]
+
+
+def add_sentiment(df, text_columns, cache=None, workers=None):
+    """
+    Return a copy of a posts or comments DataFrame with a `sentiment` column.
+
+    Args:
+        df: DataFrame with an `id` column
+        text_columns: Columns joined to form the text, e.g. ['body'] for
+            comments or ['title', 'selftext'] for posts
+        cache: SentimentCache (optional)
+        workers: Number of scoring processes
+    """
+    if df.empty:
+        return df.assign(sentiment=pd.Series(index=df.index, dtype='float64'))
+    texts = df[text_columns].fillna('').astype(str).agg('\n'.join, axis=1).tolist()
+    df = df.copy()
+    df['sentiment'] = score_texts(df['id'].tolist(), texts, cache, workers)
+    return df
+
+
+if __name__ == "__main__":
+    from episode_metrics import load_comments
+
+    cache = SentimentCache("../data/sentiment_cache.sqlite")
+    comments = add_sentiment(load_comments("../data/comments"), ['body'], cache)
+    print(comments.groupby('episode_number')['sentiment'].agg(['mean', 'std']))
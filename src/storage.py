@@ -0,0 +1,230 @@
+import csv
+import re
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from json_stream import comment_files, iter_comments
+
+# Typed schemas for the Parquet datasets. Reddit ids are base36 strings and are
+# stored as int64 (see decode_id/encode_id); `author` is dictionary-encoded since
+# a handful of regulars write most of the posts and comments.
+POST_SCHEMA = pa.schema([
+    ('season', pa.int32()),
+    ('episode_number', pa.int32()),
+    ('id', pa.int64()),
+    ('title', pa.string()),
+    ('author', pa.dictionary(pa.int32(), pa.string())),
+    ('created_utc', pa.timestamp('s', tz='UTC')),
+    ('score', pa.int64()),
+    ('num_comments', pa.int64()),
+    ('url', pa.string()),
+    ('permalink', pa.string()),
+    ('selftext', pa.string()),
+])
+
+COMMENT_SCHEMA = pa.schema([
+    ('season', pa.int32()),
+    ('episode_number', pa.int32()),
+    ('id', pa.int64()),
+    ('author', pa.dictionary(pa.int32(), pa.string())),
+    ('body', pa.string()),
+    ('score', pa.int64()),
+    ('created_utc', pa.timestamp('s', tz='UTC')),
+    ('permalink', pa.string()),
+    ('depth', pa.int32()),
+])
+
+PARTITION_COLS = ['season', 'episode_number']
+PARTITION_SCHEMA = pa.schema([('season', pa.int32()), ('episode_number', pa.int32())])
+
+
+def decode_id(reddit_id):
+    """Convert a base36 Reddit id (e.g. '1oh7qjr' or 't3_1oh7qjr') to an int64."""
+    if not reddit_id:
+        return None
+    return int(str(reddit_id).split('_')[-1], 36)
+
+
+def encode_id(value):
+    """Convert an int64 id back to Reddit's base36 string."""
+    if value is None:
+        return None
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    value = int(value)
+    encoded = ''
+    while True:
+        value, remainder = divmod(value, 36)
+        encoded = digits[remainder] + encoded
+        if value == 0:
+            return encoded
+
+
+def _to_int(value):
+    if value is None or value == '':
+        return None
+    return int(float(value))
+
+
+def posts_to_table(posts, season, episode_number=None):
+    """
+    Build a typed Arrow table from post dicts (as written by fetch_reddit.py).
+    Each post needs an `episode_number` unless one is given for all of them.
+    """
+    columns = {name: [] for name in POST_SCHEMA.names}
+    for post in posts:
+        columns['season'].append(season)
+        columns['episode_number'].append(int(post.get('episode_number', episode_number)))
+        columns['id'].append(decode_id(post.get('id')))
+        columns['title'].append(post.get('title'))
+        columns['author'].append(post.get('author'))
+        columns['created_utc'].append(_to_int(post.get('created_utc')))
+        columns['score'].append(_to_int(post.get('score')) or 0)
+        columns['num_comments'].append(_to_int(post.get('num_comments')) or 0)
+        columns['url'].append(post.get('url'))
+        columns['permalink'].append(post.get('permalink'))
+        columns['selftext'].append(post.get('selftext') or '')
+    return pa.Table.from_pydict(columns, schema=POST_SCHEMA)
+
+
+def comments_to_table(comments, season, episode_number):
+    """Build a typed Arrow table from comment dicts (as written by fetch_discourse.py)."""
+    columns = {name: [] for name in COMMENT_SCHEMA.names}
+    for comment in comments:
+        columns['season'].append(season)
+        columns['episode_number'].append(int(episode_number))
+        columns['id'].append(decode_id(comment.get('id')))
+        columns['author'].append(comment.get('author'))
+        columns['body'].append(comment.get('body') or '')
+        columns['score'].append(_to_int(comment.get('score')) or 0)
+        columns['created_utc'].append(_to_int(comment.get('created_utc')))
+        columns['permalink'].append(comment.get('permalink'))
+        columns['depth'].append(_to_int(comment.get('depth')) or 0)
+    return pa.Table.from_pydict(columns, schema=COMMENT_SCHEMA)
+
+
+class PartitionedWriter:
+    """
+    Stream records into a Hive-partitioned dataset with bounded memory.
+
+    Records are buffered until `batch_size` are pending, then written as one row
+    group per partition through a ParquetWriter kept open for each partition.
+    A partition's existing files are replaced on its first write; other
+    partitions are left untouched.
+
+    Args:
+        root: Dataset directory (e.g. data/parquet/posts)
+        to_table: posts_to_table or comments_to_table
+        season: Season partition value
+        batch_size: Records buffered before flushing
+    """
+
+    def __init__(self, root, to_table, season, batch_size=50000):
+        self.root = Path(root)
+        self.to_table = to_table
+        self.season = season
+        self.batch_size = batch_size
+        self.buffers = {}
+        self.buffered = 0
+        self.writers = {}
+        self.counts = {}
+
+    def write(self, record):
+        """Queue one record (it must carry `episode_number`)."""
+        episode_number = int(record['episode_number'])
+        self.buffers.setdefault(episode_number, []).append(record)
+        self.counts[episode_number] = self.counts.get(episode_number, 0) + 1
+        self.buffered += 1
+        if self.buffered >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Write every buffered record."""
+        for episode_number, records in self.buffers.items():
+            if not records:
+                continue
+            table = self.to_table(records, self.season, episode_number)
+            table = table.select([name for name in table.schema.names if name not in PARTITION_COLS])
+            self._writer(episode_number, table.schema).write_table(table)
+        self.buffers = {}
+        self.buffered = 0
+
+    def _writer(self, episode_number, schema):
+        if episode_number not in self.writers:
+            partition_dir = self.root / f"season={self.season}" / f"episode_number={episode_number}"
+            if partition_dir.exists():
+                for old_file in partition_dir.glob('*.parquet'):
+                    old_file.unlink()
+            partition_dir.mkdir(parents=True, exist_ok=True)
+            self.writers[episode_number] = pq.ParquetWriter(str(partition_dir / 'part-0.parquet'), schema)
+        return self.writers[episode_number]
+
+    def close(self):
+        """Flush and close all partition files. Returns the record count per episode."""
+        self.flush()
+        for writer in self.writers.values():
+            writer.close()
+        self.writers = {}
+        return self.counts
+
+
+def read_dataset(root, columns=None, filters=None):
+    """
+    Read a partitioned dataset with column projection and predicate pushdown.
+
+    Args:
+        root: Dataset directory (e.g. data/parquet/posts)
+        columns: Columns to load (default: all)
+        filters: pyarrow filter expression or DNF list, e.g.
+            [('season', '=', 7), ('episode_number', '>=', 10)]
+
+    Returns:
+        pyarrow.Table (call `.to_pandas()` for a DataFrame)
+    """
+    return pq.read_table(
+        str(root),
+        columns=columns,
+        filters=filters,
+        memory_map=True,
+        partitioning=ds.partitioning(PARTITION_SCHEMA, flavor='hive'),
+    )
+
+
+def convert_data_dir(data_dir='../data', output_dir=None, season=7):
+    """
+    One-shot conversion of the existing data/ directory to Parquet datasets.
+
+    Streams every reddit_episode_N.csv into `<output_dir>/posts` and every
+    comments/comments_episode_N.json(l) into `<output_dir>/comments`.
+
+    Returns:
+        dict: Number of posts and comments written
+    """
+    data_path = Path(data_dir)
+    output_path = Path(output_dir or data_path / 'parquet')
+
+    post_writer = PartitionedWriter(output_path / 'posts', posts_to_table, season)
+    for csv_file in sorted(data_path.glob('reddit_episode_*.csv')):
+        episode_number = int(re.search(r'reddit_episode_(\d+)\.csv', csv_file.name).group(1))
+        with open(csv_file, 'r', encoding='utf-8') as f:
+            for post in csv.DictReader(f):
+                post_writer.write({**post, 'episode_number': episode_number})
+
+    comment_writer = PartitionedWriter(output_path / 'comments', comments_to_table, season)
+    for episode_number, comments_file in comment_files(data_path / 'comments').items():
+        for comment in iter_comments(comments_file):
+            comment_writer.write({**comment, 'episode_number': episode_number})
+
+    counts = {
+        'posts': sum(post_writer.close().values()),
+        'comments': sum(comment_writer.close().values()),
+    }
+
+    print(f"Wrote {counts['posts']} posts and {counts['comments']} comments to {output_path}")
+    return counts
+
+
+if __name__ == "__main__":
+    convert_data_dir("../data", "../data/parquet", season=7)
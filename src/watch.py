@@ -0,0 +1,165 @@
+import heapq
+import re
+import time
+from pathlib import Path
+
+from analytics_db import connect
+from fetch_discourse import refresh_thread_comments
+from fetch_reddit import scrape_reddit_episodes
+from http_client import TokenBucket, make_session
+from incremental import load_state, save_state
+
+# e.g. "Season 7 Episode 20 (Thursday 27th November) Discussion Thread"
+DISCUSSION_TITLE = re.compile(r'^Season (\d+) Episode (\d+)\b.*Discussion Thread', re.IGNORECASE)
+
+HOUR = 3600
+
+
+def discover_threads(posts, season=None, pattern=DISCUSSION_TITLE):
+    """
+    Find episode discussion threads among scraped posts.
+
+    `pattern` matches a discussion thread title, with the season and episode
+    number as its first two groups.
+
+    Returns:
+        dict: Episode name ('Episode N') to {'url', 'created_utc'}
+    """
+    threads = {}
+    for post in posts:
+        match = pattern.match(post.get('title') or '')
+        if not match or (season is not None and int(match.group(1)) != season):
+            continue
+        episode_name = f"Episode {int(match.group(2))}"
+        # Keep the earliest thread if an episode was posted twice
+        if episode_name not in threads or post['created_utc'] < threads[episode_name]['created_utc']:
+            threads[episode_name] = {'url': post['permalink'], 'created_utc': post['created_utc']}
+    return threads
+
+
+class ThreadScheduler:
+    """
+    Priority queue of discussion threads ordered by when they are next due.
+
+    Threads younger than `hot_age` are polled every `hot_interval` seconds,
+    older ones every `cold_interval`, and threads older than `max_age` are
+    dropped, so the request budget goes where comments are still arriving.
+    """
+
+    def __init__(self, hot_age=48 * HOUR, hot_interval=10 * 60, cold_interval=12 * HOUR,
+                 max_age=14 * 24 * HOUR):
+        self.hot_age = hot_age
+        self.hot_interval = hot_interval
+        self.cold_interval = cold_interval
+        self.max_age = max_age
+        self.threads = {}
+        self.queue = []
+
+    def interval_for(self, created_utc, now):
+        """Seconds until the next poll of a thread, or None if it should no longer be polled."""
+        age = now - created_utc
+        if age > self.max_age:
+            return None
+        if age <= self.hot_age:
+            return self.hot_interval
+        return self.cold_interval
+
+    def add(self, episode_name, url, created_utc, now):
+        """Track a thread; new threads are due immediately."""
+        if episode_name in self.threads:
+            return False
+        self.threads[episode_name] = {'url': url, 'created_utc': created_utc}
+        heapq.heappush(self.queue, (now, episode_name))
+        return True
+
+    def next_due(self):
+        """Time the next thread is due, or None if nothing is scheduled."""
+        return self.queue[0][0] if self.queue else None
+
+    def pop_due(self, now):
+        """Remove and return the names of all threads due at `now`."""
+        due = []
+        while self.queue and self.queue[0][0] <= now:
+            due.append(heapq.heappop(self.queue)[1])
+        return due
+
+    def reschedule(self, episode_name, now):
+        """Queue a polled thread again according to its tier."""
+        interval = self.interval_for(self.threads[episode_name]['created_utc'], now)
+        if interval is not None:
+            heapq.heappush(self.queue, (now + interval, episode_name))
+
+
+def watch(output_dir='../data/comments', posts_file='../data/reddit_episodes.json', db_path=None,
+          season=7, discover_interval=30 * 60, scheduler=None, clock=time.time, sleep=time.sleep,
+          discover=None, poll=None, max_iterations=None):
+    """
+    Long-running live-season mode.
+
+    Every `discover_interval` seconds the subreddit search is refreshed
+    incrementally and new discussion threads are added to the scheduler. In
+    between, threads that are due are polled for new comments only, which are
+    merged into comments_episode_N.json and the analytics database.
+
+    Args:
+        output_dir: Directory of comments_episode_N.json files
+        posts_file: Post search output refreshed for thread discovery
+        db_path: Analytics database to append to (optional)
+        season: Only track discussion threads of this season
+        discover_interval: Seconds between thread discovery runs
+        scheduler: ThreadScheduler (default: 48h hot tier)
+        clock: Returns the current Unix time (injectable for a simulated clock)
+        sleep: Sleeps for a number of seconds (injectable for a simulated clock)
+        discover: Callable returning scraped posts (default: incremental scrape_reddit_episodes)
+        poll: Callable(episode_name, url) polling one thread (default: refresh_thread_comments)
+        max_iterations: Stop after this many scheduler wake-ups (default: run forever)
+    """
+    output_path = Path(output_dir)
+    output_path.mkdir(exist_ok=True)
+    scheduler = scheduler or ThreadScheduler()
+    state_file = output_path / 'refresh_state.json'
+    state = load_state(state_file)
+
+    if discover is None:
+        def discover():
+            return scrape_reddit_episodes(output_file=posts_file, incremental=True)['posts']
+
+    if poll is None:
+        conn = connect(db_path) if db_path else None
+        session = make_session(pool_size=1)
+        limiter = TokenBucket(rate=0.5, capacity=1)
+
+        def poll(episode_name, url):
+            added, updated, total = refresh_thread_comments(episode_name, url, output_path, state,
+                                                            session, limiter, conn)
+            save_state(state, state_file)
+            return added
+
+    next_discovery = clock()
+    iterations = 0
+    while max_iterations is None or iterations < max_iterations:
+        iterations += 1
+        now = clock()
+
+        if now >= next_discovery:
+            for episode_name, thread in discover_threads(discover(), season).items():
+                if scheduler.interval_for(thread['created_utc'], now) is None:
+                    continue
+                if scheduler.add(episode_name, thread['url'], thread['created_utc'], now):
+                    print(f"Watching {episode_name}: {thread['url']}")
+            next_discovery = now + discover_interval
+
+        for episode_name in scheduler.pop_due(now):
+            try:
+                added = poll(episode_name, scheduler.threads[episode_name]['url'])
+                print(f"  {episode_name}: {added} new comments")
+            except Exception as e:
+                print(f"  {episode_name}: poll failed ({e}), will retry next interval")
+            scheduler.reschedule(episode_name, clock())
+
+        wake_at = min(t for t in (scheduler.next_due(), next_discovery) if t is not None)
+        sleep(max(0, wake_at - clock()))
+
+
+if __name__ == "__main__":
+    watch(db_path="../data/analytics.sqlite")
@@ -0,0 +1,178 @@
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+try:
+    import pytest_benchmark
+except ImportError:
+    pytest_benchmark = None
+
+# The modules in src/ import each other by bare name, as when run from src/
+SRC_DIR = Path(__file__).resolve().parent.parent / 'src'
+sys.path.insert(0, str(SRC_DIR))
+
+import http_client  # noqa: E402
+from metrics import registry  # noqa: E402
+
+FIXTURES_DIR = Path(__file__).resolve().parent / 'fixtures'
+
+# Benchmarks need the pytest-benchmark plugin; the other tests run without it
+requires_benchmark = pytest.mark.skipif(pytest_benchmark is None, reason="pytest-benchmark is not installed")
+
+
+def load_fixture(name, mode='r'):
+    """Contents of a file in tests/fixtures (bytes with mode='rb')."""
+    with open(FIXTURES_DIR / name, mode, **({} if 'b' in mode else {'encoding': 'utf-8'})) as f:
+        return f.read()
+
+
+class StubServer:
+    """
+    Local HTTP server answering from a table of canned responses.
+
+    `route(path, *responses)` registers the responses for a path, served in
+    order with the last one repeating. A response is a body (dict/list sent as
+    JSON, str/bytes as HTML) with status 200, a (status, body) or
+    (status, body, headers) tuple, or a callable taking the parsed query and
+    returning one of those. Unrouted paths answer 404. A Content-Length header
+    overrides the real length, e.g. to send a truncated body. Every request is
+    recorded in `requests` as (path, query), and its headers in `request_headers`.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.request_headers = []
+        self.delay = 0.0
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05},
+                                       daemon=True)
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def url(self, path):
+        return self.base_url + path
+
+    def route(self, path, *responses):
+        self.routes[path] = list(responses)
+
+    def hits(self, path):
+        """Number of requests made to `path`."""
+        return sum(1 for request_path, _ in self.requests if request_path == path)
+
+    def respond(self, path, query, headers=None):
+        with self.lock:
+            self.requests.append((path, query))
+            self.request_headers.append(headers or {})
+            responses = self.routes.get(path)
+            if not responses:
+                return 404, {'error': 404}, {}
+            response = responses.pop(0) if len(responses) > 1 else responses[0]
+        if callable(response):
+            response = response(query)
+        if not isinstance(response, tuple):
+            response = (200, response)
+        status, body, *headers = response
+        return status, body, headers[0] if headers else {}
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(parsed.query).items()}
+                status, body, headers = stub.respond(parsed.path, query, dict(self.headers))
+                if stub.delay:
+                    time.sleep(stub.delay)
+                if isinstance(body, (dict, list)):
+                    content, content_type = json.dumps(body).encode('utf-8'), 'application/json'
+                else:
+                    content = body.encode('utf-8') if isinstance(body, str) else body
+                    content_type = 'text/html; charset=UTF-8'
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                if 'Content-Length' not in headers:
+                    self.send_header('Content-Length', str(len(content)))
+                for name, value in headers.items():
+                    self.send_header(name, str(value))
+                self.end_headers()
+                self.wfile.write(content)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def reddit_post(post_id, created_utc, title='Season 7 Episode 1 Discussion', **fields):
+    """A t3 thing as returned in Reddit search listings."""
+    return {'kind': 't3', 'data': {
+        'id': post_id, 'name': f"t3_{post_id}", 'title': title, 'author': 'islander',
+        'created_utc': created_utc, 'score': 1, 'num_comments': 0, 'selftext': '',
+        'url': f"https://www.reddit.com/r/LoveIslandAus/comments/{post_id}/",
+        'permalink': f"/r/LoveIslandAus/comments/{post_id}/", **fields,
+    }}
+
+
+class FakeSearch:
+    """
+    Fake /r/<subreddit>/search.json: pages through the posts matching each
+    query, newest first, `page_size` at a time with Reddit's `after` cursor.
+    Requests resuming from a cursor in `failing_cursors` answer 500.
+    """
+
+    def __init__(self, results, page_size=2):
+        self.results = results
+        self.page_size = page_size
+        self.failing_cursors = set()
+
+    def __call__(self, query):
+        after = query.get('after')
+        if after in self.failing_cursors:
+            return 500, {'error': 500}
+        posts = sorted(self.results.get(query['q'], []), key=lambda p: p['data']['created_utc'], reverse=True)
+        start = 0
+        if after:
+            start = next(i for i, p in enumerate(posts) if p['data']['name'] == after) + 1
+        page = posts[start:start + self.page_size]
+        more = start + self.page_size < len(posts)
+        return {'kind': 'Listing', 'data': {'children': page,
+                                            'after': page[-1]['data']['name'] if page and more else None}}
+
+
+@pytest.fixture
+def stub_server():
+    with StubServer() as server:
+        yield server
+
+
+@pytest.fixture(autouse=True)
+def isolated_http_client(monkeypatch):
+    """Fresh circuit breakers, no response cache, no real backoff sleeps, empty metrics."""
+    monkeypatch.setattr(http_client, '_breakers', {})
+    monkeypatch.setattr(http_client, '_default_cache', None)
+    monkeypatch.setattr(http_client, 'DEFAULT_RETRY',
+                        http_client.RetryPolicy(base_delay=0, sleep=lambda seconds: None))
+    registry.reset()
+    yield
+    registry.reset()
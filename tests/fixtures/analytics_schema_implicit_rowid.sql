@@ -0,0 +1,161 @@
+-- analytics_db.SCHEMA as of the first full-text search version: posts and
+-- comments keyed on their text id, full-text indexes on the implicit rowid.
+
+CREATE TABLE IF NOT EXISTS episodes (
+    season INTEGER NOT NULL,
+    episode_number INTEGER NOT NULL,
+    air_date TEXT NOT NULL,
+    air_date_timestamp INTEGER NOT NULL,
+    PRIMARY KEY (season, episode_number)
+);
+
+CREATE TABLE IF NOT EXISTS posts (
+    id TEXT PRIMARY KEY,
+    season INTEGER NOT NULL,
+    episode_number INTEGER NOT NULL,
+    title TEXT,
+    author TEXT,
+    created_utc REAL,
+    score INTEGER NOT NULL DEFAULT 0,
+    num_comments INTEGER NOT NULL DEFAULT 0,
+    url TEXT,
+    permalink TEXT,
+    selftext TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_posts_episode_created ON posts (season, episode_number, created_utc);
+CREATE INDEX IF NOT EXISTS idx_posts_author ON posts (author);
+CREATE INDEX IF NOT EXISTS idx_posts_score ON posts (score);
+
+CREATE TABLE IF NOT EXISTS comments (
+    id TEXT PRIMARY KEY,
+    season INTEGER NOT NULL,
+    episode_number INTEGER NOT NULL,
+    author TEXT,
+    body TEXT,
+    score INTEGER NOT NULL DEFAULT 0,
+    created_utc REAL,
+    permalink TEXT,
+    depth INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_comments_episode_created ON comments (season, episode_number, created_utc);
+CREATE INDEX IF NOT EXISTS idx_comments_author ON comments (author);
+CREATE INDEX IF NOT EXISTS idx_comments_score ON comments (score);
+
+-- Per-episode rollups, kept current by the triggers below on every ingest.
+-- Triggers are recreated on connect so databases built by older versions pick up fixes.
+CREATE TABLE IF NOT EXISTS episode_rollups (
+    season INTEGER NOT NULL,
+    episode_number INTEGER NOT NULL,
+    num_posts INTEGER NOT NULL DEFAULT 0,
+    post_score INTEGER NOT NULL DEFAULT 0,
+    num_comments INTEGER NOT NULL DEFAULT 0,
+    comment_count INTEGER NOT NULL DEFAULT 0,
+    comment_score INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (season, episode_number)
+);
+
+DROP TRIGGER IF EXISTS trg_posts_insert;
+CREATE TRIGGER trg_posts_insert AFTER INSERT ON posts BEGIN
+    INSERT INTO episode_rollups (season, episode_number)
+    SELECT NEW.season, NEW.episode_number
+    WHERE NOT EXISTS (SELECT 1 FROM episode_rollups WHERE season = NEW.season AND episode_number = NEW.episode_number);
+    UPDATE episode_rollups
+    SET num_posts = num_posts + 1,
+        post_score = post_score + NEW.score,
+        num_comments = num_comments + NEW.num_comments
+    WHERE season = NEW.season AND episode_number = NEW.episode_number;
+END;
+
+DROP TRIGGER IF EXISTS trg_posts_update;
+CREATE TRIGGER trg_posts_update AFTER UPDATE ON posts BEGIN
+    UPDATE episode_rollups
+    SET num_posts = num_posts - 1,
+        post_score = post_score - OLD.score,
+        num_comments = num_comments - OLD.num_comments
+    WHERE season = OLD.season AND episode_number = OLD.episode_number;
+    INSERT INTO episode_rollups (season, episode_number)
+    SELECT NEW.season, NEW.episode_number
+    WHERE NOT EXISTS (SELECT 1 FROM episode_rollups WHERE season = NEW.season AND episode_number = NEW.episode_number);
+    UPDATE episode_rollups
+    SET num_posts = num_posts + 1,
+        post_score = post_score + NEW.score,
+        num_comments = num_comments + NEW.num_comments
+    WHERE season = NEW.season AND episode_number = NEW.episode_number;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_posts_delete AFTER DELETE ON posts BEGIN
+    UPDATE episode_rollups
+    SET num_posts = num_posts - 1,
+        post_score = post_score - OLD.score,
+        num_comments = num_comments - OLD.num_comments
+    WHERE season = OLD.season AND episode_number = OLD.episode_number;
+END;
+
+DROP TRIGGER IF EXISTS trg_comments_insert;
+CREATE TRIGGER trg_comments_insert AFTER INSERT ON comments BEGIN
+    INSERT INTO episode_rollups (season, episode_number)
+    SELECT NEW.season, NEW.episode_number
+    WHERE NOT EXISTS (SELECT 1 FROM episode_rollups WHERE season = NEW.season AND episode_number = NEW.episode_number);
+    UPDATE episode_rollups
+    SET comment_count = comment_count + 1,
+        comment_score = comment_score + NEW.score
+    WHERE season = NEW.season AND episode_number = NEW.episode_number;
+END;
+
+DROP TRIGGER IF EXISTS trg_comments_update;
+CREATE TRIGGER trg_comments_update AFTER UPDATE ON comments BEGIN
+    UPDATE episode_rollups
+    SET comment_count = comment_count - 1,
+        comment_score = comment_score - OLD.score
+    WHERE season = OLD.season AND episode_number = OLD.episode_number;
+    INSERT INTO episode_rollups (season, episode_number)
+    SELECT NEW.season, NEW.episode_number
+    WHERE NOT EXISTS (SELECT 1 FROM episode_rollups WHERE season = NEW.season AND episode_number = NEW.episode_number);
+    UPDATE episode_rollups
+    SET comment_count = comment_count + 1,
+        comment_score = comment_score + NEW.score
+    WHERE season = NEW.season AND episode_number = NEW.episode_number;
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_comments_delete AFTER DELETE ON comments BEGIN
+    UPDATE episode_rollups
+    SET comment_count = comment_count - 1,
+        comment_score = comment_score - OLD.score
+    WHERE season = OLD.season AND episode_number = OLD.episode_number;
+END;
+
+-- Full-text indexes over post titles/text and comment bodies. They store no
+-- copy of the text (external content) and are kept in sync by the triggers below.
+CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+    title, selftext, content='posts', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS comments_fts USING fts5(
+    body, content='comments', content_rowid='rowid', tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER IF NOT EXISTS trg_posts_fts_insert AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts (rowid, title, selftext) VALUES (NEW.rowid, NEW.title, NEW.selftext);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_posts_fts_update AFTER UPDATE OF title, selftext ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, selftext) VALUES ('delete', OLD.rowid, OLD.title, OLD.selftext);
+    INSERT INTO posts_fts (rowid, title, selftext) VALUES (NEW.rowid, NEW.title, NEW.selftext);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_posts_fts_delete AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, selftext) VALUES ('delete', OLD.rowid, OLD.title, OLD.selftext);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_comments_fts_insert AFTER INSERT ON comments BEGIN
+    INSERT INTO comments_fts (rowid, body) VALUES (NEW.rowid, NEW.body);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_comments_fts_update AFTER UPDATE OF body ON comments BEGIN
+    INSERT INTO comments_fts (comments_fts, rowid, body) VALUES ('delete', OLD.rowid, OLD.body);
+    INSERT INTO comments_fts (rowid, body) VALUES (NEW.rowid, NEW.body);
+END;
+
+CREATE TRIGGER IF NOT EXISTS trg_comments_fts_delete AFTER DELETE ON comments BEGIN
+    INSERT INTO comments_fts (comments_fts, rowid, body) VALUES ('delete', OLD.rowid, OLD.body);
+END;
+
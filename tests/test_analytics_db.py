@@ -0,0 +1,240 @@
+import sqlite3
+from pathlib import Path
+
+import pytest
+
+from analytics_db import (connect, episode_rollups, ingest_comments, ingest_comments_dir, ingest_episodes,
+                          ingest_posts, match_expression, search_mentions, search_top)
+from conftest import load_fixture
+from json_stream import iter_posts
+from parse_reddit_episodes import AMBIGUOUS_RANGES, EpisodeIndex, parse_episodes_csv
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+
+
+def comment(comment_id, body, episode_number=1, score=1):
+    return {'id': comment_id, 'author': 'islander', 'body': body, 'score': score,
+            'created_utc': 1761552000.0, 'permalink': f"https://www.reddit.com/c/{comment_id}/", 'depth': 0}
+
+
+def post(post_id, title, episode_number=1, score=1, selftext=''):
+    return {'id': post_id, 'episode_number': episode_number, 'title': title, 'author': 'islander',
+            'created_utc': 1761552000.0, 'score': score, 'num_comments': 0, 'selftext': selftext}
+
+
+def ingest_data_dir(conn):
+    """Load data/ into `conn` the way build_database does."""
+    episodes = parse_episodes_csv(DATA_DIR / 'episodes.csv')
+    ingest_episodes(conn, episodes)
+    index = EpisodeIndex(episodes, AMBIGUOUS_RANGES)
+    ingest_posts(conn, ({**p, 'episode_number': index.assign(p)} for p in iter_posts(DATA_DIR / 'reddit_episodes.json')))
+    ingest_comments_dir(conn, DATA_DIR / 'comments')
+
+
+def fts_integrity_check(conn):
+    # Raises sqlite3.DatabaseError if an index disagrees with its content table
+    with conn:
+        conn.execute("INSERT INTO posts_fts (posts_fts, rank) VALUES ('integrity-check', 1)")
+        conn.execute("INSERT INTO comments_fts (comments_fts, rank) VALUES ('integrity-check', 1)")
+
+
+@pytest.fixture
+def db(tmp_path):
+    conn = connect(tmp_path / 'analytics.sqlite')
+    ingest_comments(conn, [
+        comment('c1', 'Bailey dumped her at the recoupling', score=10),
+        comment('c2', 'The recouplings this season are brutal', score=5),
+        comment('c3', 'Did he really say "AND NOT" on national TV?', episode_number=2, score=3),
+        comment('c4', 'title: bailey is a column filter in FTS5', episode_number=2, score=1),
+    ], episode_number=1)
+    ingest_comments(conn, [comment('c5', 'Dumped Bailey? Never', score=7)], episode_number=2)
+    ingest_posts(conn, [post('p1', 'Episode 1 recoupling thoughts', score=20),
+                        post('p2', 'Bailey appreciation thread', episode_number=2, selftext='dumped')])
+    yield conn
+    conn.close()
+
+
+def hits(conn, query, mode='term'):
+    return {(row['episode_number'], row['comment_hits'], row['post_hits'])
+            for row in search_mentions(conn, query, mode)}
+
+
+def test_term_phrase_and_prefix_queries(db):
+    # Every word, any order; case and word order don't matter
+    assert hits(db, 'dumped BAILEY') == {(1, 1, 0), (2, 1, 1)}
+    # The words in order
+    assert hits(db, 'bailey dumped', mode='phrase') == {(1, 1, 0)}
+    # Whole words only, unless searched as a prefix
+    assert hits(db, 'recoupling') == {(1, 1, 1)}
+    assert hits(db, 'recoupl', mode='prefix') == {(1, 2, 1)}
+
+
+def test_search_top_orders_by_score_with_snippets(db):
+    top = search_top(db, 'bailey')
+
+    assert [c['id'] for c in top['top_comments']] == ['c1', 'c5', 'c4']
+    assert top['top_comments'][0]['snippet'] == '[Bailey] dumped her at the recoupling'
+    assert [p['id'] for p in top['top_posts']] == ['p2']
+
+
+@pytest.mark.parametrize('query, expected', [
+    ('AND NOT', '"AND" "NOT"'),
+    ('"AND NOT"', '"""AND" "NOT"""'),
+    ('title: bailey', '"title:" "bailey"'),
+    ('NEAR(bailey dumped)', '"NEAR(bailey" "dumped)"'),
+    ('-dumped *', '"-dumped" "*"'),
+])
+def test_operators_and_quotes_in_input_are_searched_literally(db, query, expected):
+    assert match_expression(query) == expected
+    # Valid FTS5 syntax whatever the input
+    search_mentions(db, query)
+
+
+def test_operator_words_match_as_text(db):
+    assert hits(db, 'and not') == {(1, 1, 0)}
+    assert hits(db, '"AND NOT"', mode='phrase') == {(1, 1, 0)}
+    assert hits(db, 'title: bailey') == {(1, 1, 0)}
+
+
+def test_bad_queries_are_rejected(db):
+    with pytest.raises(ValueError):
+        match_expression('   ')
+    with pytest.raises(ValueError):
+        match_expression('bailey', mode='regex')
+
+
+def test_index_follows_upserts_and_deletes(db):
+    ingest_comments(db, [comment('c1', 'Tonight was all about the villa challenge', score=10)], 1)
+
+    assert [c['id'] for c in search_top(db, 'bailey')['top_comments']] == ['c5', 'c4']
+    assert [c['id'] for c in search_top(db, 'villa')['top_comments']] == ['c1']
+
+    # Score-only upserts leave the indexed text alone
+    ingest_comments(db, [comment('c5', 'Dumped Bailey? Never', score=99)], 2)
+    assert search_top(db, 'bailey')['top_comments'][0]['score'] == 99
+
+    with db:
+        db.execute("DELETE FROM comments WHERE id = 'c5'")
+        db.execute("DELETE FROM posts WHERE id = 'p2'")
+    assert hits(db, 'bailey') == {(1, 1, 0)}
+    fts_integrity_check(db)
+
+
+def test_vacuum_keeps_the_index_in_sync(db):
+    with db:
+        db.execute("DELETE FROM comments WHERE id IN ('c1', 'c2')")
+    db.execute("VACUUM")
+
+    assert [c['id'] for c in search_top(db, 'bailey')['top_comments']] == ['c5', 'c4']
+    fts_integrity_check(db)
+
+
+def test_implicit_rowid_database_is_migrated(tmp_path):
+    old_path = tmp_path / 'old.sqlite'
+    old = sqlite3.connect(old_path)
+    old.row_factory = sqlite3.Row
+    old.executescript(load_fixture('analytics_schema_implicit_rowid.sql'))
+    ingest_data_dir(old)
+    # Deleting rows leaves gaps in the implicit rowids
+    with old:
+        old.execute("DELETE FROM comments WHERE rowid % 7 = 0")
+    old.close()
+
+    migrated = connect(old_path)
+    fresh = connect(tmp_path / 'fresh.sqlite')
+    ingest_data_dir(fresh)
+    with fresh:
+        fresh.execute("DELETE FROM comments WHERE pk % 7 = 0")
+
+    columns = [row['name'] for row in migrated.execute("PRAGMA table_info(comments)")]
+    assert columns[0] == 'pk'
+    assert not migrated.execute("SELECT 1 FROM sqlite_master WHERE name LIKE '%_old'").fetchone()
+    assert episode_rollups(migrated) == episode_rollups(fresh)
+    for query, mode in (('bombshell', 'term'), ('love island', 'phrase'), ('recoup', 'prefix')):
+        assert search_mentions(migrated, query, mode) == search_mentions(fresh, query, mode)
+        assert search_top(migrated, query, mode) == search_top(fresh, query, mode)
+    fts_integrity_check(migrated)
+
+    # Reconnecting does not migrate again
+    migrated.close()
+    assert episode_rollups(connect(old_path)) == episode_rollups(fresh)
+
+
+def test_triggers_are_redefined_on_connect(tmp_path):
+    path = tmp_path / 'analytics.sqlite'
+    conn = connect(path)
+    # A database left with an older definition of a delete trigger
+    conn.executescript("""
+        DROP TRIGGER trg_comments_fts_delete;
+        CREATE TRIGGER trg_comments_fts_delete AFTER DELETE ON comments BEGIN SELECT 1; END;
+    """)
+    conn.close()
+
+    conn = connect(path)
+    ingest_comments(conn, [comment('c1', 'Bailey dumped her at the recoupling')], 1)
+    with conn:
+        conn.execute("DELETE FROM comments WHERE id = 'c1'")
+
+    assert search_top(conn, 'bailey')['top_comments'] == []
+    fts_integrity_check(conn)
+
+
+def recomputed_rollups(conn):
+    """The rollups recomputed from scratch, for comparison with the trigger-maintained table."""
+    rollups = {}
+    for row in conn.execute("SELECT season, episode_number, COUNT(*), SUM(score), SUM(num_comments) "
+                            "FROM posts GROUP BY season, episode_number"):
+        rollups[tuple(row[:2])] = [row[2], row[3], row[4], 0, 0]
+    for row in conn.execute("SELECT season, episode_number, COUNT(*), SUM(score) "
+                            "FROM comments GROUP BY season, episode_number"):
+        rollups.setdefault(tuple(row[:2]), [0, 0, 0, 0, 0])[3:] = [row[2], row[3]]
+    return {key: tuple(values) for key, values in rollups.items()}
+
+
+def stored_rollups(conn):
+    # Episodes whose rows were all deleted keep a rollup of zeros
+    return {tuple(row[:2]): tuple(row[2:]) for row in conn.execute(
+        "SELECT season, episode_number, num_posts, post_score, num_comments, comment_count, comment_score "
+        "FROM episode_rollups WHERE num_posts OR comment_count")}
+
+
+@pytest.fixture
+def season_db(tmp_path):
+    conn = connect(tmp_path / 'analytics.sqlite')
+    ingest_data_dir(conn)
+    yield conn
+    conn.close()
+
+
+def test_rollups_match_a_fresh_group_by_after_every_change(season_db):
+    assert stored_rollups(season_db) == recomputed_rollups(season_db)
+
+    # Rescored posts and comments, some moved to another episode or season
+    posts = [dict(row) for row in season_db.execute("SELECT * FROM posts ORDER BY pk LIMIT 20")]
+    ingest_posts(season_db, [{**p, 'score': p['score'] + 5, 'num_comments': p['num_comments'] * 2} for p in posts[:10]])
+    ingest_posts(season_db, [{**p, 'episode_number': p['episode_number'] + 1} for p in posts[10:]])
+    ingest_posts(season_db, [{**posts[0], 'episode_number': 1}], season=8)
+    for episode_number in (1, 20):
+        comments = [dict(row) for row in season_db.execute(
+            "SELECT * FROM comments WHERE episode_number = ? ORDER BY pk LIMIT 10", (episode_number,))]
+        ingest_comments(season_db, [{**c, 'score': c['score'] - 3} for c in comments], episode_number + 1)
+    assert stored_rollups(season_db) == recomputed_rollups(season_db)
+
+    with season_db:
+        season_db.execute("DELETE FROM posts WHERE pk % 3 = 0")
+        season_db.execute("DELETE FROM comments WHERE episode_number = 20 OR pk % 5 = 0")
+    assert stored_rollups(season_db) == recomputed_rollups(season_db)
+
+
+def test_reingesting_the_same_data_changes_nothing(season_db):
+    before = episode_rollups(season_db)
+    changes = season_db.total_changes
+
+    posts = [dict(row) for row in season_db.execute("SELECT * FROM posts")]
+    assert ingest_posts(season_db, posts) == 0
+    assert ingest_comments_dir(season_db, DATA_DIR / 'comments') == 0
+    ingest_data_dir(season_db)
+
+    assert episode_rollups(season_db) == before
+    # Only the episodes (INSERT OR REPLACE) were written again
+    assert season_db.total_changes - changes == season_db.execute("SELECT COUNT(*) FROM episodes").fetchone()[0]
@@ -0,0 +1,80 @@
+import sys
+import threading
+from http.server import HTTPServer
+from pathlib import Path
+
+import pytest
+import requests
+
+from analytics_db import build_database, episode_rollups
+
+# app.py lives at the repository root, next to src/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app import handle_query, make_handler  # noqa: E402
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+
+
+@pytest.fixture(scope='module')
+def conn(tmp_path_factory):
+    conn = build_database(DATA_DIR, tmp_path_factory.mktemp('db') / 'analytics.sqlite')
+    yield conn
+    conn.close()
+
+
+@pytest.fixture(scope='module')
+def api(conn):
+    """The query API served on a free local port; yields its base URL."""
+    server = HTTPServer(('127.0.0.1', 0), make_handler(conn))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_episodes_lists_the_season_rollups(api, conn):
+    response = requests.get(f"{api}/episodes", params={'season': 7})
+
+    assert response.status_code == 200
+    assert response.headers['Content-Type'] == 'application/json; charset=utf-8'
+    assert response.json() == episode_rollups(conn, 7)
+
+
+def test_episode_dashboard(api):
+    body = requests.get(f"{api}/episodes/20", params={'limit': 3}).json()
+
+    assert body['rollup']['episode_number'] == 20
+    assert len(body['top_comments']) == 3
+    scores = [c['score'] for c in body['top_comments']]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_search_reports_hits_and_top_matches(conn):
+    status, body = handle_query(conn, '/search', {'q': 'love island', 'mode': 'phrase', 'limit': '2'})
+
+    assert status == 200
+    assert body['query'] == 'love island' and body['mode'] == 'phrase'
+    assert body['episodes'] and len(body['top_comments']) <= 2
+
+
+@pytest.mark.parametrize('path', ['/episodes/99', '/nowhere', '/episodes/20/extra'])
+def test_unknown_episodes_and_endpoints_are_404(api, path):
+    response = requests.get(api + path)
+
+    assert response.status_code == 404
+    assert 'error' in response.json()
+
+
+@pytest.mark.parametrize('path, params', [
+    ('/episodes', {'season': 'abc'}),
+    ('/episodes/20', {'limit': 'ten'}),
+    ('/search', {'q': 'bailey', 'mode': 'regex'}),
+    ('/search', {'q': ''}),
+])
+def test_bad_parameters_are_400(api, path, params):
+    response = requests.get(api + path, params=params)
+
+    assert response.status_code == 400
+    assert 'error' in response.json()
@@ -0,0 +1,96 @@
+import random
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+from conftest import requires_benchmark
+from json_stream import iter_posts
+from parse_reddit_episodes import (AMBIGUOUS_RANGES, EpisodeIndex, assign_post_to_episode, gap_ranges,
+                                   parse_episodes_csv)
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+
+# Ten seasons of the Monday to Thursday schedule, with six months off between them
+SEASONS = 10
+EPISODES_PER_SEASON = 40
+
+
+def synthetic_episodes(seasons=SEASONS, episodes_per_season=EPISODES_PER_SEASON):
+    episodes = []
+    season_start = datetime(2016, 10, 3)
+    for _ in range(seasons):
+        for week in range(episodes_per_season // 4):
+            for weekday in range(4):
+                air_date = season_start + timedelta(weeks=week, days=weekday)
+                episodes.append({'episode_number': len(episodes) + 1, 'air_date': air_date,
+                                 'air_date_timestamp': int(air_date.timestamp())})
+        season_start += timedelta(weeks=26)
+    return episodes
+
+
+def synthetic_posts(episodes, count, seed=7):
+    """Posts spread over the whole run, a quarter of them naming an episode in the title."""
+    rng = random.Random(seed)
+    first = episodes[0]['air_date_timestamp'] - 7 * 24 * 3600
+    last = episodes[-1]['air_date_timestamp'] + 7 * 24 * 3600
+    posts = []
+    for _ in range(count):
+        title = f"Episode {rng.randrange(1, len(episodes) + 1)} discussion" if rng.random() < 0.25 else ''
+        posts.append({'created_utc': rng.uniform(first, last), 'title': title})
+    return posts
+
+
+@pytest.fixture(scope='module')
+def episodes():
+    return synthetic_episodes()
+
+
+def test_gap_ranges_match_the_season_7_schedule():
+    assert gap_ranges(parse_episodes_csv(DATA_DIR / 'episodes.csv')) == AMBIGUOUS_RANGES
+
+
+def test_index_matches_linear_scan_on_saved_posts():
+    season_episodes = parse_episodes_csv(DATA_DIR / 'episodes.csv')
+    posts = list(iter_posts(DATA_DIR / 'reddit_episodes.json'))
+    index = EpisodeIndex(season_episodes, AMBIGUOUS_RANGES)
+
+    assert index.assign_all(posts) == [assign_post_to_episode(p, season_episodes, AMBIGUOUS_RANGES)
+                                       for p in posts]
+
+
+def test_index_matches_linear_scan_across_seasons(episodes):
+    ambiguous_ranges = gap_ranges(episodes)
+    posts = synthetic_posts(episodes, 5000)
+    # Posts exactly on day boundaries too
+    posts += [{'created_utc': ep['air_date_timestamp'] + offset, 'title': ''}
+              for ep in episodes for offset in (-1, 0, 24 * 3600 - 1, 24 * 3600)]
+    index = EpisodeIndex(episodes, ambiguous_ranges)
+
+    assert index.assign_all(posts) == [assign_post_to_episode(p, episodes, ambiguous_ranges)
+                                       for p in posts]
+
+
+# The linear scan walks every episode for each post, so its cost grows with the
+# number of seasons, while the index does one bisect. The linear scan is only
+# run on the small sample; the index is also run on a million posts.
+@requires_benchmark
+@pytest.mark.benchmark(group='assign-400-episodes')
+def test_benchmark_linear_scan(benchmark, episodes):
+    ambiguous_ranges = gap_ranges(episodes)
+    posts = synthetic_posts(episodes, 10_000)
+
+    assigned = benchmark.pedantic(lambda: [assign_post_to_episode(p, episodes, ambiguous_ranges)
+                                           for p in posts], rounds=1, iterations=1)
+    assert len(assigned) == len(posts)
+
+
+@requires_benchmark
+@pytest.mark.benchmark(group='assign-400-episodes')
+@pytest.mark.parametrize('num_posts', [10_000, 1_000_000])
+def test_benchmark_episode_index(benchmark, episodes, num_posts):
+    index = EpisodeIndex(episodes, gap_ranges(episodes))
+    posts = synthetic_posts(episodes, num_posts)
+
+    assigned = benchmark.pedantic(index.assign_all, args=(posts,), rounds=1, iterations=1)
+    assert len(assigned) == num_posts
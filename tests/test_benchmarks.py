@@ -0,0 +1,98 @@
+"""
+Benchmarks of the hot paths of each stage, on saved inputs so runs are comparable:
+fetching and parsing a thread (JSON API and old.reddit page, served locally),
+assigning posts to episodes and computing the notebook's episode metrics.
+
+    python -m pytest tests/test_benchmarks.py --benchmark-only
+"""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import fetch_discourse
+from conftest import load_fixture, requires_benchmark
+from episode_metrics import compute_episode_analytics, load_comments, load_posts
+from fetch_discourse import fetch_comments_from_reddit_json, fetch_comments_with_beautifulsoup
+from http_client import make_session
+from json_stream import iter_posts
+from metrics import registry
+from parse_reddit_episodes import AMBIGUOUS_RANGES, assign_post_to_episode, parse_episodes_csv
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+THREAD_PATH = '/r/LoveIslandAus/comments/1p7ox2x/season_7_episode_20_thursday_27th_november'
+
+
+@pytest.fixture
+def thread_server(stub_server):
+    stub_server.route(THREAD_PATH + '.json', load_fixture('reddit_thread.json'))
+    stub_server.route(THREAD_PATH + '/', load_fixture('old_reddit_thread.html'))
+    stub_server.thread_url = stub_server.url(THREAD_PATH + '/')
+    return stub_server
+
+
+def summary(name, **labels):
+    return next((s for s in registry.snapshot()['summaries']
+                 if s['name'] == name and s['labels'] == labels), None)
+
+
+def test_fetchers_record_request_and_parse_metrics(thread_server):
+    fetch_comments_with_beautifulsoup(thread_server.thread_url)
+    fetch_comments_from_reddit_json(thread_server.thread_url)
+
+    assert summary('http_request_seconds', host='127.0.0.1')['count'] == 2
+    parser = 'lxml' if fetch_discourse.lxml_html is not None else 'bs4'
+    assert summary('parse_page_seconds', parser=parser)['count'] == 1
+
+
+def test_episode_analytics_match_the_saved_csvs():
+    analytics = compute_episode_analytics(load_posts(DATA_DIR), load_comments(DATA_DIR / 'comments'))
+
+    for row in analytics.itertuples():
+        episode_posts = pd.read_csv(DATA_DIR / f"reddit_episode_{row.episode_number}.csv")
+        assert row.num_posts == len(episode_posts)
+        assert row.score == episode_posts['score'].sum()
+        assert row.num_engagement == len(episode_posts) + episode_posts['num_comments'].sum()
+    assert analytics['cumulative_engagement'].is_monotonic_increasing
+    assert summary('aggregate_seconds')['count'] == 1
+
+
+@requires_benchmark
+@pytest.mark.benchmark(group='fetch-thread')
+def test_benchmark_fetch_comments_from_reddit_json(benchmark, thread_server):
+    session = make_session(pool_size=1)
+
+    comments = benchmark(fetch_comments_from_reddit_json, thread_server.thread_url, session=session)
+    assert len(comments) == 100
+
+
+@requires_benchmark
+@pytest.mark.benchmark(group='fetch-thread')
+def test_benchmark_fetch_comments_with_beautifulsoup(benchmark, thread_server):
+    session = make_session(pool_size=1)
+
+    comments = benchmark(fetch_comments_with_beautifulsoup, thread_server.thread_url, session=session)
+    assert len(comments) == 100
+
+
+@requires_benchmark
+@pytest.mark.benchmark(group='assign-posts')
+def test_benchmark_assign_post_to_episode(benchmark):
+    episodes = parse_episodes_csv(DATA_DIR / 'episodes.csv')
+    posts = list(iter_posts(DATA_DIR / 'reddit_episodes.json'))
+
+    assigned = benchmark(lambda: [assign_post_to_episode(p, episodes, AMBIGUOUS_RANGES) for p in posts])
+    assert len(assigned) == len(posts)
+
+
+@requires_benchmark
+@pytest.mark.benchmark(group='episode-analytics')
+@pytest.mark.parametrize('copies', [1, 1000])
+def test_benchmark_compute_episode_analytics(benchmark, copies):
+    # The saved season, and the same season repeated to a million-row scale
+    posts = pd.concat([load_posts(DATA_DIR)] * copies, ignore_index=True)
+    comments = pd.concat([load_comments(DATA_DIR / 'comments')] * copies, ignore_index=True)
+
+    analytics = benchmark(compute_episode_analytics, posts, comments)
+    assert analytics['num_posts'].sum() == len(posts)
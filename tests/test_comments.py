@@ -0,0 +1,93 @@
+import json
+import pickle
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from comments import Comment, json_default, load_comment_archive
+from conftest import requires_benchmark
+from json_stream import iter_comments
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+COMMENTS_FILE = DATA_DIR / 'comments' / 'comments_episode_20.json'
+ARCHIVE_SIZE = 200_000
+
+
+def archive_records(count):
+    """`count` comment dicts made by repeating a saved episode's comments under new ids."""
+    saved = list(iter_comments(COMMENTS_FILE))
+    records = []
+    for i in range(count):
+        record = dict(saved[i % len(saved)])
+        # Decoded JSON gives every comment its own author and permalink strings
+        record['id'] = f"c{i:07x}"
+        record['author'] = ''.join(record['author'])
+        record['permalink'] = record['permalink'].rsplit('/', 2)[0] + f"/{record['id']}/"
+        records.append(record)
+    return records
+
+
+def traced_size(build, records):
+    """Bytes still allocated after building a collection from `records`."""
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        collection = build(records)
+        size = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    assert len(collection) == len(records)
+    return size
+
+
+def as_dicts(records):
+    return [dict(record) for record in records]
+
+
+def as_comments(records):
+    return [Comment.from_dict(record) for record in records]
+
+
+def test_comment_reads_like_the_dict_it_came_from():
+    record = next(iter_comments(COMMENTS_FILE))
+    comment = Comment.from_dict(record)
+
+    assert dict(comment) == record
+    assert comment['score'] == record['score'] and comment.get('missing') is None
+    assert {**comment} == comment.to_dict() == record
+    assert json.loads(json.dumps([comment], default=json_default)) == [record]
+    assert dict(pickle.loads(pickle.dumps(comment))) == record
+
+
+def test_unusual_permalinks_are_kept_as_is():
+    comment = Comment('abc', None, '', 0, None, 'https://example.com/elsewhere', 0)
+
+    assert comment.permalink == 'https://example.com/elsewhere'
+    assert comment.author is None
+    with pytest.raises(KeyError):
+        comment['body_html']
+
+
+def test_archive_loads_compact_records():
+    archive = load_comment_archive(DATA_DIR / 'comments')
+
+    assert 20 in archive
+    assert [dict(c) for c in archive[20]] == list(iter_comments(COMMENTS_FILE))
+
+
+def test_comments_take_less_memory_than_dicts():
+    records = archive_records(5000)
+
+    assert traced_size(as_comments, records) < 0.6 * traced_size(as_dicts, records)
+
+
+@requires_benchmark
+@pytest.mark.benchmark(group='comment-archive-memory')
+@pytest.mark.parametrize('build', [as_dicts, as_comments], ids=['dict', 'Comment'])
+def test_benchmark_archive_memory(benchmark, build):
+    records = archive_records(ARCHIVE_SIZE)
+
+    size = benchmark.pedantic(traced_size, args=(build, records), rounds=1, iterations=1)
+
+    benchmark.extra_info.update(comments=ARCHIVE_SIZE, traced_mb=round(size / 2 ** 20, 1))
@@ -0,0 +1,137 @@
+import time as time_module
+from datetime import datetime, time, timezone
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from engagement_timeseries import HOUR, EngagementSeries, EngagementTracker, air_timestamp, bin_offsets
+from json_stream import comment_files, iter_comments
+from parse_reddit_episodes import parse_episodes_csv
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+# 7:30pm on 27 October 2025 in Sydney (daylight saving time, UTC+11)
+EPISODE_1_AIR = datetime(2025, 10, 27, 8, 30, tzinfo=timezone.utc).timestamp()
+
+
+def utc(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc)
+
+
+@pytest.mark.parametrize('air_date, expected', [
+    # Season 7 airs during Sydney's daylight saving time (UTC+11)
+    (datetime(2025, 10, 27), datetime(2025, 10, 27, 8, 30)),
+    # Standard time (UTC+10)
+    (datetime(2025, 6, 2), datetime(2025, 6, 2, 9, 30)),
+    # Daylight saving started at 2am on 5 October 2025
+    (datetime(2025, 10, 4), datetime(2025, 10, 4, 9, 30)),
+    (datetime(2025, 10, 5), datetime(2025, 10, 5, 8, 30)),
+])
+def test_air_timestamp_is_sydney_broadcast_time(air_date, expected):
+    assert utc(air_timestamp(air_date)) == expected.replace(tzinfo=timezone.utc)
+
+
+def test_air_timestamp_ignores_the_machine_timezone(monkeypatch):
+    monkeypatch.setenv('TZ', 'America/New_York')
+    time_module.tzset()
+    try:
+        assert air_timestamp(datetime(2025, 10, 27)) == EPISODE_1_AIR
+    finally:
+        monkeypatch.undo()
+        time_module.tzset()
+
+
+def test_other_air_times_and_timezones():
+    assert utc(air_timestamp(datetime(2025, 6, 2), time(21, 0), 'Europe/London')) == \
+        datetime(2025, 6, 2, 20, 0, tzinfo=timezone.utc)
+
+
+def test_bin_offsets_floor_towards_earlier_bins():
+    created = [EPISODE_1_AIR - 1, EPISODE_1_AIR, EPISODE_1_AIR + HOUR - 1, EPISODE_1_AIR + HOUR,
+               EPISODE_1_AIR + 25 * HOUR]
+
+    assert bin_offsets(created, EPISODE_1_AIR).tolist() == [-1, 0, 0, 1, 25]
+    assert bin_offsets(created, EPISODE_1_AIR, bin_seconds=60).tolist() == [-1, 0, 59, 60, 1500]
+    assert bin_offsets([], EPISODE_1_AIR).dtype == np.int64
+
+
+def series_with(*counts):
+    """A series with counts[i] comments in hour i after air time."""
+    series = EngagementSeries(EPISODE_1_AIR)
+    times = [EPISODE_1_AIR + i * HOUR + 60 for i, count in enumerate(counts) for _ in range(count)]
+    series.add([f"c{i}" for i in range(len(times))], times)
+    return series
+
+
+def test_comments_are_counted_once_by_id():
+    series = EngagementSeries(EPISODE_1_AIR)
+
+    assert series.add(['a', 'b', 'c'], [EPISODE_1_AIR - 60, EPISODE_1_AIR + 60, None]) == 2
+    # A refresh returns the same comments again, plus new ones
+    assert series.add(['a', 'b', 'c', 'd'], [EPISODE_1_AIR - 60, EPISODE_1_AIR + 60, None,
+                                             EPISODE_1_AIR + 3 * HOUR]) == 1
+
+    assert series.counts.tolist() == [1, 0, 0, 1]
+    assert series.before_air == 1 and series.total == 2
+
+
+def test_comments_without_an_id_are_always_counted():
+    series = EngagementSeries(EPISODE_1_AIR)
+
+    assert series.add(['', None, ''], [EPISODE_1_AIR + 60] * 3) == 3
+    assert series.add([''], [EPISODE_1_AIR + 60]) == 1
+    assert series.counts.tolist() == [4]
+    assert series.seen_ids == set()
+
+
+@pytest.mark.parametrize('counts, window, expected', [
+    ([1, 2, 3, 4], 1, [1, 2, 3, 4]),
+    ([1, 2, 3, 4], 2, [1, 3, 5, 7]),
+    ([1, 2, 3, 4], 10, [1, 3, 6, 10]),
+    ([5, 0, 0, 1], 3, [5, 5, 5, 1]),
+])
+def test_rolling_window(counts, window, expected):
+    series = series_with(*counts)
+
+    assert series.rolling(window).tolist() == expected
+    assert series.to_frame(window)[f'rolling_{window}'].tolist() == expected
+
+
+@pytest.mark.parametrize('counts, hours', [
+    ([2, 1, 1], 1),
+    ([1, 1, 2], 2),
+    ([1, 0, 2], 3),
+    ([0, 0, 0, 7], 4),
+])
+def test_time_to_half(counts, hours):
+    assert series_with(*counts).time_to_half() == hours * HOUR
+
+
+def test_empty_series():
+    series = EngagementSeries(EPISODE_1_AIR)
+
+    assert series.time_to_half() is None
+    assert series.peak_rate() == (0.0, None)
+    assert series.rolling(3).tolist() == []
+
+
+def test_peak_rate_is_per_hour_whatever_the_bin_width():
+    series = EngagementSeries(EPISODE_1_AIR, bin_seconds=60)
+    series.add(['a', 'b', 'c'], [EPISODE_1_AIR + 120, EPISODE_1_AIR + 150, EPISODE_1_AIR + 400])
+
+    assert series.peak_rate() == (120.0, 120)
+
+
+def test_tracker_counts_every_saved_comment():
+    episodes = parse_episodes_csv(DATA_DIR / 'episodes.csv')
+    tracker = EngagementTracker(episodes)
+
+    added = tracker.add_comments_dir(DATA_DIR / 'comments')
+
+    saved = {n: list(iter_comments(f)) for n, f in comment_files(DATA_DIR / 'comments').items()}
+    assert added == sum(len([c for c in comments if c['created_utc'] is not None]) for comments in saved.values())
+    summary = tracker.summary()
+    assert (summary['timed_comments'] + summary['comments_before_air']).sum() == added
+    # Re-adding the same files counts nothing new, apart from comments without an id
+    assert tracker.add_comments_dir(DATA_DIR / 'comments') == sum(
+        1 for comments in saved.values() for c in comments if not c['id'] and c['created_utc'] is not None)
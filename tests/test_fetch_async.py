@@ -0,0 +1,161 @@
+import asyncio
+import json
+
+import pytest
+
+from conftest import load_fixture, requires_benchmark
+from fetch_discourse import (fetch_all_episode_comments, fetch_all_episode_comments_async,
+                             fetch_all_episode_comments_parallel, fetch_episode_comments)
+from http_client import TokenBucket, make_session
+
+THREAD_HTML = load_fixture('old_reddit_thread.html')
+THREAD_JSON = load_fixture('reddit_thread.json')
+NUM_THREADS = 60
+
+
+def thread_path(episode_number):
+    return f"/r/LoveIslandAus/comments/t{episode_number}/season_7_episode_{episode_number}/"
+
+
+@pytest.fixture
+def season_server(stub_server):
+    """Stub server with NUM_THREADS discussion threads serving the saved old.reddit page."""
+    for episode_number in range(1, NUM_THREADS + 1):
+        stub_server.route(thread_path(episode_number), THREAD_HTML)
+    stub_server.threads = {
+        f"Episode {n}": stub_server.url(thread_path(n)) for n in range(1, NUM_THREADS + 1)
+    }
+    return stub_server
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_async_fetch_saves_every_thread(season_server, tmp_path):
+    threads = dict(list(season_server.threads.items())[:5])
+
+    saved = asyncio.run(fetch_all_episode_comments_async(output_dir=tmp_path, threads=threads,
+                                                         concurrency=3, rate=100))
+
+    assert saved == {episode_name: 100 for episode_name in threads}
+    for episode_number in range(1, 6):
+        data = json.loads((tmp_path / f"comments_episode_{episode_number}.json").read_text(encoding='utf-8'))
+        assert data['total_comments_fetched'] == 100
+        assert data['url'] == threads[f"Episode {episode_number}"]
+    # Each page parsed fine, so the JSON API was never needed
+    assert all(path.endswith('/') for path, _ in season_server.requests)
+
+
+def test_async_fetch_skips_failing_threads(season_server, tmp_path):
+    threads = {'Episode 1': season_server.threads['Episode 1'],
+               'Episode 2': season_server.url('/r/LoveIslandAus/comments/gone/removed/')}
+
+    saved = asyncio.run(fetch_all_episode_comments_async(output_dir=tmp_path, threads=threads,
+                                                         concurrency=2, rate=100))
+
+    assert saved == {'Episode 1': 100}
+    assert not (tmp_path / 'comments_episode_2.json').exists()
+
+
+def test_token_bucket_limits_sustained_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=2.0, capacity=1, clock=clock, sleep=clock.sleep)
+
+    waits = [bucket.acquire() for _ in range(5)]
+
+    assert waits[0] == 0
+    assert waits[1:] == pytest.approx([0.5] * 4)
+
+
+def test_token_bucket_pauses_until_ratelimit_reset():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=4.0, capacity=5, clock=clock, sleep=clock.sleep)
+
+    bucket.update_from_headers({'x-ratelimit-remaining': '0', 'x-ratelimit-reset': '30'})
+
+    assert bucket.acquire() == pytest.approx(30)
+    # Two requests left in the window caps the burst at two tokens
+    clock.now += 60
+    bucket.update_from_headers({'x-ratelimit-remaining': '2', 'x-ratelimit-reset': '30'})
+    assert [bucket.acquire() for _ in range(3)] == pytest.approx([0, 0, 0.25])
+
+
+def test_ratelimit_headers_from_the_server_pause_the_bucket(stub_server):
+    stub_server.route('/r/x/comments/a/t/', (200, THREAD_HTML, {'x-ratelimit-remaining': '0',
+                                                                'x-ratelimit-reset': '7'}))
+    clock = FakeClock()
+    bucket = TokenBucket(rate=100.0, capacity=1, clock=clock, sleep=clock.sleep)
+
+    fetch_episode_comments(stub_server.url('/r/x/comments/a/t/'), limiter=bucket)
+
+    assert bucket.acquire() == pytest.approx(7)
+
+
+# Sequential vs async fetch of a 60-thread season. Every response takes 100 ms,
+# standing in for network latency, and the rate limit is lifted so the numbers
+# compare the fetch paths rather than the request budget.
+LATENCY = 0.1
+
+
+@requires_benchmark
+@pytest.mark.benchmark(group='fetch-60-threads')
+def test_benchmark_sequential_fetch(benchmark, season_server):
+    season_server.delay = LATENCY
+    session = make_session(pool_size=1)
+
+    def fetch_sequentially():
+        return {episode_name: len(fetch_episode_comments(url, session=session))
+                for episode_name, url in season_server.threads.items()}
+
+    counts = benchmark.pedantic(fetch_sequentially, rounds=1, iterations=1)
+    assert len(counts) == NUM_THREADS
+
+
+@requires_benchmark
+@pytest.mark.benchmark(group='fetch-60-threads')
+def test_benchmark_async_fetch(benchmark, season_server, tmp_path):
+    season_server.delay = LATENCY
+
+    def fetch_concurrently():
+        return asyncio.run(fetch_all_episode_comments_async(
+            output_dir=tmp_path, threads=season_server.threads, concurrency=16, rate=1000))
+
+    counts = benchmark.pedantic(fetch_concurrently, rounds=1, iterations=1)
+    assert len(counts) == NUM_THREADS
+
+
+def saved_comments(output_dir):
+    """Every comments_episode_N.json in a directory, without the fetch time."""
+    saved = {}
+    for path in sorted(output_dir.glob('comments_episode_*.json')):
+        data = json.loads(path.read_text(encoding='utf-8'))
+        del data['fetched_at']
+        saved[path.name] = data
+    return saved
+
+
+def test_process_pool_fetch_saves_the_same_files_as_sequential(season_server, tmp_path):
+    # A page without comments falls back to the JSON API; a removed thread is skipped
+    season_server.route(thread_path(3), '<html><body></body></html>')
+    season_server.route(thread_path(3).rstrip('/') + '.json', THREAD_JSON)
+    threads = {f"Episode {n}": season_server.threads[f"Episode {n}"] for n in (1, 2, 3)}
+    threads['Episode 4'] = season_server.url('/r/LoveIslandAus/comments/gone/removed/')
+    limiter = TokenBucket(rate=1000, capacity=1000)
+
+    fetch_all_episode_comments(output_dir=tmp_path / 'sequential', threads=threads, max_comments=50,
+                               limiter=limiter)
+    fetch_all_episode_comments_parallel(output_dir=tmp_path / 'parallel', threads=threads, max_comments=50,
+                                        workers=2, limiter=limiter)
+
+    sequential = saved_comments(tmp_path / 'sequential')
+    assert list(sequential) == ['comments_episode_1.json', 'comments_episode_2.json', 'comments_episode_3.json']
+    assert all(data['total_comments_fetched'] == 50 for data in sequential.values())
+    assert saved_comments(tmp_path / 'parallel') == sequential
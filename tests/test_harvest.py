@@ -0,0 +1,96 @@
+import json
+
+import pytest
+
+from conftest import load_fixture
+from fetch_discourse import harvest_thread_comments, iter_thread_comments
+from http_client import TransientError
+from json_stream import iter_comments
+
+THREAD_PATH = '/r/LoveIslandAus/comments/1p7ox2x/season_7_episode_20_thursday_27th_november'
+MORE_PATH = '/api/morechildren.json'
+# Recorded responses: the thread with a "load more comments" stub for three
+# comments and a "continue this thread" stub under the second comment
+THREAD = json.loads(load_fixture('thread_with_more.json'))
+MORECHILDREN = json.loads(load_fixture('morechildren.json'))
+CONTINUE_THREAD = json.loads(load_fixture('continue_thread.json'))
+
+C = ['nr63vpd', 'nrb01s5', 'nr7bajg', 'nrfmpt0', 'nrc8w7l', 'nrfgyqa', 'nrfj63e', 'nrc76p3']
+
+
+def morechildren(query):
+    """/api/morechildren answering with the recorded things that were asked for."""
+    requested = query['children'].split(',')
+    things = [t for t in MORECHILDREN['json']['data']['things'] if t['data']['id'] in requested]
+    return {'json': {'errors': [], 'data': {'things': things}}}
+
+
+@pytest.fixture
+def thread_server(stub_server):
+    stub_server.route(THREAD_PATH + '.json', THREAD)
+    stub_server.route(MORE_PATH, morechildren)
+    stub_server.route(f"{THREAD_PATH}/{C[1]}.json", CONTINUE_THREAD)
+    stub_server.thread_url = stub_server.url(THREAD_PATH + '/')
+    return stub_server
+
+
+def test_more_stubs_and_continued_threads_are_expanded(thread_server):
+    comments = list(iter_thread_comments(thread_server.thread_url))
+
+    assert [(c['id'], c['depth']) for c in comments] == [
+        (C[0], 0), (C[1], 1), (C[2], 0),
+        (C[3], 0), (C[4], 1), (C[5], 0),
+        # The continued page restarts at C[1]; its replies keep their depth in the thread
+        (C[6], 2), (C[7], 3),
+    ]
+    more_requests = [query for path, query in thread_server.requests if path == MORE_PATH]
+    assert more_requests == [{'api_type': 'json', 'link_id': 't3_1p7ox2x', 'children': ','.join(C[3:6]),
+                              'limit_children': 'false', 'raw_json': '1'}]
+    assert thread_server.hits(f"{THREAD_PATH}/{C[1]}.json") == 1
+
+
+def test_morechildren_is_batched(thread_server):
+    list(iter_thread_comments(thread_server.thread_url, batch_size=2))
+
+    assert [query['children'] for path, query in thread_server.requests if path == MORE_PATH] == [
+        f"{C[3]},{C[4]}", C[5]]
+
+
+def test_stored_comments_are_not_expanded_again(thread_server):
+    comments = list(iter_thread_comments(thread_server.thread_url, skip_ids={C[3], C[5]}, sort='new'))
+
+    assert C[4] in {c['id'] for c in comments}
+    assert [query['children'] for path, query in thread_server.requests if path == MORE_PATH] == [C[4]]
+    assert thread_server.requests[0][1]['sort'] == 'new'
+
+
+def test_harvest_writes_every_comment_as_jsonl(thread_server, tmp_path):
+    output_file = tmp_path / 'comments_episode_20.jsonl'
+
+    assert harvest_thread_comments(thread_server.thread_url, output_file) == 8
+    assert [c['id'] for c in iter_comments(output_file)] == C
+
+
+def test_failed_harvest_keeps_the_previous_file(thread_server, tmp_path):
+    thread_server.route(MORE_PATH, (503, 'down'))
+    output_file = tmp_path / 'comments_episode_20.jsonl'
+    output_file.write_text('{"id": "kept"}\n', encoding='utf-8')
+
+    with pytest.raises(TransientError):
+        harvest_thread_comments(thread_server.thread_url, output_file)
+
+    assert output_file.read_text(encoding='utf-8') == '{"id": "kept"}\n'
+    assert list(tmp_path.iterdir()) == [output_file]
+
+
+def test_comments_without_an_id_are_all_yielded(stub_server):
+    # Two of the recorded thread's comments have an empty id
+    stub_server.route(THREAD_PATH + '.json', load_fixture('reddit_thread.json'))
+
+    comments = list(iter_thread_comments(stub_server.url(THREAD_PATH + '/')))
+
+    assert len(comments) == 100
+    # Both were removed, so only their time tells them apart
+    id_less = [c for c in comments if not c['id']]
+    assert [c['body'] for c in id_less] == ['[removed]', '[removed]']
+    assert id_less[0]['created_utc'] != id_less[1]['created_utc']
@@ -0,0 +1,158 @@
+from email.utils import formatdate
+
+import pytest
+
+from conftest import load_fixture
+from fetch_discourse import fetch_all_episode_comments
+from http_cache import ResponseCache, cache_key
+from http_client import CacheMiss, FetchError, PermanentError, get, set_default_cache
+from json_stream import iter_comments
+from metrics import registry
+
+THREAD_PATH = '/r/LoveIslandAus/comments/1p7ox2x/season_7_episode_20_thursday_27th_november'
+ETAG = '"v1"'
+LAST_MODIFIED = 'Thu, 27 Nov 2025 09:00:00 GMT'
+
+
+class FakeClock:
+    def __init__(self, now=1_764_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    cache = ResponseCache(tmp_path / 'http_cache.sqlite', clock=clock)
+    yield cache
+    cache.close()
+
+
+def cache_results():
+    return {c['labels']['result']: c['value'] for c in registry.snapshot()['counters']
+            if c['name'] == 'http_cache_total'}
+
+
+def test_fresh_entries_are_served_without_a_request(stub_server, cache, clock):
+    stub_server.route('/r/x/search.json', {'page': 1})
+    url = stub_server.url('/r/x/search.json')
+
+    assert get(url, cache=cache, params={'q': 'episode'}).json() == {'page': 1}
+    clock.now += 15 * 60 - 1
+    assert get(url, cache=cache, params={'q': 'episode'}).json() == {'page': 1}
+    # Different params are a different entry
+    get(url, cache=cache, params={'q': 'S7'})
+
+    assert stub_server.hits('/r/x/search.json') == 2
+    assert cache_results() == {'miss': 2, 'hit': 1}
+
+
+def test_ttls_are_chosen_by_endpoint(cache):
+    assert cache.ttl_for('https://www.reddit.com/api/morechildren.json') == 24 * 3600
+    assert cache.ttl_for('https://www.reddit.com/r/LoveIslandAus/search.json') == 15 * 60
+    assert cache.ttl_for('https://old.reddit.com' + THREAD_PATH + '/') == 60 * 60
+    assert cache.ttl_for('https://example.com/other') == cache.default_ttl
+
+
+def test_stale_entry_is_revalidated_and_a_304_refreshes_it(stub_server, cache, clock):
+    stub_server.route('/page', (200, 'cached body', {'ETag': ETAG, 'Last-Modified': LAST_MODIFIED}),
+                      (304, ''))
+    url = stub_server.url('/page')
+    get(url, cache=cache)
+
+    clock.now += 3600
+    response = get(url, cache=cache)
+
+    assert response.status_code == 200 and response.text == 'cached body'
+    headers = stub_server.request_headers[1]
+    assert headers['If-None-Match'] == ETAG
+    assert headers['If-Modified-Since'] == LAST_MODIFIED
+    assert 'If-None-Match' not in stub_server.request_headers[0]
+
+    # The 304 touched the entry, so it is fresh for another TTL
+    clock.now += 3600 - 1
+    assert get(url, cache=cache).text == 'cached body'
+    assert stub_server.hits('/page') == 2
+    assert cache_results() == {'miss': 1, 'stale': 1, 'revalidated': 1, 'hit': 1}
+
+
+def test_stale_entry_without_validators_sends_its_fetch_time(stub_server, cache, clock):
+    stub_server.route('/page', 'old', 'new')
+    url = stub_server.url('/page')
+    fetched_at = clock.now
+    get(url, cache=cache)
+
+    clock.now += 3600
+    assert get(url, cache=cache).text == 'new'
+
+    assert stub_server.request_headers[1]['If-Modified-Since'] == formatdate(fetched_at, usegmt=True)
+    # The new body replaced the entry
+    assert cache.lookup(cache_key(url))['body'] == b'new'
+
+
+class StoredResponse:
+    """The parts of a requests.Response that ResponseCache.store reads."""
+
+    def __init__(self, name, size=100):
+        self.url = f"https://example.com/{name}"
+        self.status_code = 200
+        self.headers = {}
+        self.content = name.encode() * size
+
+
+def test_least_recently_used_entries_are_evicted_first(tmp_path, clock):
+    cache = ResponseCache(tmp_path / 'http_cache.sqlite', max_bytes=250, clock=clock)
+
+    cache.store('a', StoredResponse('a'))
+    clock.now += 1
+    cache.store('b', StoredResponse('b'))
+    clock.now += 1
+    cache.lookup('a')
+    clock.now += 1
+    # 300 bytes is over the cap: 'b' was used least recently
+    cache.store('c', StoredResponse('c'))
+
+    assert cache.lookup('b') is None
+    assert cache.lookup('a')['body'] == b'a' * 100
+    assert cache.lookup('c')['body'] == b'c' * 100
+    cache.close()
+
+
+def test_cache_only_mode_never_requests(stub_server, cache, clock):
+    stub_server.route('/page', 'cached body')
+    get(stub_server.url('/page'), cache=cache)
+    cache.cache_only = True
+    clock.now += 7 * 24 * 3600
+
+    # Stale entries are still served
+    assert get(stub_server.url('/page'), cache=cache).text == 'cached body'
+    with pytest.raises(CacheMiss) as error:
+        get(stub_server.url('/other'), cache=cache)
+
+    assert isinstance(error.value, PermanentError) and isinstance(error.value, FetchError)
+    assert error.value.url == stub_server.url('/other')
+    assert stub_server.hits('/page') == 1 and stub_server.hits('/other') == 0
+
+
+def test_fetchers_skip_cache_misses_like_a_404(stub_server, cache, tmp_path):
+    stub_server.route(THREAD_PATH + '/', load_fixture('old_reddit_thread.html'))
+    cached_url = stub_server.url(THREAD_PATH + '/')
+    get(cached_url, cache=cache)
+    cache.cache_only = True
+    set_default_cache(cache)
+    output_dir = tmp_path / 'comments'
+
+    fetch_all_episode_comments(output_dir=output_dir, threads={
+        'Episode 19': stub_server.url('/r/LoveIslandAus/comments/uncached/episode_19/'),
+        'Episode 20': cached_url,
+    })
+
+    assert len(list(iter_comments(output_dir / 'comments_episode_20.json'))) == 100
+    assert not (output_dir / 'comments_episode_19.json').exists()
+    assert len(stub_server.requests) == 1
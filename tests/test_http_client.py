@@ -0,0 +1,272 @@
+import pytest
+
+import http_client
+from conftest import load_fixture
+from fetch_discourse import (fetch_all_episode_comments, fetch_episode_comments, harvest_all_episode_comments,
+                             iter_thread_comments, refresh_all_episode_comments)
+from http_client import (CircuitBreaker, CircuitOpenError, FetchError, PermanentError,
+                         RetryPolicy, TokenBucket, TransientError, breaker_for, get)
+from json_stream import iter_comments
+from metrics import registry
+
+THREAD_PATH = '/r/LoveIslandAus/comments/1p7ox2x/season_7_episode_20_thursday_27th_november'
+
+
+class RecordingRetry(RetryPolicy):
+    """RetryPolicy without jitter that records its backoff sleeps instead of sleeping."""
+
+    def __init__(self, **kwargs):
+        self.sleeps = []
+        super().__init__(sleep=self.sleeps.append, rng=lambda: 1.0, **kwargs)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def counter(name, **labels):
+    return next((c['value'] for c in registry.snapshot()['counters']
+                 if c['name'] == name and c['labels'] == labels), 0)
+
+
+@pytest.mark.parametrize('status', [503, 429])
+def test_transient_status_is_retried_until_success(stub_server, status):
+    stub_server.route('/page', (status, 'busy'), (status, 'busy'), 'ok')
+    retry = RecordingRetry(base_delay=1.0)
+
+    response = get(stub_server.url('/page'), retry=retry)
+
+    assert response.text == 'ok'
+    assert stub_server.hits('/page') == 3
+    assert retry.sleeps == [1.0, 2.0]
+    assert counter('http_retries_total', host='127.0.0.1', reason=str(status)) == 2
+
+
+def test_retry_after_header_sets_the_minimum_wait(stub_server):
+    stub_server.route('/page', (429, 'slow down', {'Retry-After': '7'}), 'ok')
+    retry = RecordingRetry(base_delay=1.0)
+
+    get(stub_server.url('/page'), retry=retry)
+
+    assert retry.sleeps == [7.0]
+
+
+def test_retry_after_is_capped_at_max_delay(stub_server):
+    stub_server.route('/page', (503, 'down', {'Retry-After': '3600'}), 'ok')
+    retry = RecordingRetry(base_delay=1.0, max_delay=30.0)
+
+    get(stub_server.url('/page'), retry=retry)
+
+    assert retry.sleeps == [30.0]
+
+
+def test_transient_error_after_every_attempt(stub_server):
+    stub_server.route('/page', (502, 'bad gateway'))
+    retry = RecordingRetry(max_attempts=3, base_delay=0.5)
+
+    with pytest.raises(TransientError) as error:
+        get(stub_server.url('/page'), retry=retry)
+
+    assert error.value.status == 502
+    assert stub_server.hits('/page') == 3
+    assert retry.sleeps == [0.5, 1.0]
+
+
+def test_not_found_is_never_retried(stub_server):
+    retry = RecordingRetry()
+
+    with pytest.raises(PermanentError) as error:
+        get(stub_server.url('/removed'), retry=retry)
+
+    assert error.value.status == 404
+    assert stub_server.hits('/removed') == 1
+    assert retry.sleeps == []
+
+
+def test_breaker_opens_after_consecutive_failures_and_half_opens():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=60, clock=clock)
+
+    for _ in range(3):
+        assert breaker.allow()
+        breaker.record_failure()
+    assert not breaker.allow()
+
+    # After the reset timeout exactly one trial request is let through
+    clock.now = 60
+    assert breaker.allow()
+    assert not breaker.allow()
+
+    # A failed trial re-opens the circuit for another reset timeout
+    breaker.record_failure()
+    assert not breaker.allow()
+    clock.now = 119
+    assert not breaker.allow()
+    clock.now = 120
+    assert breaker.allow()
+
+    # A successful trial closes it
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
+
+
+def test_open_breaker_fails_fast_without_requests(stub_server):
+    stub_server.route('/page', (503, 'down'))
+    breaker = breaker_for('127.0.0.1')
+    breaker.failure_threshold = 2
+    retry = RecordingRetry(max_attempts=5)
+
+    with pytest.raises(CircuitOpenError):
+        get(stub_server.url('/page'), retry=retry)
+
+    assert stub_server.hits('/page') == 2
+    with pytest.raises(CircuitOpenError):
+        get(stub_server.url('/other'), retry=retry)
+    assert stub_server.hits('/other') == 0
+    assert counter('http_circuit_open_total', host='127.0.0.1') == 2
+
+
+# The server promises 100 bytes and closes the connection after 5
+TRUNCATED = (200, 'short', {'Content-Length': '100'})
+
+
+def test_truncated_body_is_retried_as_transient(stub_server):
+    stub_server.route('/page', TRUNCATED, 'ok')
+    retry = RecordingRetry(base_delay=1.0)
+
+    assert get(stub_server.url('/page'), retry=retry).text == 'ok'
+    assert stub_server.hits('/page') == 2
+    assert counter('http_retries_total', host='127.0.0.1', reason='ChunkedEncodingError') == 1
+
+
+def test_redirect_loop_raises_transient_error(stub_server):
+    stub_server.route('/loop', (302, '', {'Location': '/loop'}))
+
+    with pytest.raises(TransientError, match='TooManyRedirects'):
+        get(stub_server.url('/loop'), retry=RecordingRetry(max_attempts=1))
+
+
+def test_failed_half_open_trial_releases_the_breaker(stub_server, monkeypatch):
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60, clock=clock)
+    monkeypatch.setitem(http_client._breakers, '127.0.0.1', breaker)
+    stub_server.route('/page', TRUNCATED, 'ok')
+    retry = RecordingRetry(max_attempts=1)
+    breaker.record_failure()
+
+    # The trial gets a truncated body: classified, and the circuit re-opens
+    clock.now = 60
+    with pytest.raises(TransientError):
+        get(stub_server.url('/page'), retry=retry)
+    assert not breaker.trial_in_flight
+    with pytest.raises(CircuitOpenError):
+        get(stub_server.url('/page'), retry=retry)
+
+    # The next trial goes out and closes it
+    clock.now = 120
+    assert get(stub_server.url('/page'), retry=retry).text == 'ok'
+    assert stub_server.hits('/page') == 2
+
+
+def test_unexpected_error_during_a_trial_releases_the_breaker(stub_server, monkeypatch):
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60, clock=clock)
+    monkeypatch.setitem(http_client._breakers, '127.0.0.1', breaker)
+    breaker.record_failure()
+
+    class BrokenLimiter:
+        def acquire(self):
+            raise RuntimeError("limiter broke")
+
+    clock.now = 60
+    with pytest.raises(RuntimeError):
+        get(stub_server.url('/page'), limiter=BrokenLimiter(), retry=RecordingRetry())
+
+    assert not breaker.trial_in_flight
+    clock.now = 120
+    assert breaker.allow()
+
+
+def test_fetch_episode_comments_requests_each_endpoint_once_when_html_fails(stub_server):
+    # The page is gone, so the JSON API is asked once
+    stub_server.route(THREAD_PATH + '.json', load_fixture('reddit_thread.json'))
+    url = stub_server.url(THREAD_PATH + '/')
+
+    comments = fetch_episode_comments(url)
+
+    assert len(comments) == 100
+    assert stub_server.hits(THREAD_PATH + '/') == 1
+    assert stub_server.hits(THREAD_PATH + '.json') == 1
+
+
+def test_fetch_episode_comments_skips_json_when_html_parses(stub_server):
+    stub_server.route(THREAD_PATH + '/', load_fixture('old_reddit_thread.html'))
+    url = stub_server.url(THREAD_PATH + '/')
+
+    assert len(fetch_episode_comments(url)) == 100
+    assert stub_server.hits(THREAD_PATH + '/') == 1
+    assert stub_server.hits(THREAD_PATH + '.json') == 0
+
+
+def test_fetch_episode_comments_raises_when_both_endpoints_fail(stub_server):
+    stub_server.route(THREAD_PATH + '/', (503, 'down'))
+    stub_server.route(THREAD_PATH + '.json', (503, 'down'))
+    url = stub_server.url(THREAD_PATH + '/')
+
+    with pytest.raises(FetchError):
+        fetch_episode_comments(url)
+
+    # The page used up its 4 attempts, and the JSON API's first failure was the
+    # host's 5th in a row, which opened the circuit before any retry of it
+    assert stub_server.hits(THREAD_PATH + '/') == 4
+    assert stub_server.hits(THREAD_PATH + '.json') == 1
+
+
+def test_failed_thread_keeps_its_saved_comments(stub_server, tmp_path):
+    saved = tmp_path / 'comments_episode_20.json'
+    saved.write_text('{"comments": [{"id": "kept"}]}', encoding='utf-8')
+    stub_server.route(THREAD_PATH + '/', (404, 'gone'))
+    stub_server.route(THREAD_PATH + '.json', (404, 'gone'))
+
+    fetch_all_episode_comments(output_dir=tmp_path,
+                               threads={'Episode 20': stub_server.url(THREAD_PATH + '/')})
+
+    assert saved.read_text(encoding='utf-8') == '{"comments": [{"id": "kept"}]}'
+
+
+INTERSTITIAL = '<html><body>Our CDN was unable to reach our servers</body></html>'
+
+
+@pytest.mark.parametrize('body, error', [
+    (INTERSTITIAL, TransientError),
+    ({'error': 403, 'message': 'Forbidden'}, PermanentError),
+    ([{'kind': 'Listing', 'data': {'children': []}}, {'kind': 'Listing', 'data': {}}], PermanentError),
+])
+def test_iter_thread_comments_classifies_bad_bodies(stub_server, body, error):
+    stub_server.route(THREAD_PATH + '.json', body)
+
+    with pytest.raises(error):
+        list(iter_thread_comments(stub_server.url(THREAD_PATH + '/')))
+
+
+@pytest.mark.parametrize('run', ['harvest', 'refresh'])
+def test_season_run_skips_a_thread_with_a_bad_body(stub_server, tmp_path, run):
+    other_path = '/r/LoveIslandAus/comments/1p6u4jb/season_7_episode_19_wednesday_26th_november'
+    stub_server.route(other_path + '.json', INTERSTITIAL)
+    stub_server.route(THREAD_PATH + '.json', load_fixture('reddit_thread.json'))
+    threads = {'Episode 19': stub_server.url(other_path + '/'), 'Episode 20': stub_server.url(THREAD_PATH + '/')}
+    limiter = TokenBucket(rate=1000, capacity=1000)
+
+    if run == 'harvest':
+        harvest_all_episode_comments(output_dir=tmp_path, threads=threads, limiter=limiter)
+        saved = tmp_path / 'comments_episode_20.jsonl'
+    else:
+        refresh_all_episode_comments(output_dir=tmp_path, threads=threads, limiter=limiter)
+        saved = tmp_path / 'comments_episode_20.json'
+
+    assert len(list(iter_comments(saved))) == 100
+    assert not list(tmp_path.glob('comments_episode_19.*'))
@@ -0,0 +1,131 @@
+import json
+from datetime import datetime
+
+from conftest import FakeSearch, load_fixture, reddit_post
+from fetch_discourse import refresh_thread_comments
+from fetch_reddit import scrape_reddit_episodes
+from http_client import TokenBucket
+from incremental import load_state, merge_records, update_high_water
+from json_stream import iter_comments, iter_posts
+
+SEARCH_PATH = '/r/LoveIslandAus/search.json'
+THREAD_PATH = '/r/LoveIslandAus/comments/1p7ox2x/season_7_episode_20_thursday_27th_november'
+DAY = 24 * 3600
+SEASON_START = datetime(2025, 10, 27).timestamp()
+
+
+def post(post_id, day, **fields):
+    return reddit_post(post_id, SEASON_START + day * DAY + 3600, **fields)
+
+
+def test_merge_records_twice_is_a_no_op():
+    existing = [{'id': 'a', 'score': 1}, {'id': 'b', 'score': 2}]
+    fetched = [{'id': 'b', 'score': 5}, {'id': 'c', 'score': 3}]
+
+    merged, added, updated = merge_records(existing, fetched)
+    again, added_again, updated_again = merge_records(merged, fetched)
+
+    assert merged == [{'id': 'a', 'score': 1}, {'id': 'b', 'score': 5}, {'id': 'c', 'score': 3}]
+    assert (added, updated) == (1, 1)
+    assert again == merged
+    assert (added_again, updated_again) == (0, 0)
+
+
+def test_records_without_an_id_are_never_merged_on_it():
+    existing = [{'id': '', 'author': 'a', 'created_utc': 1.0, 'body': 'first', 'score': 1},
+                {'id': 'x', 'author': 'b', 'created_utc': 2.0, 'body': 'other', 'score': 1}]
+    fetched = [{'id': '', 'author': 'a', 'created_utc': 1.0, 'body': 'first', 'score': 4},
+               {'id': '', 'author': 'c', 'created_utc': 3.0, 'body': 'second', 'score': 2},
+               {'id': None, 'author': 'd', 'created_utc': 4.0, 'body': 'third', 'score': 0}]
+
+    merged, added, updated = merge_records(existing, fetched)
+
+    assert [(r['body'], r['score']) for r in merged] == [('first', 4), ('other', 1), ('second', 2), ('third', 0)]
+    assert (added, updated) == (2, 1)
+    assert merge_records(merged, fetched) == (merged, 0, 0)
+
+
+def test_update_high_water_never_moves_back():
+    state = {'last_created_utc': 200.0, 'known_ids': ['a']}
+
+    update_high_water(state, [{'id': 'b', 'created_utc': 100.0}, {'id': 'c', 'created_utc': None},
+                              {'id': '', 'created_utc': 150.0}])
+
+    assert state == {'last_created_utc': 200.0, 'known_ids': ['a', 'b', 'c']}
+
+
+def test_incremental_scrape_resumes_from_the_saved_cursor(stub_server, tmp_path):
+    search = FakeSearch({'episode': [post(f"p{day}", day) for day in range(1, 7)]})
+    search.failing_cursors.add('t3_p3')
+    stub_server.route(SEARCH_PATH, search)
+    output_file = tmp_path / 'reddit_episodes.json'
+    state_file = tmp_path / 'reddit_episodes.json.state.json'
+
+    def scrape():
+        return scrape_reddit_episodes(output_file=str(output_file), incremental=True,
+                                      limiter=TokenBucket(rate=1000, capacity=1000),
+                                      base_url=stub_server.base_url)
+
+    # The backfill fails on the third page and keeps its cursor
+    scrape()
+    assert [p['id'] for p in iter_posts(output_file)] == ['p6', 'p5', 'p4', 'p3']
+    assert load_state(state_file)['after'] == {'episode': 't3_p3'}
+
+    search.failing_cursors.clear()
+    stub_server.requests.clear()
+    scrape()
+
+    assert [p['id'] for p in iter_posts(output_file)] == ['p6', 'p5', 'p4', 'p3', 'p2', 'p1']
+    assert ('episode', 't3_p3') in {(q['q'], q.get('after')) for _, q in stub_server.requests}
+    state = load_state(state_file)
+    assert state['after'] == {'episode': None}
+    assert state['known_ids'] == ['p1', 'p2', 'p3', 'p4', 'p5', 'p6']
+
+
+def test_incremental_scrape_updates_scores_in_place(stub_server, tmp_path):
+    posts = [post('p1', 1), post('p2', 2)]
+    stub_server.route(SEARCH_PATH, FakeSearch({'episode': posts}))
+    output_file = tmp_path / 'reddit_episodes.json'
+
+    def scrape():
+        return scrape_reddit_episodes(output_file=str(output_file), incremental=True,
+                                      limiter=TokenBucket(rate=1000, capacity=1000),
+                                      base_url=stub_server.base_url)
+
+    scrape()
+    posts[1]['data']['score'] = 40
+    posts.append(post('p3', 3))
+    scrape()
+    before = output_file.read_text(encoding='utf-8')
+    scrape()
+
+    saved = {p['id']: p['score'] for p in iter_posts(output_file)}
+    assert saved == {'p3': 1, 'p2': 40, 'p1': 1}
+    # Nothing changed on the server, so the third run rewrote the same posts
+    assert json.loads(output_file.read_text(encoding='utf-8'))['posts'] == json.loads(before)['posts']
+
+
+def test_refresh_thread_comments_updates_scores_in_place(stub_server, tmp_path):
+    thread = json.loads(load_fixture('reddit_thread.json'))
+    stub_server.route(THREAD_PATH + '.json', lambda query: thread)
+    url = stub_server.url(THREAD_PATH + '/')
+    state = {}
+
+    assert refresh_thread_comments('Episode 20', url, tmp_path, state) == (100, 0, 100)
+
+    top_comment = thread[1]['data']['children'][0]['data']
+    top_comment['score'] += 100
+
+    assert refresh_thread_comments('Episode 20', url, tmp_path, state) == (0, 1, 100)
+    comments = list(iter_comments(tmp_path / 'comments_episode_20.json'))
+    # Two of the saved comments have no id; they are kept apart, not merged
+    assert len(comments) == 100
+    assert sum(1 for c in comments if not c['id']) == 2
+    assert comments[0]['id'] == top_comment['id']
+    assert comments[0]['score'] == top_comment['score']
+    assert len(state[url]['known_ids']) == 98 and '' not in state[url]['known_ids']
+
+    # Re-running without new activity changes nothing
+    assert refresh_thread_comments('Episode 20', url, tmp_path, state) == (0, 0, 100)
+    # Refreshes ask for new comments first
+    assert all(query.get('sort') == 'new' for _, query in stub_server.requests)
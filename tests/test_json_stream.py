@@ -0,0 +1,132 @@
+import json
+import os
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+import json_stream
+from conftest import requires_benchmark
+from json_stream import comment_files, iter_comments, iter_posts, write_jsonl
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+
+# Size of the synthetic archive for the memory benchmark; set ARCHIVE_MB=4096
+# to reproduce the multi-GB case
+ARCHIVE_MB = int(os.environ.get('ARCHIVE_MB', 64))
+# Streaming holds a few read chunks and the current post, whatever the file size
+MAX_STREAM_PEAK = 4 * 1024 * 1024
+
+
+def write_archive(path, megabytes):
+    """Write a reddit_episodes.json-style file of about `megabytes` MB. Returns the post count."""
+    selftext = 'Who else thinks the recoupling was rigged? ' * 11
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{\n  "subreddit": "LoveIslandAus",\n  "posts": [\n')
+        while f.tell() < megabytes * 1024 * 1024:
+            if count:
+                f.write(',\n')
+            post = {'id': f"p{count:08x}", 'title': f"Episode {count % 40 + 1} thoughts 🌴",
+                    'author': f"user{count % 997}", 'created_utc': 1761523200 + count * 7.5,
+                    'score': count % 500, 'num_comments': count % 90, 'selftext': selftext}
+            f.write('    ' + json.dumps(post, ensure_ascii=False))
+            count += 1
+        f.write('\n  ],\n  "total_posts": %d\n}\n' % count)
+    return count
+
+
+def peak_memory(func):
+    """(result, peak bytes allocated) of calling `func`."""
+    tracemalloc.start()
+    try:
+        result = func()
+        return result, tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def stream_scores(path):
+    return sum(post['score'] for post in iter_posts(path))
+
+
+def load_scores(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return sum(post['score'] for post in json.load(f)['posts'])
+
+
+def test_iter_posts_matches_json_load():
+    with open(DATA_DIR / 'reddit_episodes.json', 'r', encoding='utf-8') as f:
+        expected = json.load(f)['posts']
+
+    assert list(iter_posts(DATA_DIR / 'reddit_episodes.json')) == expected
+
+
+def test_values_split_across_chunks(monkeypatch):
+    # Chunks of a few characters cut strings, escapes and numbers in two
+    monkeypatch.setattr(json_stream, 'CHUNK_SIZE', 3)
+    path = DATA_DIR / 'comments' / 'comments_episode_20.json'
+    with open(path, 'r', encoding='utf-8') as f:
+        expected = json.load(f)['comments']
+
+    assert list(iter_comments(path)) == expected
+
+
+def test_jsonl_round_trip(tmp_path):
+    posts = list(iter_posts(DATA_DIR / 'reddit_episodes.json'))
+
+    assert write_jsonl(posts, tmp_path / 'posts.jsonl') == len(posts)
+    assert list(iter_posts(tmp_path / 'posts.jsonl')) == posts
+
+
+def test_comment_files_prefer_the_full_harvest(tmp_path):
+    for name in ('comments_episode_2.json', 'comments_episode_2.jsonl', 'comments_episode_10.json',
+                 'comments_episode_x.json'):
+        (tmp_path / name).write_text('', encoding='utf-8')
+
+    assert comment_files(tmp_path) == {2: tmp_path / 'comments_episode_2.jsonl',
+                                       10: tmp_path / 'comments_episode_10.json'}
+
+
+def test_streaming_memory_does_not_grow_with_the_archive(tmp_path):
+    small, large = tmp_path / 'small.json', tmp_path / 'large.json'
+    write_archive(small, 1)
+    write_archive(large, 8)
+
+    _, small_peak = peak_memory(lambda: stream_scores(small))
+    _, large_peak = peak_memory(lambda: stream_scores(large))
+
+    assert large_peak < 2 * small_peak
+    assert large_peak < MAX_STREAM_PEAK
+
+
+@pytest.fixture(scope='module')
+def archive(tmp_path_factory):
+    path = tmp_path_factory.mktemp('archive') / 'reddit_episodes.json'
+    return path, write_archive(path, ARCHIVE_MB)
+
+
+@requires_benchmark
+@pytest.mark.benchmark(group='archive-memory')
+def test_benchmark_stream_archive(benchmark, archive):
+    path, count = archive
+
+    total, peak = benchmark.pedantic(peak_memory, args=(lambda: stream_scores(path),), rounds=1, iterations=1)
+
+    benchmark.extra_info.update(archive_mb=ARCHIVE_MB, posts=count, peak_mb=round(peak / 2 ** 20, 1))
+    assert total == sum(i % 500 for i in range(count))
+    assert peak < MAX_STREAM_PEAK
+
+
+@requires_benchmark
+@pytest.mark.benchmark(group='archive-memory')
+def test_benchmark_json_load_archive(benchmark, archive):
+    path, count = archive
+    if ARCHIVE_MB > 1024:
+        pytest.skip("json.load needs several times the archive size in memory")
+
+    total, peak = benchmark.pedantic(peak_memory, args=(lambda: load_scores(path),), rounds=1, iterations=1)
+
+    benchmark.extra_info.update(archive_mb=ARCHIVE_MB, posts=count, peak_mb=round(peak / 2 ** 20, 1))
+    assert total == sum(i % 500 for i in range(count))
+    assert peak > ARCHIVE_MB * 1024 * 1024
@@ -0,0 +1,69 @@
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+import fetch_discourse
+from conftest import load_fixture, requires_benchmark
+from fetch_discourse import _parse_comments_bs4, parse_old_reddit_comments
+
+THREAD_HTML = load_fixture('old_reddit_thread.html', 'rb')
+NUM_PAGES = 60
+
+requires_lxml = pytest.mark.skipif(fetch_discourse.lxml_html is None, reason="lxml is not installed")
+
+
+def parse_with(parser, html):
+    return [dict(c) for c in getattr(fetch_discourse, f"_parse_comments_{parser}")(html)]
+
+
+def test_bs4_reads_every_entry():
+    comments = _parse_comments_bs4(THREAD_HTML)
+
+    assert len(comments) == 100
+    assert sum(1 for c in comments if not c['id']) == 2
+    assert all(c['created_utc'] for c in comments)
+    assert all(c['permalink'].startswith('https://old.reddit.com/r/LoveIslandAus/') for c in comments)
+
+
+@requires_lxml
+def test_lxml_and_bs4_parse_the_page_identically():
+    # Replies are nested inside their parent's div.child, so each comment must
+    # only read its own div.entry
+    assert parse_with('lxml', THREAD_HTML) == parse_with('bs4', THREAD_HTML)
+
+
+def test_top_comments_are_sorted_by_score():
+    comments = parse_old_reddit_comments(THREAD_HTML, max_comments=25)
+
+    assert len(comments) == 25
+    assert [c['score'] for c in comments] == sorted((c['score'] for c in comments), reverse=True)
+    assert all(c['body'] for c in comments)
+
+
+@requires_benchmark
+@pytest.mark.benchmark(group='parse-old-reddit-page')
+@pytest.mark.parametrize('parser', [pytest.param('lxml', marks=requires_lxml), 'bs4'])
+def test_benchmark_parser(benchmark, parser):
+    comments = benchmark(parse_with, parser, THREAD_HTML)
+    assert len(comments) == 100
+
+
+# A season of pages parsed one after another vs in a process pool (including
+# the pool start-up), as fetch_all_episode_comments_parallel does
+@requires_benchmark
+@pytest.mark.benchmark(group=f'parse-{NUM_PAGES}-pages')
+def test_benchmark_parse_pages_sequentially(benchmark):
+    parsed = benchmark.pedantic(lambda: [parse_old_reddit_comments(THREAD_HTML) for _ in range(NUM_PAGES)],
+                                rounds=1, iterations=1)
+    assert len(parsed) == NUM_PAGES
+
+
+@requires_benchmark
+@pytest.mark.benchmark(group=f'parse-{NUM_PAGES}-pages')
+def test_benchmark_parse_pages_in_process_pool(benchmark):
+    def parse_in_pool():
+        with ProcessPoolExecutor() as pool:
+            return list(pool.map(parse_old_reddit_comments, [THREAD_HTML] * NUM_PAGES))
+
+    parsed = benchmark.pedantic(parse_in_pool, rounds=1, iterations=1)
+    assert len(parsed) == NUM_PAGES
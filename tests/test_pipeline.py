@@ -0,0 +1,143 @@
+import json
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlparse
+
+import pandas as pd
+import pytest
+
+import fetch_discourse
+import fetch_reddit
+import pipeline
+from conftest import FakeSearch, load_fixture, reddit_post
+from incremental import load_state
+from pipeline import STAGES, load_job_config, run_pipeline, run_shard
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+DAY = 24 * 3600
+SEASON_START = datetime(2025, 10, 27).timestamp()
+THREAD = json.loads(load_fixture('reddit_thread.json'))
+# Saturday 1 November, between episode 4 (Thursday) and episode 5 (Monday)
+WEEKEND_POST = reddit_post('gap', SEASON_START + 5 * DAY + 3600, title='Can not wait for Episode 5')
+POSTS = [
+    reddit_post('ep1', SEASON_START + 3600, title='Season 7 Episode 1 Discussion Thread'),
+    reddit_post('ep2', SEASON_START + DAY + 3600, title='Season 7 Episode 2 Discussion Thread'),
+    WEEKEND_POST,
+]
+
+
+class FakeResponse:
+    def __init__(self, body):
+        self.body = body
+        self.status_code = 200
+
+    def json(self):
+        return self.body
+
+
+class FakeGet:
+    """Stands in for http_client.get: Reddit search answered by FakeSearch, every thread by THREAD."""
+
+    def __init__(self, search):
+        self.search = search
+        self.urls = []
+
+    def __call__(self, url, session=None, limiter=None, params=None, **kwargs):
+        self.urls.append(url)
+        if urlparse(url).path.endswith('/search.json'):
+            return FakeResponse(self.search(params))
+        return FakeResponse(THREAD)
+
+
+@pytest.fixture
+def fake_get(monkeypatch):
+    fake = FakeGet(FakeSearch({'episode': POSTS, 'season 7': POSTS[:2]}, page_size=100))
+    monkeypatch.setattr(fetch_reddit, 'get', fake)
+    monkeypatch.setattr(fetch_discourse, 'get', fake)
+    return fake
+
+
+def write_config(tmp_path, shards, **options):
+    config_file = tmp_path / 'jobs.json'
+    config_file.write_text(json.dumps({'data_dir': 'shards', 'rate': 1000, **options, 'shards': shards}),
+                           encoding='utf-8')
+    return config_file
+
+
+def shard(subreddit='LoveIslandAus', **fields):
+    return {'subreddit': subreddit, 'season': 7, 'start_date': '2025-10-27',
+            'episodes_csv': str(DATA_DIR / 'episodes.csv'),
+            **fields}
+
+
+def episode_of(output_dir, post_id):
+    for csv_file in output_dir.glob('reddit_episode_*.csv'):
+        if post_id in pd.read_csv(csv_file)['id'].tolist():
+            return int(csv_file.stem.rsplit('_', 1)[1])
+
+
+def test_shard_runs_every_stage_into_its_partition(tmp_path, fake_get):
+    config = load_job_config(write_config(tmp_path, [shard()]))
+    output_dir = tmp_path / 'shards' / 'LoveIslandAus' / 'season=7'
+
+    assert run_shard(config['shards'][0], config['rate']) == {'name': 'LoveIslandAus-s7', 'stages': STAGES}
+
+    # Both discovered discussion threads were fetched
+    assert sorted(p.name for p in (output_dir / 'comments').glob('comments_episode_*.json')) == [
+        'comments_episode_1.json', 'comments_episode_2.json']
+    analytics = pd.read_csv(output_dir / 'episode_analytics.csv')
+    assert analytics[['subreddit', 'season']].drop_duplicates().values.tolist() == [['LoveIslandAus', 7]]
+    checkpoint = load_state(output_dir / 'checkpoint.json')
+    assert checkpoint['complete'] and list(checkpoint['stages']) == STAGES
+
+
+def test_interrupted_shard_resumes_from_its_checkpoint(tmp_path, fake_get, monkeypatch):
+    config = load_job_config(write_config(tmp_path, [shard()]))
+    output_dir = tmp_path / 'shards' / 'LoveIslandAus' / 'season=7'
+    parse = pipeline.parse_reddit_episodes
+
+    def interrupted(*args, **kwargs):
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(pipeline, 'parse_reddit_episodes', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        run_shard(config['shards'][0], config['rate'])
+    assert list(load_state(output_dir / 'checkpoint.json')['stages']) == ['fetch_posts', 'fetch_comments']
+    requests_made = len(fake_get.urls)
+
+    monkeypatch.setattr(pipeline, 'parse_reddit_episodes', parse)
+    assert run_shard(config['shards'][0], config['rate'])['stages'] == ['parse', 'analyse']
+    assert len(fake_get.urls) == requests_made
+
+    # A finished shard starts afresh on the next run
+    assert run_shard(config['shards'][0], config['rate'])['stages'] == STAGES
+    assert len(fake_get.urls) > requests_made
+
+
+def test_each_shard_uses_its_own_ambiguous_ranges(tmp_path, fake_get):
+    config_file = write_config(tmp_path, [
+        shard('LoveIslandAus'),
+        # No ranges: every post between two episodes goes to the earlier one
+        shard('LoveIslandUK', ambiguous_ranges=[]),
+    ], workers=2)
+
+    results = run_pipeline(config_file)
+
+    assert results == {'LoveIslandAus-s7': STAGES, 'LoveIslandUK-s7': STAGES}
+    # By default the weekend after episode 4 is ambiguous, so the title decides
+    assert episode_of(tmp_path / 'shards' / 'LoveIslandAus' / 'season=7', 'gap') == 5
+    assert episode_of(tmp_path / 'shards' / 'LoveIslandUK' / 'season=7', 'gap') == 4
+
+
+def test_empty_config_runs_nothing(tmp_path, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("a worker pool was started")
+
+    monkeypatch.setattr(pipeline, 'ProcessPoolExecutor', no_pool)
+
+    assert run_pipeline(write_config(tmp_path, [])) == {}
+
+
+def test_shard_names_must_be_unique(tmp_path):
+    with pytest.raises(ValueError):
+        load_job_config(write_config(tmp_path, [shard(), shard(name='LoveIslandAus-s7')]))
@@ -0,0 +1,106 @@
+import shutil
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import report
+from report import FIGURES, build_report
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+TABLE = 'episode_analytics_table.png'
+
+
+@pytest.fixture(autouse=True)
+def low_dpi(monkeypatch):
+    # Rendering is what's under test, not resolution
+    monkeypatch.setattr(report, 'DPI', 20)
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    data_dir = tmp_path / 'data'
+    data_dir.mkdir()
+    for csv_file in DATA_DIR.glob('reddit_episode_*.csv'):
+        shutil.copy(csv_file, data_dir)
+    shutil.copytree(DATA_DIR / 'comments', data_dir / 'comments')
+    return data_dir
+
+
+@pytest.fixture
+def plot_dir(tmp_path):
+    return tmp_path / 'plot'
+
+
+def build(data_dir, plot_dir, **kwargs):
+    return build_report(data_dir, plot_dir, workers=1, **kwargs)
+
+
+def test_unchanged_inputs_skip_loading_and_rendering(data_dir, plot_dir, monkeypatch):
+    assert build(data_dir, plot_dir) == list(FIGURES)
+    assert sorted(p.name for p in plot_dir.iterdir()) == sorted([*FIGURES, 'report_manifest.json'])
+
+    def fail(*args, **kwargs):
+        raise AssertionError("data was loaded")
+
+    monkeypatch.setattr(report, 'load_posts', fail)
+    # Touching a file without changing it is not a change
+    csv_file = data_dir / 'reddit_episode_1.csv'
+    csv_file.write_bytes(csv_file.read_bytes())
+    assert build(data_dir, plot_dir) == []
+
+
+def test_changed_data_rerenders_only_the_figures_drawing_it(data_dir, plot_dir):
+    build(data_dir, plot_dir)
+    rendered_at = {name: (plot_dir / name).stat().st_mtime_ns for name in FIGURES}
+
+    # Post scores feed the homogeneity plot and the table, not the engagement plots
+    csv_file = data_dir / 'reddit_episode_1.csv'
+    posts = pd.read_csv(csv_file)
+    posts.loc[0, 'score'] += 100
+    posts.to_csv(csv_file, index=False)
+
+    rendered = build(data_dir, plot_dir)
+
+    assert rendered == ['homogeneity_plot.png', TABLE]
+    for name in FIGURES:
+        changed = (plot_dir / name).stat().st_mtime_ns != rendered_at[name]
+        assert changed == (name in rendered)
+
+
+def test_missing_outputs_are_rendered_again(data_dir, plot_dir):
+    build(data_dir, plot_dir)
+    (plot_dir / 'homogeneity_plot.png').unlink()
+
+    assert build(data_dir, plot_dir) == ['homogeneity_plot.png']
+
+
+def plot_engagement_in_red(data, output_file):
+    """A changed render function"""
+    fig = report.Figure(figsize=report.FIG_SIZE)
+    fig.subplots().bar(data['episode_number'], data['num_engagement'], color='red')
+    fig.savefig(output_file, dpi=report.DPI)
+
+
+def test_changed_render_code_rerenders_its_figure(data_dir, plot_dir, monkeypatch):
+    build(data_dir, plot_dir)
+
+    monkeypatch.setitem(FIGURES, 'engagement_plot.png', (plot_engagement_in_red, FIGURES['engagement_plot.png'][1]))
+
+    assert build(data_dir, plot_dir) == ['engagement_plot.png']
+
+
+def test_precomputed_analytics_are_fingerprinted_per_figure(data_dir, plot_dir):
+    analytics = report.compute_episode_analytics(report.load_posts(data_dir),
+                                                 report.load_comments(data_dir / 'comments'))
+    assert build(data_dir, plot_dir, analytics=analytics) == list(FIGURES)
+    assert build(data_dir, plot_dir, analytics=analytics) == []
+
+    analytics['homogeneity_score'] += 0.5
+    assert build(data_dir, plot_dir, analytics=analytics) == ['homogeneity_plot.png', TABLE]
+
+
+def test_force_rerenders_everything(data_dir, plot_dir):
+    build(data_dir, plot_dir)
+
+    assert build(data_dir, plot_dir, force=True) == list(FIGURES)
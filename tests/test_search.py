@@ -0,0 +1,109 @@
+import json
+from datetime import datetime
+
+import pytest
+
+from conftest import FakeSearch, reddit_post
+from fetch_reddit import SEARCH_KEYWORDS, scrape_reddit_episodes, search_posts_concurrently
+from http_client import TokenBucket
+from json_stream import iter_posts
+
+SEARCH_PATH = '/r/LoveIslandAus/search.json'
+DAY = 24 * 3600
+SEASON_START = datetime(2025, 10, 27).timestamp()
+
+
+def posts_at(*days, prefix='p'):
+    """One post per day offset from the season start, ids p<day>."""
+    return [reddit_post(f"{prefix}{day}", SEASON_START + day * DAY + 3600) for day in days]
+
+
+def unlimited():
+    return TokenBucket(rate=1000, capacity=1000)
+
+
+class CountingBucket(TokenBucket):
+    def __init__(self):
+        super().__init__(rate=1000, capacity=1000)
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+        return super().acquire()
+
+
+def test_keyword_chains_are_merged_without_duplicates(stub_server, tmp_path):
+    search = FakeSearch({'episode': posts_at(1, 2, 3, 4, 5), 'S7': posts_at(4, 5, 6, 7)})
+    stub_server.route(SEARCH_PATH, search)
+    output_file = tmp_path / 'reddit_episodes.json'
+
+    result = scrape_reddit_episodes(output_file=str(output_file), keywords=['episode', 'S7'],
+                                    limiter=unlimited(), base_url=stub_server.base_url)
+
+    ids = [post['id'] for post in result['posts']]
+    assert ids == ['p7', 'p6', 'p5', 'p4', 'p3', 'p2', 'p1']
+    assert json.loads(output_file.read_text(encoding='utf-8'))['total_posts'] == 7
+    # Both chains paged through the cursor (2 posts per page)
+    queried = {(query['q'], query.get('after')) for _, query in stub_server.requests}
+    assert ('episode', 't3_p4') in queried and ('S7', 't3_p6') in queried
+
+
+def test_chain_stops_at_the_start_date(stub_server):
+    search = FakeSearch({'episode': posts_at(-3, -2, -1, 1, 2, 3)})
+    stub_server.route(SEARCH_PATH, search)
+
+    posts, cursors = search_posts_concurrently('LoveIslandAus', ['episode'], SEASON_START,
+                                               SEASON_START + 30 * DAY, base_url=stub_server.base_url)
+
+    assert [post['id'] for post in posts] == ['p3', 'p2', 'p1']
+    assert cursors == {'episode': None}
+    # The page holding p1 and p-1 is the last one requested
+    assert stub_server.hits(SEARCH_PATH) == 2
+
+
+def test_chains_share_one_rate_limiter(stub_server):
+    search = FakeSearch({'episode': posts_at(1, 2, 3), 'ep': posts_at(4, 5, 6), 'S7': posts_at(7)})
+    stub_server.route(SEARCH_PATH, search)
+    limiter = CountingBucket()
+
+    posts, _ = search_posts_concurrently('LoveIslandAus', ['episode', 'ep', 'S7'], SEASON_START,
+                                         SEASON_START + 30 * DAY, limiter=limiter,
+                                         base_url=stub_server.base_url)
+
+    assert len(posts) == 7
+    assert limiter.acquired == len(stub_server.requests) == 5
+
+
+def test_failed_chain_returns_its_resume_cursor(stub_server):
+    search = FakeSearch({'episode': posts_at(1, 2, 3, 4, 5), 'S7': posts_at(6, 7)})
+    search.failing_cursors.add('t3_p4')
+    stub_server.route(SEARCH_PATH, search)
+
+    posts, cursors = search_posts_concurrently('LoveIslandAus', ['episode', 'S7'], SEASON_START,
+                                               SEASON_START + 30 * DAY, base_url=stub_server.base_url)
+
+    assert [post['id'] for post in posts] == ['p7', 'p6', 'p5', 'p4']
+    assert cursors == {'episode': 't3_p4', 'S7': None}
+
+
+@pytest.mark.parametrize('output_name', ['reddit_episodes.json', 'reddit_episodes.jsonl'])
+def test_output_formats_hold_the_same_posts(stub_server, tmp_path, output_name):
+    stub_server.route(SEARCH_PATH, FakeSearch({'episode': posts_at(1, 2, 3)}))
+    output_file = tmp_path / output_name
+
+    scrape_reddit_episodes(output_file=str(output_file), limiter=unlimited(), base_url=stub_server.base_url)
+
+    assert [post['id'] for post in iter_posts(output_file)] == ['p3', 'p2', 'p1']
+
+
+def test_season_keywords_include_episode_codes(stub_server, tmp_path):
+    episode_codes = next(k for k in SEARCH_KEYWORDS if 'E05' in k.split(' OR '))
+    # Only found by its "E0X" code
+    recap = reddit_post('recap', SEASON_START + 8 * DAY, title='S7 E05 recap')
+    stub_server.route(SEARCH_PATH, FakeSearch({'episode': posts_at(1, 2), episode_codes: [recap]}))
+
+    result = scrape_reddit_episodes(output_file=str(tmp_path / 'reddit_episodes.json'), keywords=SEARCH_KEYWORDS,
+                                    limiter=unlimited(), base_url=stub_server.base_url)
+
+    assert [post['id'] for post in result['posts']] == ['recap', 'p2', 'p1']
+    assert {query['q'] for _, query in stub_server.requests} == set(SEARCH_KEYWORDS)
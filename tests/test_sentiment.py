@@ -0,0 +1,92 @@
+import pandas as pd
+import pytest
+
+import sentiment
+from sentiment import SentimentCache, add_sentiment, score_batch, score_texts
+from storage import decode_id
+
+COMMENTS = pd.DataFrame({
+    'id': ['nr63vpd', 'nrb01s5', 'nr7bajg'],
+    'body': ['I love this couple so much', 'Worst recoupling ever, awful', None],
+})
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = SentimentCache(tmp_path / 'sentiment_cache.sqlite')
+    yield cache
+    cache.close()
+
+
+@pytest.fixture
+def scored_batches(monkeypatch):
+    """Record the batches scored in-process."""
+    batches = []
+
+    def recording_score_batch(texts):
+        batches.append(list(texts))
+        return score_batch(texts)
+
+    monkeypatch.setattr(sentiment, 'score_batch', recording_score_batch)
+    return batches
+
+
+def test_comments_are_scored_in_order():
+    scored = add_sentiment(COMMENTS, ['body'], workers=1)
+
+    assert scored['sentiment'].iloc[0] > 0.5 and scored['sentiment'].iloc[1] < -0.5
+    # Missing text scores as empty text
+    assert scored['sentiment'].iloc[2] == 0
+    assert 'sentiment' not in COMMENTS.columns
+
+
+def test_empty_frames_get_an_empty_sentiment_column(cache, scored_batches):
+    empty = pd.DataFrame({'id': pd.Series(dtype='int64'), 'title': pd.Series(dtype=object),
+                          'selftext': pd.Series(dtype=object)})
+
+    scored = add_sentiment(empty, ['title', 'selftext'], cache)
+
+    assert list(scored.columns) == ['id', 'title', 'selftext', 'sentiment']
+    assert scored.empty and scored['sentiment'].dtype == 'float64'
+    assert scored_batches == []
+
+
+def test_cached_scores_are_not_recomputed(cache, scored_batches):
+    first = add_sentiment(COMMENTS, ['body'], cache, workers=1)
+    edited = COMMENTS.assign(body=['I love this couple so much', 'Best recoupling ever', None])
+
+    second = add_sentiment(edited, ['body'], cache, workers=1)
+
+    # Only the edited body is scored again
+    assert scored_batches == [['I love this couple so much', 'Worst recoupling ever, awful', ''],
+                              ['Best recoupling ever']]
+    assert second['sentiment'].iloc[0] == first['sentiment'].iloc[0]
+    assert second['sentiment'].iloc[1] > 0
+
+
+def test_parquet_and_csv_ids_share_cache_entries(cache, scored_batches):
+    add_sentiment(COMMENTS, ['body'], cache, workers=1)
+    # Parquet datasets store ids as int64
+    from_parquet = COMMENTS.assign(id=COMMENTS['id'].map(decode_id).astype('int64'))
+
+    scored = add_sentiment(from_parquet, ['body'], cache, workers=1)
+
+    assert len(scored_batches) == 1
+    assert scored['sentiment'].tolist() == add_sentiment(COMMENTS, ['body'], cache)['sentiment'].tolist()
+
+
+def test_texts_are_scored_in_batches(cache, scored_batches):
+    ids = [f"c{i}" for i in range(5)]
+    texts = ['great', 'terrible', 'fine', 'great', 'sad']
+
+    scores = score_texts(ids, texts, cache, workers=1, batch_size=2)
+
+    assert scored_batches == [['great', 'terrible'], ['fine', 'great'], ['sad']]
+    assert scores[0] == scores[3] > 0 > scores[1]
+
+
+def test_process_pool_matches_in_process_scoring():
+    ids = [f"c{i}" for i in range(6)]
+    texts = ['great', 'terrible', 'fine', 'love it', 'sad', 'meh']
+
+    assert score_texts(ids, texts, workers=2, batch_size=2) == score_texts(ids, texts, workers=1)
@@ -0,0 +1,132 @@
+import csv
+from pathlib import Path
+
+import pyarrow.compute as pc
+import pytest
+
+from episode_metrics import compute_episode_analytics, load_comments, load_posts
+from json_stream import comment_files, iter_comments
+from parse_reddit_episodes import parse_reddit_episodes
+from storage import (PartitionedWriter, comments_to_table, convert_data_dir, decode_id, encode_id,
+                     posts_to_table, read_dataset)
+
+DATA_DIR = Path(__file__).resolve().parent.parent / 'data'
+
+
+def post(post_id, episode_number, score=1):
+    return {'id': post_id, 'episode_number': episode_number, 'title': f"Episode {episode_number}",
+            'author': 'islander', 'created_utc': 1761548525.0, 'score': score, 'num_comments': 2,
+            'url': None, 'permalink': None, 'selftext': None}
+
+
+def csv_posts(csv_file):
+    with open(csv_file, 'r', encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.mark.parametrize('reddit_id', ['1oh7qjr', 'nr63vpd', '0', 'zzzzzzzzzzzz'])
+def test_ids_round_trip_through_int64(reddit_id):
+    assert encode_id(decode_id(reddit_id)) == reddit_id
+    assert decode_id(f"t1_{reddit_id}") == decode_id(reddit_id)
+
+
+def test_missing_ids_stay_missing():
+    assert decode_id('') is None and encode_id(None) is None
+
+
+def test_partitioned_writer_flushes_batches_into_partitions(tmp_path):
+    root = tmp_path / 'posts'
+    writer = PartitionedWriter(root, posts_to_table, season=7, batch_size=3)
+    for i in range(10):
+        writer.write(post(encode_id(1000 + i), episode_number=i % 2 + 1, score=i))
+
+    assert writer.close() == {1: 5, 2: 5}
+    assert sorted(p.relative_to(root).as_posix() for p in root.rglob('*.parquet')) == [
+        'season=7/episode_number=1/part-0.parquet', 'season=7/episode_number=2/part-0.parquet']
+    table = read_dataset(root)
+    assert table.num_rows == 10
+    rows = sorted(table.to_pylist(), key=lambda row: row['score'])
+    assert [(encode_id(row['id']), row['episode_number'], row['season']) for row in rows] == [
+        (encode_id(1000 + i), i % 2 + 1, 7) for i in range(10)]
+    assert rows[0]['selftext'] == '' and rows[0]['created_utc'].timestamp() == 1761548525
+
+
+def test_rewriting_a_partition_leaves_the_others(tmp_path):
+    root = tmp_path / 'posts'
+    writer = PartitionedWriter(root, posts_to_table, season=7)
+    for i in range(4):
+        writer.write(post(f"a{i}", episode_number=i % 2 + 1))
+    writer.close()
+
+    writer = PartitionedWriter(root, posts_to_table, season=7)
+    writer.write(post('b0', episode_number=2))
+    writer.close()
+
+    ids = {(row['episode_number'], encode_id(row['id'])) for row in read_dataset(root).to_pylist()}
+    assert ids == {(1, 'a0'), (1, 'a2'), (2, 'b0')}
+
+
+@pytest.fixture(scope='module')
+def parquet_dir(tmp_path_factory):
+    output_dir = tmp_path_factory.mktemp('data') / 'parquet'
+    convert_data_dir(DATA_DIR, output_dir)
+    return output_dir
+
+
+def test_read_dataset_projects_columns_and_filters_partitions(parquet_dir):
+    table = read_dataset(parquet_dir / 'posts', columns=['id', 'score', 'episode_number'],
+                         filters=[('season', '=', 7), ('episode_number', '>=', 18)])
+
+    assert table.column_names == ['id', 'score', 'episode_number']
+    assert sorted(set(table['episode_number'].to_pylist())) == [18, 19, 20]
+    assert table.num_rows == sum(len(csv_posts(DATA_DIR / f"reddit_episode_{n}.csv")) for n in (18, 19, 20))
+
+    high_scores = read_dataset(parquet_dir / 'posts', filters=pc.field('score') >= 100)
+    assert high_scores.num_rows and min(high_scores['score'].to_pylist()) >= 100
+    assert read_dataset(parquet_dir / 'posts', filters=[('season', '=', 8)]).num_rows == 0
+
+
+def test_converted_posts_match_the_csvs(parquet_dir):
+    posts = read_dataset(parquet_dir / 'posts').to_pylist()
+
+    for csv_file in DATA_DIR.glob('reddit_episode_*.csv'):
+        episode_number = int(csv_file.stem.rsplit('_', 1)[1])
+        expected = {row['id']: row for row in csv_posts(csv_file)}
+        converted = {encode_id(p['id']): p for p in posts if p['episode_number'] == episode_number}
+        assert converted.keys() == expected.keys()
+        for post_id, row in expected.items():
+            assert converted[post_id]['title'] == row['title']
+            assert converted[post_id]['score'] == int(row['score'])
+            assert converted[post_id]['num_comments'] == int(row['num_comments'])
+            assert converted[post_id]['created_utc'].timestamp() == int(float(row['created_utc']))
+
+
+def test_converted_comments_match_the_json(parquet_dir):
+    comments = read_dataset(parquet_dir / 'comments').to_pylist()
+
+    saved = [(n, c) for n, f in comment_files(DATA_DIR / 'comments').items() for c in iter_comments(f)]
+    assert len(comments) == len(saved)
+    assert sorted((c['episode_number'], encode_id(c['id']), c['body'], c['score']) for c in comments if c['id']) == \
+        sorted((n, c['id'], c['body'] or '', c['score']) for n, c in saved if c['id'])
+
+
+def test_analytics_are_the_same_from_parquet_and_csv(parquet_dir):
+    comments = load_comments(DATA_DIR / 'comments')
+
+    from_parquet = compute_episode_analytics(load_posts(parquet_dir.parent), comments)
+    from_csv = compute_episode_analytics(load_posts(DATA_DIR), comments)
+
+    assert from_parquet.to_dict('records') == from_csv.to_dict('records')
+
+
+def test_parse_writes_the_same_posts_as_parquet_or_csv(tmp_path):
+    for output_format in ('csv', 'parquet'):
+        parse_reddit_episodes(DATA_DIR / 'episodes.csv', DATA_DIR / 'reddit_episodes.json',
+                              tmp_path / output_format, output_format=output_format)
+
+    as_parquet = {(row['episode_number'], encode_id(row['id']), row['score'])
+                  for row in read_dataset(tmp_path / 'parquet' / 'parquet' / 'posts').to_pylist()}
+    as_csv = {(int(f.stem.rsplit('_', 1)[1]), row['id'], int(row['score']))
+              for f in (tmp_path / 'csv').glob('reddit_episode_*.csv') for row in csv_posts(f)}
+    assert as_parquet == as_csv
+    assert len(as_csv) == sum(1 for f in (tmp_path / 'csv').glob('*.csv') for _ in csv_posts(f))
@@ -0,0 +1,129 @@
+import json
+
+import pytest
+
+from conftest import load_fixture
+from fetch_discourse import refresh_thread_comments
+from http_client import TokenBucket
+from json_stream import iter_comments
+from watch import HOUR, ThreadScheduler, discover_threads, watch
+
+THREAD_PATH = '/r/LoveIslandAus/comments/1p7ox2x/season_7_episode_20_thursday_27th_november'
+DAY = 24 * HOUR
+# Whole seconds, so every scheduled time compares exactly
+START = 1_764_000_000
+
+
+class SimulatedClock:
+    """Clock whose sleep advances time instantly and ends the run at `until`."""
+
+    class Finished(Exception):
+        pass
+
+    def __init__(self, now, until):
+        self.now = now
+        self.until = until
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        if self.now + seconds > self.until:
+            raise self.Finished
+        self.now += seconds
+
+
+def discussion_post(episode_number, created_utc, url='https://www.reddit.com/r/LoveIslandAus/comments/x/'):
+    return {'title': f"Season 7 Episode {episode_number} (Thursday) Discussion Thread",
+            'permalink': f"{url}{episode_number}/", 'created_utc': created_utc}
+
+
+def run_watch(posts, until, **kwargs):
+    """Run watch() on a simulated clock and return {episode_name: [poll times]}."""
+    clock = SimulatedClock(START, until)
+    polls = {}
+
+    def discover():
+        # A post only shows up in the search once it has been made
+        return [post for post in posts if post['created_utc'] <= clock.now]
+
+    def poll(episode_name, url):
+        polls.setdefault(episode_name, []).append(clock.now)
+        return 0
+
+    with pytest.raises(SimulatedClock.Finished):
+        watch(clock=clock, sleep=clock.sleep, discover=discover, poll=poll, **kwargs)
+    return polls
+
+
+def test_discover_threads_keeps_the_earliest_thread_of_the_season():
+    posts = [discussion_post(20, 200), discussion_post(20, 100, url='https://first/'),
+             discussion_post(3, 50) | {'title': 'Season 6 Episode 3 Discussion Thread'},
+             {'title': 'Episode 20 memes', 'permalink': 'x', 'created_utc': 10}]
+
+    assert discover_threads(posts, season=7) == {'Episode 20': {'url': 'https://first/20/', 'created_utc': 100}}
+
+
+def test_hot_threads_poll_every_ten_minutes_then_cool_down_and_drop(tmp_path):
+    scheduler = ThreadScheduler()
+    created = START - HOUR
+    polls = run_watch([discussion_post(20, created)], until=START + 16 * DAY,
+                      output_dir=tmp_path, scheduler=scheduler)
+
+    times = polls['Episode 20']
+    for previous, current in zip(times, times[1:]):
+        age = previous - created
+        assert current - previous == (10 * 60 if age <= 48 * HOUR else 12 * HOUR)
+    # Both tiers were exercised before the thread aged out
+    assert times[1] - times[0] == 600 and times[-1] - times[-2] == 12 * HOUR
+    # The first poll past max_age picks up the last comments and is not rescheduled
+    assert times[-2] - created <= scheduler.max_age < times[-1] - created
+    assert all(episode_name != 'Episode 20' for _, episode_name in scheduler.queue)
+
+
+def test_cold_threads_poll_every_twelve_hours_and_old_ones_are_ignored(tmp_path):
+    posts = [discussion_post(10, START - 3 * DAY), discussion_post(1, START - 20 * DAY)]
+
+    polls = run_watch(posts, until=START + 2 * DAY, output_dir=tmp_path)
+
+    assert polls == {'Episode 10': [START + n * 12 * HOUR for n in range(5)]}
+
+
+def test_new_threads_are_picked_up_at_the_next_discovery(tmp_path):
+    posts = [discussion_post(21, START + 5 * HOUR + 60)]
+
+    polls = run_watch(posts, until=START + 6 * HOUR - 1, output_dir=tmp_path, discover_interval=30 * 60)
+
+    # First discovery run after it was posted, then hot polling
+    first = START + 5 * HOUR + 30 * 60
+    assert polls == {'Episode 21': [first, first + 600, first + 1200]}
+
+
+def test_watch_polls_the_stub_thread_for_changes(stub_server, tmp_path):
+    thread = json.loads(load_fixture('reddit_thread.json'))
+    top_comment = thread[1]['data']['children'][0]['data']
+    original_score = top_comment['score']
+
+    def serve_thread(query):
+        top_comment['score'] += 1
+        return thread
+
+    stub_server.route(THREAD_PATH + '.json', serve_thread)
+    url = stub_server.url(THREAD_PATH + '/')
+    state = {}
+
+    def poll(episode_name, thread_url):
+        added, updated, total = refresh_thread_comments(episode_name, thread_url, tmp_path, state,
+                                                        limiter=TokenBucket(rate=1000, capacity=1000))
+        return added
+
+    clock = SimulatedClock(START, until=START + 3 * HOUR)
+    watch(output_dir=tmp_path, clock=clock, sleep=clock.sleep, max_iterations=3, poll=poll,
+          discover=lambda: [{'title': 'Season 7 Episode 20 Discussion Thread', 'permalink': url,
+                             'created_utc': START - HOUR}])
+
+    # Wake-ups at 0, 10 and 20 minutes each polled the thread once
+    assert stub_server.hits(THREAD_PATH + '.json') == 3
+    comments = list(iter_comments(tmp_path / 'comments_episode_20.json'))
+    assert len(comments) == 100
+    assert comments[0]['score'] == original_score + 3